@@ -18,8 +18,15 @@ import xlsxwriter
 
 from utils.config_utils import read_conf
 from utils.cad_drawer import model_drawer
-from utils.abq_connector import connector_console
-from utils.abq_solving_utils import run_solver, parce_results, process_results
+from utils.abq_solving_utils import process_results
+from utils.design_pipeline import (sample_geometry, solve_design, parallel_design_contexts, stage_cost,
+                                   stage_cad, stage_cae, stage_solve, stage_parse, metrics_work_path,
+                                   solve_batch, solve_material_sweep)
+from utils.job_scheduler import JobScheduler, TokenBudget, stage_shapes
+from utils.mesh_morphing import try_morph_design, save_template
+from utils.throughput_autotuner import run_autotune, node_resources
+from utils.mesh_convergence import run_mesh_convergence
+from utils.scratch import close_default_harvester
 
 config_name = 'config_ss'
 globalPath = str(Path.cwd())
@@ -30,14 +37,14 @@ now = str(datetime.datetime.now()).replace(' ', '_').replace(':', '-').split('.'
 now = now[:-3]
 
 
-def _get_random_value(low: float, top: float) -> float:
-    return np.round(random.uniform(low, top), round_decimals)
-
 def _print_parameters(params):
     for key in params.keys():
         val = params.get(key)
         print(f'{key:10s} > {val:7f}')
 
+def _material_sweep(solver_cfg) -> bool:
+    return bool(solver_cfg.material_sweep.variants or solver_cfg.material_sweep.uq_samples)
+
 def configure_xlsx(
         solver_cfg: Union[SimpleNamespace, Dict] = None,
         folder_path: str = None
@@ -74,6 +81,9 @@ def configure_xlsx(
                 f'S_mises_last': [],
                 f'RF_last': [],
                 f'Diameter_last': [],
+                **{f'{metric}_{case.name}': [] for case in solver_cfg.load_cases
+                   for metric in ('S_mises', 'RF', 'Diameter')},
+                **({'material': []} if _material_sweep(solver_cfg) else {}),
                 f'Time per design': [],
                 f'FEA time': [],
             })
@@ -97,82 +107,196 @@ def configure_xlsx(
         # sheet_desc = wbResults['descriptive']
     return wbResults,sheet_short,outFileNameResult
 
+def run_parallel_campaign(geometry_cfg, parameters, material_model, material_cfg, solver_cfg,
+                          wbResults, sheet_short, outFileNameResult, n_designs=10000):
+    # stages of many designs packed onto the node's cores and licence tokens
+    sched_cfg = solver_cfg.scheduler
+    scheduler = JobScheduler(
+        cores=sched_cfg.cores or node_resources()[0],
+        tokens=TokenBudget(sched_cfg.tokens),
+        shapes=stage_shapes(solver_cfg, sched_cfg.cae_tokens),
+        cost_fn=stage_cost,
+    )
+
+    def _on_done(ctx, error):
+        work_path = metrics_work_path(ctx.solver_cfg, globalPath)
+        if error is not None:
+            print(f'[scheduler] design {ctx.index} failed: {error}')
+        else:
+            try:
+                process_results(
+                    geometry_cfg=ctx.geometry_cfg,
+                    solver_cfg=ctx.solver_cfg,
+                    work_path=work_path,
+                    wbResults=wbResults,
+                    filename=outFileNameResult,
+                    sheet_short=sheet_short,
+                    begining_time=ctx.t_begin,
+                    fea_time=ctx.fea_time
+                )
+            except Exception as e:
+                print(f'[scheduler] design {ctx.index}: no results ({e})')
+        shutil.rmtree(os.path.join(globalPath, f'{solver_cfg.work_root}_d{ctx.index:05d}'), ignore_errors=True)
+        if metrics_work_path(ctx.solver_cfg, globalPath) == globalPath:
+            shutil.rmtree(os.path.join(globalPath, ctx.solver_cfg.results_root, ctx.solver_cfg.job_name_prefix),
+                          ignore_errors=True)
+        for file in glob.glob(os.path.join(globalPath, 'geoms', ctx.solver_cfg.job_name_prefix + '*')):
+            os.remove(file)
+
+    stats = scheduler.run(
+        parallel_design_contexts(geometry_cfg, parameters, material_model, material_cfg, solver_cfg,
+                                 globalPath, n_designs, round_decimals),
+        stages=[('cad', stage_cad), ('cae', stage_cae), ('solve', stage_solve), ('parse', stage_parse)],
+        on_done=_on_done,
+        max_inflight=2 * solver_cfg.parallel_jobs,
+    )
+    print(f'[scheduler] {stats}')
+
+def run_batched_campaign(geometry_cfg, parameters, material_model, material_cfg, solver_cfg,
+                         wbResults, sheet_short, outFileNameResult, n_designs=10000):
+    # solver.batch.size designs share one Abaqus job (pre-processing, licence checkout, start-up)
+    size = solver_cfg.batch.size
+    t_campaign, n_done = datetime.datetime.now(), 0
+    for _idx in range(0, n_designs, size):
+        print(f'******** currently: {_idx}..{_idx + size - 1}')
+        t_begin = datetime.datetime.now()
+        try:
+            geometries = [sample_geometry(geometry_cfg, parameters, round_decimals) for _ in range(size)]
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        for ctx in solve_batch(geometries, material_model, material_cfg, solver_cfg, globalPath):
+            try:
+                process_results(
+                    geometry_cfg=ctx.geometry_cfg,
+                    solver_cfg=ctx.solver_cfg,
+                    work_path=metrics_work_path(ctx.solver_cfg, globalPath),
+                    wbResults=wbResults,
+                    filename=outFileNameResult,
+                    sheet_short=sheet_short,
+                    begining_time=t_begin,
+                    fea_time=ctx.fea_time
+                )
+                n_done += 1
+            except Exception as e:
+                print(f'[batch] design {_idx + ctx.index}: no results ({e})')
+        hours = (datetime.datetime.now() - t_campaign).total_seconds() / 3600
+        print(f'[batch] {n_done} designs, {n_done / max(hours, 1e-9):.1f} designs/h')
+
 @hydra.main(config_path="config", config_name=config_name, version_base=None)
 def main(cfg: DictConfig):
 
     # reading configuration file
     parameters, objectives, geometry_cfg, material_model, material_cfg, solver_cfg = read_conf(cfg, globalPath)
 
-    wbResults,  sheet_short, outFileNameResult = configure_xlsx(solver_cfg,
-                                                               os.path.join(globalPath,solver_cfg.results_root)
-                                                               )
+    # the harvester thread is a daemon: every mode waits for its pending ODB copies / scratch cleanup
+    try:
+        mode = str(cfg.mode) if hasattr(cfg, 'mode') else 'campaign'
+        if mode == 'mesh_convergence':
+            run_mesh_convergence(
+                geometry_cfg, parameters, material_model, material_cfg, solver_cfg, globalPath,
+                study_cfg=cfg.mesh_study if hasattr(cfg, 'mesh_study') else None,
+                config_path=os.path.join(globalPath, 'config', config_name + '.yaml'),
+            )
+            return
+        if mode == 'autotune':
+            run_autotune(
+                solver_cfg, globalPath,
+                tune_cfg=cfg.autotune if hasattr(cfg, 'autotune') else None,
+                config_path=os.path.join(globalPath, 'config', config_name + '.yaml'),
+            )
+            return
+
+        wbResults,  sheet_short, outFileNameResult = configure_xlsx(solver_cfg,
+                                                                   os.path.join(globalPath,solver_cfg.results_root)
+                                                                   )
 
-    first_done = False
-    attempts_done = 0
-    # while not first_done:
-    for _idx in range(10000):
-        print(f'******** currently: {_idx}')
-        t_begin = datetime.datetime.now()
-        if os.path.exists(os.path.join(globalPath, solver_cfg.work_root, solver_cfg.results_root)):
-            shutil.rmtree(os.path.join(globalPath, solver_cfg.work_root, solver_cfg.results_root))
-        # prepare set of geometric values
-        curr_geometry_cfg = geometry_cfg.__dict__.copy()
-        for key in curr_geometry_cfg.keys():
-            if key in parameters:
-                val_range = curr_geometry_cfg.get(key)
-                if len(val_range) != 2:
-                    print(f'Exception: error in .yaml configuration. '
-                          f'Length of geometry.{key} = {len(val_range)} > {val_range}! '
-                          f'Change it to [a, b]')
-                    sys.exit(1)
-                elif len(val_range) == 2:
-                    curr_geometry_cfg.__setitem__(key, _get_random_value(low=val_range[0], top=val_range[1]))
-                else:
-                    curr_geometry_cfg.__setitem__(key, val_range)
+        if solver_cfg.parallel_jobs > 1:
+            run_parallel_campaign(geometry_cfg, parameters, material_model, material_cfg, solver_cfg,
+                                  wbResults, sheet_short, outFileNameResult)
+            return
 
-        try:
-            # compile step file of stent
-            length = model_drawer(curr_geometry_cfg, solver_cfg.job_name_prefix)
-        except Exception as e:
-            print(f'\rException in model_drawer..... It`s already {attempts_done} attempt in row', end='', flush=True)
-            attempts_done += 1
-            continue
-
-        for file in glob.glob(f'./{solver_cfg.work_root}/abaqus*'):
-            os.remove(path=file)
-        #configure .cae and inp
-        connector_console(curr_geometry_cfg, length,
-                          material_model, material_cfg, solver_cfg, solver_cfg.work_root,
-                          'abaqus',
-                          # os.path.join(globalPath,'utils','abq_cae_compiler_explicit.py'),
-                          os.path.join(globalPath,'utils','abq_cae_compiler_standard_small_part.py'),
-                          os.path.join(globalPath, solver_cfg.work_root,'config.json'),
-                          os.getcwd())
-
-        # _print_parameters(curr_geometry_cfg)
-
-        t0 = datetime.datetime.now()
-        message, last_frame_time = run_solver(solver_cfg, solver_cfg.work_root, 'abaqus', globalPath)
-        fea_time = datetime.datetime.now() - t0
-        print(f'[solver] get message: {message}. Last frame step: {last_frame_time}. '
-              f'Costed time: {fea_time}')
-
-        parce_results(solver_cfg,'abaqus', os.path.join(globalPath, solver_cfg.work_root,'config.json'))
+        if solver_cfg.batch.size > 1:
+            run_batched_campaign(geometry_cfg, parameters, material_model, material_cfg, solver_cfg,
+                                 wbResults, sheet_short, outFileNameResult)
+            return
 
-        try:
-            process_results(
-                geometry_cfg=curr_geometry_cfg,
-                solver_cfg=solver_cfg,
-                work_path=os.path.join(globalPath, solver_cfg.work_root),
-                wbResults=wbResults,
-                filename=outFileNameResult,
-                sheet_short=sheet_short,
-                begining_time=t_begin,
-                fea_time=fea_time
+        first_done = False
+        attempts_done = 0
+        # while not first_done:
+        for _idx in range(10000):
+            print(f'******** currently: {_idx}')
+            t_begin = datetime.datetime.now()
+            # prepare set of geometric values
+            try:
+                curr_geometry_cfg = sample_geometry(geometry_cfg, parameters, round_decimals)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+
+            # same topology as an already meshed design -> morph its mesh instead of CAD/CAE rebuild
+            morphed = False
+            if solver_cfg.morph.enabled:
+                try:
+                    morphed = try_morph_design(curr_geometry_cfg, material_cfg, solver_cfg, globalPath)
+                except Exception as e:
+                    print(f'[morph] failed ({e}); remeshing')
+
+            length = None
+            if not morphed:
+                try:
+                    # compile step file of stent
+                    length = model_drawer(curr_geometry_cfg, solver_cfg.job_name_prefix)
+                except Exception as e:
+                    print(f'\rException in model_drawer..... It`s already {attempts_done} attempt in row', end='', flush=True)
+                    attempts_done += 1
+                    continue
+
+            # _print_parameters(curr_geometry_cfg)
+
+            #configure .cae and inp, solve and export results
+            message, last_frame_time, fea_time = solve_design(
+                curr_geometry_cfg, length, material_model, material_cfg, solver_cfg, globalPath,
+                # Explicit on the sector model: solver.analysis; full model: compiler='abq_cae_compiler_explicit.py'
+                # compiler='abq_cae_compiler_explicit.py',
+                build=not morphed,
             )
-        except:
-            pass
-            first_done = True
+            if solver_cfg.morph.enabled and not morphed:
+                save_template(curr_geometry_cfg, length, material_cfg, solver_cfg, globalPath)
+
+            try:
+                process_results(
+                    geometry_cfg=dict(curr_geometry_cfg, material=material_cfg.name),
+                    solver_cfg=solver_cfg,
+                    work_path=metrics_work_path(solver_cfg, globalPath),
+                    wbResults=wbResults,
+                    filename=outFileNameResult,
+                    sheet_short=sheet_short,
+                    begining_time=t_begin,
+                    fea_time=fea_time
+                )
+            except:
+                pass
+                first_done = True
+
+            # the same mesh with the other materials of the sweep: only a small master deck per variant
+            if _material_sweep(solver_cfg):
+                for ctx in solve_material_sweep(curr_geometry_cfg, material_model, material_cfg, solver_cfg, globalPath):
+                    try:
+                        process_results(
+                            geometry_cfg=dict(curr_geometry_cfg, material=ctx.material),
+                            solver_cfg=ctx.solver_cfg,
+                            work_path=metrics_work_path(ctx.solver_cfg, globalPath),
+                            wbResults=wbResults,
+                            filename=outFileNameResult,
+                            sheet_short=sheet_short,
+                            begining_time=t_begin,
+                            fea_time=ctx.fea_time
+                        )
+                    except Exception as e:
+                        print(f'[material sweep] {ctx.material}: no results ({e})')
+    finally:
+        close_default_harvester()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+"""
+Synthetic Abaqus results files (.fil) for the tests of utils/fil_reader.py.
+
+A record is [length, key, attribute 1, ...] in 8-byte words: Python ints are written as int64,
+floats as float64. The word stream is cut into 512-word blocks, each wrapped in 4-byte Fortran
+record markers, as the binary .fil of Abaqus/Standard.
+"""
+import struct
+from typing import Dict, List, Sequence, Tuple, Union
+
+BLOCK_WORDS = 512
+
+Record = Tuple[int, Sequence[Union[int, float]]]
+
+
+def fil_bytes(records: List[Record]) -> bytes:
+    words = []
+    for key, attrs in records:
+        words += [len(attrs) + 2, key] + list(attrs)
+    data = b''.join(struct.pack('<q', w) if isinstance(w, int) else struct.pack('<d', w) for w in words)
+    block = BLOCK_WORDS * 8
+    data += b'\0' * (-len(data) % block)
+    marker = struct.pack('<i', block)
+    return b''.join(marker + data[i:i + block] + marker for i in range(0, len(data), block))
+
+
+def write_fil(path: str, records: List[Record]) -> str:
+    with open(path, 'wb') as f:
+        f.write(fil_bytes(records))
+    return path
+
+
+def increment_records(
+        time: float,
+        number: int,
+        step: int = 1,
+        stresses: Dict[int, Sequence[float]] = None,
+        displacements: Dict[int, Sequence[float]] = None,
+        coordinates: Dict[int, Sequence[float]] = None,
+        reactions: Dict[int, Sequence[float]] = None,
+        energies: Dict[str, float] = None,
+) -> List[Record]:
+    """
+    Records of one increment: 2000 (increment), per element 1 (header: ip 1, 3 direct and
+    3 shear components) + 11 (S), per node 101 (U), 107 (COORD), 104 (RF) and 1999 (energies).
+    """
+    out = [(2000, [float(time), float(time), 0.0, 0.0, 1, step, number, 0, 0.0, 0.0, 0.1] + [0.0] * 10)]
+    for element, s in (stresses or {}).items():
+        out.append((1, [element, 1, 0, 0, 0, 3, 3, 0, 0]))
+        out.append((11, [float(v) for v in s]))
+    for key, field in ((101, displacements), (107, coordinates), (104, reactions)):
+        for node, v in (field or {}).items():
+            out.append((key, [node] + [float(c) for c in v]))
+    if energies is not None:
+        # attributes of record 1999: ALLKE 1, ALLWK 3, ALLVD 6, ALLAE 8, ALLIE 11, ALLFD 13
+        slots = {'ALLKE': 1, 'ALLWK': 3, 'ALLVD': 6, 'ALLAE': 8, 'ALLIE': 11, 'ALLFD': 13}
+        attrs = [0.0] * 16
+        for name, value in energies.items():
+            attrs[slots[name] - 1] = float(value)
+        out.append((1999, attrs))
+    return out
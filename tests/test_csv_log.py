@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.csv_log import append_row, read_log
+from utils.runtime_predictor import log_runtime
+
+
+def _log_run(args):
+    log_path, i = args
+    log_runtime(log_path, {'n_nodes': float(i), 'cpus': 1.0}, None, 60.0, 1.0 + i, 'ok, "quoted"')
+
+
+def test_concurrent_appends_keep_every_row(tmp_path):
+    log_path = str(tmp_path / 'results' / 'runtime_log.csv')
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_log_run, [(log_path, i) for i in range(64)]))
+    table = read_log(log_path)
+    assert len(table) == 64
+    assert sorted(table['n_nodes']) == [float(i) for i in range(64)]
+    assert (table['message'] == 'ok, "quoted"').all()
+    assert table['predicted_min'].isna().all()
+
+
+def test_header_written_once_and_new_columns_merged(tmp_path):
+    log_path = str(tmp_path / 'log.csv')
+    append_row(log_path, {'a': 1, 'b': 2})
+    append_row(log_path, {'b': 3})
+    append_row(log_path, {'a': 4, 'c': 5})
+    with open(log_path) as f:
+        assert f.readline().strip() == 'a,b,c'
+    table = read_log(log_path)
+    assert table['a'].tolist()[::2] == [1, 4]
+    assert table['b'].tolist()[:2] == [2, 3]
+    assert table['c'].isna().tolist() == [True, True, False]
+
+
+def test_read_missing_log(tmp_path):
+    assert read_log(str(tmp_path / 'missing.csv')).empty
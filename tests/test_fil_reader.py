@@ -0,0 +1,137 @@
+import os
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils.fil_reader import read_records, fil_summary, write_fil_metrics
+from tests.fil_fixtures import write_fil, increment_records, BLOCK_WORDS
+
+TIMES = (0.25, 0.5, 0.75, 1.0)
+JOB = 'design'
+
+
+def _increment(t, number, step=1, allae_share=0.01):
+    # element 1: S11 = 100 t, element 2: S22 = 50 t; nodes 1, 2 at R = 10 move inwards by t, 2 t
+    allie = 100.0 + 10.0 * t
+    return increment_records(
+        t, number, step,
+        stresses={1: (100.0 * t, 0, 0, 0, 0, 0), 2: (0, 50.0 * t, 0, 0, 0, 0)},
+        displacements={1: (-t, 0.0, 0.0), 2: (0.0, -2.0 * t, 0.0)},
+        coordinates={1: (10.0 - t, 0.0, 0.0), 2: (0.0, 10.0 - 2.0 * t, 0.0)},
+        reactions={7: (1.0, 2.0, 2.0)},
+        energies={'ALLIE': allie, 'ALLWK': allie, 'ALLKE': 0.0, 'ALLAE': allae_share * allie})
+
+
+def _design_fil(path, step=1):
+    # artificial energy jumps to 10 % of ALLIE in the last increment: last stable is t = 0.75
+    records = []
+    for number, t in enumerate(TIMES, 1):
+        records += _increment(t, number, step, allae_share=0.1 if t == 1.0 else 0.01)
+    return write_fil(path, records)
+
+
+def _solver_cfg(**kwargs):
+    cfg = SimpleNamespace(
+        job_name_prefix=JOB, results_root='results', analysis='standard',
+        batch=SimpleNamespace(members=[]), load_cases=[],
+        outputs=SimpleNamespace(frame_time_for_metric=[0.5, 1.0, 1.3], mises_percentile=99, fil=True),
+        stability=SimpleNamespace(tau_k=0.05, tau_a=0.05, tau_delta=0.2, tau_e=None))
+    for key, value in kwargs.items():
+        setattr(cfg, key, value)
+    return cfg
+
+
+@pytest.fixture
+def work_path(tmp_path):
+    _design_fil(str(tmp_path / (JOB + '.fil')))
+    return str(tmp_path)
+
+
+def test_records_span_blocks(work_path):
+    fil_path = os.path.join(work_path, JOB + '.fil')
+    assert os.path.getsize(fil_path) % (BLOCK_WORDS * 8 + 8) == 0
+    rec = read_records(fil_path)
+    assert (rec.keys == 2000).sum() == len(TIMES)
+    assert (rec.keys == 11).sum() == 2 * len(TIMES)
+
+    # 20 increments (~1400 words): records cross the block boundaries and markers
+    times = np.linspace(0.05, 1.0, 20)
+    long_path = write_fil(os.path.join(work_path, 'long.fil'),
+                          [r for i, t in enumerate(times, 1) for r in _increment(float(t), i)])
+    rec = read_records(long_path)
+    assert len(rec.ints) > 2 * BLOCK_WORDS
+    assert (rec.keys == 2000).sum() == len(times)
+    assert (rec.keys == 1999).sum() == len(times)
+    assert rec.floats[rec.starts[rec.keys == 2000] + 2] == pytest.approx(times)
+
+
+def test_target_metrics(work_path):
+    summary, _ = fil_summary(os.path.join(work_path, JOB + '.fil'), _solver_cfg(), {'diameter': 20.0})
+    assert sorted(summary['targets']) == ['0.5', '1']    # 1.3 has no increment within tolerance
+    frame = summary['targets']['0.5']
+    assert frame['time'] == pytest.approx(0.5)
+    assert frame['mises_max'] == pytest.approx(50.0)
+    assert frame['mises_max_element'] == 1
+    assert frame['mises_p99'] == pytest.approx(np.percentile([50.0, 25.0], 99))
+    assert frame['rf'] == pytest.approx([1.0, 2.0, 2.0])
+    assert frame['rf_resultant'] == pytest.approx(3.0)
+    assert frame['rf_nodes'] == 1
+    assert frame['u1_max'] == pytest.approx(-0.5)
+    assert frame['u1_mean'] == pytest.approx(-0.75)
+    assert frame['diameter'] == pytest.approx(19.0)
+
+
+def test_last_stable_increment_and_energies(work_path):
+    summary, stability = fil_summary(os.path.join(work_path, JOB + '.fil'), _solver_cfg(), None)
+    assert summary['last_time'] == pytest.approx(0.75)
+    assert summary['last']['mises_max'] == pytest.approx(75.0)
+    assert summary['last']['diameter'] is None
+    energies = summary['energies']
+    assert energies['max_ALLAE_ALLIE'] == pytest.approx(0.1)
+    assert energies['last_ALLAE_ALLIE'] == pytest.approx(0.1)
+    assert energies['max_ALLKE_ALLIE'] == pytest.approx(0.0)
+    assert stability['RA'] == pytest.approx([0.01, 0.01, 0.01, 0.1])
+    assert stability['time'] == pytest.approx(TIMES)
+
+
+def test_looser_threshold_moves_last_increment(work_path):
+    cfg = _solver_cfg(stability=SimpleNamespace(tau_k=0.05, tau_a=0.2, tau_delta=0.2, tau_e=None))
+    summary, _ = fil_summary(os.path.join(work_path, JOB + '.fil'), cfg, None)
+    assert summary['last_time'] == pytest.approx(1.0)
+
+
+def test_write_fil_metrics(work_path):
+    assert write_fil_metrics(work_path, _solver_cfg(), {'diameter': 20.0})
+    res_path = os.path.join(work_path, 'results', JOB)
+    with open(os.path.join(res_path, 'metrics.json')) as f:
+        assert json.load(f)['last_time'] == pytest.approx(0.75)
+    assert os.path.exists(os.path.join(res_path, 'energies.csv'))
+    assert os.path.exists(os.path.join(res_path, 'stability.csv'))
+
+
+def test_no_main_step_increments(tmp_path):
+    fil_path = _design_fil(str(tmp_path / (JOB + '.fil')), step=2)
+    assert fil_summary(fil_path, _solver_cfg(), None) is None
+    assert not write_fil_metrics(str(tmp_path), _solver_cfg(), None)
+    assert not os.path.exists(tmp_path / 'results')
+
+
+@pytest.mark.parametrize('cfg', [
+    _solver_cfg(analysis='explicit'),
+    _solver_cfg(load_cases=[SimpleNamespace(name='release', time=1.0)]),
+    _solver_cfg(batch=SimpleNamespace(members=[('D0', 'design_0'), ('D1', 'design_1')])),
+], ids=['explicit', 'load_cases', 'batch'])
+def test_odb_parser_fallbacks(work_path, cfg):
+    assert not write_fil_metrics(work_path, cfg, None)
+    assert not os.path.exists(os.path.join(work_path, 'results'))
+
+
+def test_restart_fallback(work_path):
+    _design_fil(os.path.join(work_path, JOB + '_r1.fil'))
+    assert not write_fil_metrics(work_path, _solver_cfg(), None)
+
+
+def test_missing_fil(tmp_path):
+    assert not write_fil_metrics(str(tmp_path), _solver_cfg(), None)
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.job_scheduler import JobScheduler, TokenBudget, stage_shapes
+
+SHAPES = {'light': (1, 1), 'heavy': (2, 2)}
+
+
+class FakeTokenServer(TokenBudget):
+    """Стенд сервера лицензий: считает выдачи и пиковое число занятых токенов."""
+
+    def __init__(self, total):
+        super().__init__(total)
+        self.peak = 0
+        self.grants = 0
+
+    def try_acquire(self, n):
+        ok = super().try_acquire(n)
+        if ok:
+            self.grants += 1
+            self.peak = max(self.peak, self.used)
+        return ok
+
+
+def _record(ctx, stage):
+    # интервал работы стадии в воркере -> <log_dir>/<design>_<stage>.json
+    t0 = time.time()
+    time.sleep(ctx.sleep)
+    with open(os.path.join(ctx.log_dir, f'{ctx.name}_{stage}.json'), 'w') as f:
+        json.dump({'stage': stage, 'start': t0, 'end': time.time()}, f)
+    ctx.done.append(stage)
+    return ctx
+
+
+def light_stage(ctx):
+    return _record(ctx, 'light')
+
+
+def heavy_stage(ctx):
+    if ctx.fail:
+        raise ValueError(f'{ctx.name} diverged')
+    return _record(ctx, 'heavy')
+
+
+def _designs(tmp_path, n, sleep=0.05, fail=()):
+    return [SimpleNamespace(name=f'd{i}', log_dir=str(tmp_path), sleep=sleep, fail=i in fail, done=[],
+                            cost=float(i)) for i in range(n)]
+
+
+def _intervals(tmp_path):
+    out = []
+    for name in os.listdir(tmp_path):
+        with open(os.path.join(tmp_path, name)) as f:
+            out.append(json.load(f))
+    return out
+
+
+def test_cores_and_tokens_never_oversubscribed(tmp_path):
+    tokens = FakeTokenServer(3)
+    scheduler = JobScheduler(cores=3, tokens=tokens, shapes=SHAPES)
+    done = []
+    scheduler.run(_designs(tmp_path, 6), [('light', light_stage), ('heavy', heavy_stage)],
+                  on_done=lambda ctx, error: done.append((ctx.done, error)))
+
+    assert done == [(['light', 'heavy'], None)] * 6
+    assert tokens.peak <= 3 and tokens.used == 0 and tokens.grants == 12
+    assert scheduler.free_cores == 3
+    # занятые ядра/токены по фактическим интервалам стадий в воркерах
+    intervals = _intervals(tmp_path)
+    for probe in intervals:
+        t = probe['start'] + 1e-6
+        active = [SHAPES[i['stage']] for i in intervals if i['start'] <= t < i['end']]
+        assert sum(c for c, _ in active) <= 3
+        assert sum(k for _, k in active) <= 3
+
+
+def test_longest_first(tmp_path):
+    order = []
+    scheduler = JobScheduler(cores=1, shapes={'light': (1, 0)}, cost_fn=lambda stage, ctx: ctx.cost)
+    designs = _designs(tmp_path, 5, sleep=0.0)
+    designs[1].cost = designs[3].cost = 7.0
+    scheduler.run(designs, [('light', light_stage)], on_done=lambda ctx, error: order.append(ctx.name),
+                  max_inflight=5)
+    # все пять в очереди до первого запуска: по убыванию стоимости, равные — в порядке поступления
+    assert order == ['d1', 'd3', 'd4', 'd2', 'd0']
+
+
+def test_longest_first_among_fitting():
+    scheduler = JobScheduler(cores=2, tokens=FakeTokenServer(2), shapes=SHAPES,
+                             cost_fn=lambda stage, ctx: ctx)
+    stages = [('heavy', heavy_stage), ('light', light_stage)]
+    scheduler.free_cores = 1
+    scheduler._push(0, stages, 100.0)
+    scheduler._push(1, stages, 1.0)
+    scheduler._push(1, stages, 5.0)
+    # тяжёлая стадия не помещается в одно свободное ядро: берётся самая дорогая из помещающихся
+    assert scheduler._pop_fitting(stages)[3] == 5.0
+    assert scheduler._pop_fitting(stages) is None
+    assert sorted(item[3] for item in scheduler._queue) == [1.0, 100.0]
+    assert scheduler.free_cores == 0 and scheduler.tokens.used == 1
+
+
+def test_on_done_receives_stage_error(tmp_path):
+    results = {}
+    scheduler = JobScheduler(cores=2, tokens=FakeTokenServer(4), shapes=SHAPES)
+    scheduler.run(_designs(tmp_path, 3, sleep=0.0, fail=(1,)), [('light', light_stage), ('heavy', heavy_stage)],
+                  on_done=lambda ctx, error: results.update({ctx.name: (list(ctx.done), error)}))
+
+    assert sorted(results) == ['d0', 'd1', 'd2']
+    assert results['d0'] == (['light', 'heavy'], None)
+    done, error = results['d1']
+    assert isinstance(error, ValueError) and 'd1 diverged' in str(error)
+    # контекст упавшей стадии — тот, что был отдан в неё (после light)
+    assert done == ['light']
+    assert not os.path.exists(tmp_path / 'd1_heavy.json')
+    assert scheduler.tokens.used == 0 and scheduler.free_cores == 2
+
+
+def test_stats(tmp_path):
+    scheduler = JobScheduler(cores=2, tokens=FakeTokenServer(2), shapes=SHAPES)
+    stats = scheduler.run(_designs(tmp_path, 4), [('light', light_stage)], max_inflight=4)
+
+    assert set(stats) == {'wall_s', 'queue_depth_mean', 'queue_depth_max', 'core_utilisation',
+                          'token_utilisation'}
+    assert stats['wall_s'] >= 0.1
+    assert stats['queue_depth_max'] == 2
+    assert 0.0 <= stats['queue_depth_mean'] <= stats['queue_depth_max']
+    assert 0.3 < stats['core_utilisation'] <= 1.0
+    assert 0.3 < stats['token_utilisation'] <= 1.0
+
+
+def test_stage_larger_than_node():
+    with pytest.raises(ValueError):
+        JobScheduler(cores=1, tokens=TokenBudget(10), shapes=SHAPES)
+
+
+def test_stage_shapes_parse_without_token():
+    shapes = stage_shapes(SimpleNamespace(cpus=4), cae_tokens=1)
+    assert shapes['parse'] == (1, 0)
+    assert shapes['solve'] == (4, 8)  # int(5 * 4 ** 0.422)
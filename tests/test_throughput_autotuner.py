@@ -0,0 +1,62 @@
+import os
+import functools
+from types import SimpleNamespace
+
+import pytest
+
+from utils import throughput_autotuner
+from utils.throughput_autotuner import run_autotune, stub_solve
+
+# стаб решателя с долями секунды на дизайн: харнесс целиком за секунды
+FAST_STUB = functools.partial(stub_solve, serial_minutes=0.004, serial_fraction=0.3, startup_minutes=0.002)
+
+CONFIG_YAML = """solver:
+  cpus: 8
+  mp_mode: "threads"  # threads | mpi
+  parallel_jobs: 1
+  batch:
+    size: 1             # designs per Abaqus job
+"""
+
+
+def _failing_solve(inp_path, work_dir, job_name, cpus, mp_mode):
+    raise RuntimeError('solver is not available')
+
+
+@pytest.fixture
+def campaign(tmp_path, monkeypatch):
+    monkeypatch.setattr(throughput_autotuner, 'node_resources', lambda: (4, 64.0))
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(CONFIG_YAML)
+    solver_cfg = SimpleNamespace(work_root='abaqusWF', results_root='results', job_name_prefix='design')
+    tune_cfg = SimpleNamespace(cpus=[1, 2], mp_modes=['threads'], max_jobs=2, designs=4,
+                               mem_per_job_gb=1.0, batch_sizes=[1, 2])
+    return solver_cfg, tune_cfg, str(tmp_path), str(config_path)
+
+
+def test_stub_solve_without_deck(tmp_path):
+    assert FAST_STUB(str(tmp_path / 'missing.inp'), str(tmp_path), 'job', 1, 'threads') == 'ok'
+
+
+def test_autotune_picks_max_throughput(campaign):
+    solver_cfg, tune_cfg, global_path, config_path = campaign
+    chosen, table = run_autotune(solver_cfg, global_path, tune_cfg, config_path, solve_fn=FAST_STUB)
+
+    assert (table['ok'] == table['designs']).all()
+    best = table.loc[table['designs_per_hour'].idxmax()]
+    assert (chosen.jobs, chosen.cpus, chosen.mp_mode, chosen.batch) == \
+        (best['jobs'], best['cpus'], best['mp_mode'], best['batch'])
+    text = open(config_path).read()
+    assert f'  cpus: {chosen.cpus}\n' in text
+    assert f'  parallel_jobs: {chosen.jobs}\n' in text
+    assert f'    size: {chosen.batch}             # designs per Abaqus job\n' in text
+
+
+def test_autotune_keeps_config_when_nothing_succeeds(campaign):
+    solver_cfg, tune_cfg, global_path, config_path = campaign
+    chosen, table = run_autotune(solver_cfg, global_path, tune_cfg, config_path, solve_fn=_failing_solve)
+
+    assert chosen is None
+    assert (table['ok'] == 0).all()
+    assert open(config_path).read() == CONFIG_YAML
+    assert os.path.exists(os.path.join(global_path, 'abaqusWF', 'autotune_stub.inp'))
@@ -4,6 +4,7 @@ from abaqus import mdb
 from abaqusConstants import *
 from caeModules import *
 import json
+import os
 
 
 def load_json_utf8(path):
@@ -21,6 +22,23 @@ def as_tuple(x):
         return tuple(as_tuple(v) for v in x)
     return x
 
+def time_scale(solver_cfg):
+    """Explicit time scaling: model times = pseudo times of the config * solver_cfg.explicit.time_scaling."""
+    return float(getattr(getattr(solver_cfg, 'explicit', None), 'time_scaling', 1.0))
+
+
+def mass_scaling(solver_cfg):
+    """
+    massScaling of the load step: semi-automatic to the target stable increment
+    (explicit.target_dt), else by a fixed factor (explicit.mass_factor, 49 by default).
+    """
+    explicit_cfg = getattr(solver_cfg, 'explicit', None)
+    target_dt = getattr(explicit_cfg, 'target_dt', None)
+    if target_dt:
+        return ((SEMI_AUTOMATIC, MODEL, AT_BEGINNING, 0.0, float(target_dt), BELOW_MIN, 0, 0, 0.0, 0.0, 0, None),)
+    factor = float(getattr(explicit_cfg, 'mass_factor', None) or 49.0)
+    return ((SEMI_AUTOMATIC, MODEL, AT_BEGINNING, factor, 0.0, None, 0, 0, 0.0, 0.0, 0, None),)
+
 ## Model
 # create model
 def connector(
@@ -30,6 +48,8 @@ def connector(
         material_prop = None,
         solver_cfg = None
     ):
+    job_name = str(solver_cfg.job_name_prefix)
+    scale = time_scale(solver_cfg)
     model = mdb.Model('Compress_frame')
     if 'Model-1' in mdb.models.keys():
         mdb.__delattr__('Model-1')
@@ -49,7 +69,9 @@ def connector(
     part.PartitionFaceByDatumPlane(datumPlane=part.datums[datumPlane.id], faces=part.faces)
 
     # import frame from STEP
-    geom_file = mdb.openStep(fileName=str('../geoms/'+solver_cfg.job_name_prefix+'.stp'))
+    # STEP from cad_drawer; absolute geoms_root lets the job run outside the project tree (scratch)
+    geoms_root = str(getattr(solver_cfg, 'geoms_root', '../geoms'))
+    geom_file = mdb.openStep(fileName=str(os.path.join(geoms_root, solver_cfg.job_name_prefix + '.stp')))
     part2 = model.PartFromGeometryFile(name='FRAME', geometryFile=geom_file, dimensionality=THREE_D, type=DEFORMABLE_BODY)
 
     ## Mesh balloon
@@ -201,9 +223,8 @@ def connector(
         name=str(solver_cfg.step_name),
         previous='Initial',
         description='',
-        timePeriod=solver_cfg.step_time,
-        massScaling=((SEMI_AUTOMATIC, MODEL, AT_BEGINNING, 49.0, 0.0, None, 0, 0,
-                      0.0, 0.0, 0, None),),
+        timePeriod=float(solver_cfg.step_time) * scale,
+        massScaling=mass_scaling(solver_cfg),
         timeIncrementationMethod=AUTOMATIC_GLOBAL,
         improvedDtMethod=ON,
     )
@@ -217,7 +238,7 @@ def connector(
         _time_num_points + 1
     )
     _time_points_array = np.round(_time_points_array, 6)
-    points_seq = tuple((float(t),) for t in _time_points_array.tolist())
+    points_seq = tuple((float(t) * scale,) for t in _time_points_array.tolist())
     model.TimePoint(name='tp', points=points_seq)
 
     model.FieldOutputRequest(
@@ -232,7 +253,7 @@ def connector(
     ## Boundary condition
     # create Amplitude
     amp_name = 'Ampl-compress'
-    model.TabularAmplitude(name=amp_name, data=((0, 0), (0.75, 1), (1, 0.75),), )
+    model.TabularAmplitude(name=amp_name, data=((0, 0), (0.75 * scale, 1), (1 * scale, 0.75),), )
     # define boundary to set BC
     expanding_disp = model.rootAssembly.instances['balloon'].sets['set-all']
     # create BC in specific coordinate system
@@ -264,10 +285,10 @@ def connector(
                          mechanicalConstraint=KINEMATIC)
 
     ## Job
-    job = mdb.Job(name='a_Ballon_compress_expl', model='Compress_frame', numCpus=int(solver_cfg.cpus), numDomains=int(solver_cfg.cpus), multiprocessingMode=THREADS)
+    job = mdb.Job(name=job_name, model='Compress_frame', numCpus=int(solver_cfg.cpus), numDomains=int(solver_cfg.cpus), multiprocessingMode=THREADS)
     job.writeInput()
     # Save abaqus cae
-    mdb.saveAs('a_compression_expl.cae')
+    mdb.saveAs(job_name + '.cae')
     ## Submit the job
     #
     # job.submit()
@@ -303,8 +324,9 @@ if __name__ == "__main__":
 
     data = load_json_utf8(json_arg)
 
-    frame_dia = float(data.get("frame_dia", 29.0))
-    frame_length = float(data.get("frame_length", 30.0))
+    # payload of connector_console: geometry_cfg + frame_lenght
+    frame_dia = float(data.get("geometry_cfg", {}).get("diameter", data.get("frame_dia", 29.0)))
+    frame_length = float(data.get("frame_lenght", data.get("frame_length", 30.0)))
     material_model = str(data.get("material_model", "linear"))
     material_prop = _ns(data.get("material_prop", {}))
     solver_cfg = _ns(data.get("solver_cfg", {}))
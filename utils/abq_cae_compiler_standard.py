@@ -5,6 +5,7 @@ from abaqusConstants import *
 from caeModules import *
 import math
 import json
+import os
 
 _ADPTIVE_MESH = False
 
@@ -86,6 +87,29 @@ def spiral_on_cylinder(frame_rad, frame_length, pitch_mm=0.5, step=0.2,
 
 ## Model
 # create model
+# StaticStep controls shared by all designs unless the increment tuner passes its own
+STEP_CONTROLS = {
+    'initial_inc': 0.01,
+    'min_inc': 1e-6,
+    'max_inc': 0.1,
+    'stabilization': 2e-4,
+    'damping_ratio': 0.05,
+}
+
+
+def step_controls(solver_cfg):
+    """
+    StaticStep increment and stabilisation controls: STEP_CONTROLS (initial increment capped by
+    the output interval) overridden by solver_cfg.step_controls from the increment tuner.
+    """
+    out = dict(STEP_CONTROLS)
+    out['initial_inc'] = min(out['initial_inc'], float(solver_cfg.outputs.time_interval))
+    tuned = getattr(solver_cfg, 'step_controls', None)
+    if tuned is not None:
+        out.update(dict((k, float(v)) for k, v in vars(tuned).items()))
+    return out
+
+
 def connector(
         frame_dia = 29,
         frame_length = 30,
@@ -112,7 +136,9 @@ def connector(
     part.PartitionFaceByDatumPlane(datumPlane=part.datums[datumPlane.id], faces=part.faces)
     part.setMeshControls(regions=part.cells, elemShape=HEX, technique=STRUCTURED)
     # import frame from STEP
-    geom_file = mdb.openStep(fileName=str('../geoms/'+solver_cfg.job_name_prefix+'.stp'))
+    # STEP from cad_drawer; absolute geoms_root lets the job run outside the project tree (scratch)
+    geoms_root = str(getattr(solver_cfg, 'geoms_root', '../geoms'))
+    geom_file = mdb.openStep(fileName=str(os.path.join(geoms_root, solver_cfg.job_name_prefix + '.stp')))
     part2 = model.PartFromGeometryFile(name='FRAME', geometryFile=geom_file, dimensionality=THREE_D, type=DEFORMABLE_BODY)
 
     ## Mesh balloon
@@ -252,14 +278,22 @@ def connector(
     part2.SectionAssignment(region=part2.sets['set-cells'], sectionName='section_frame')
 
     ## Step
+    controls = step_controls(solver_cfg)
     model.StaticStep(name=str(solver_cfg.step_name), previous='Initial', description='',
                      timePeriod=solver_cfg.step_time, timeIncrementationMethod=AUTOMATIC,
                      maxNumInc=1000,
-                     initialInc=(0.01 if 0.01<solver_cfg.outputs.time_interval else solver_cfg.outputs.time_interval),
-                     minInc=1E-06,
-                     maxInc=0.1,
+                     initialInc=controls['initial_inc'],
+                     minInc=controls['min_inc'],
+                     maxInc=controls['max_inc'],
                      nlgeom=ON,
-                     stabilizationMethod=DISSIPATED_ENERGY_FRACTION)
+                     stabilizationMethod=DISSIPATED_ENERGY_FRACTION,
+                     stabilizationMagnitude=controls['stabilization'],
+                     adaptiveDampingRatio=controls['damping_ratio'])
+    recovery_cfg = getattr(solver_cfg, 'recovery', None)
+    if getattr(recovery_cfg, 'enabled', False):
+        # restart data at time marks (last one kept) for resubmission after divergence
+        model.steps[str(solver_cfg.step_name)].Restart(numberIntervals=int(recovery_cfg.restart_intervals),
+                                                       overlay=ON, timeMarks=ON)
 
     ## Output request
 
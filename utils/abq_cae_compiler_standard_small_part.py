@@ -7,6 +7,7 @@ from abaqusConstants import *
 from caeModules import *
 import math
 import json
+import os
 
 ##
 _ADPTIVE_MESH = False
@@ -164,6 +165,471 @@ def spiral_on_cylinder(frame_rad, frame_length, pitch_mm=0.5, step=0.2,
 
     return pts
 
+def load_mesh_features(path):
+    """Read feature points written by cad_drawer.model_drawer (``<job>_features.json``)."""
+    if not os.path.isfile(path):
+        return []
+    return load_json_utf8(path).get('points', [])
+
+
+# getCurvature failures already reported (straight or degenerate edges fail on every call)
+_CURVATURE_ERRORS = set()
+
+
+def _is_feature_edge(edge, features, feature_radius, curvature_radius):
+    """
+    Decide whether an edge needs the fine seed.
+
+    An edge is "feature" if its midpoint lies within `feature_radius` (measured along the
+    unrolled mid-surface the points were placed on: arc length at the point's radius x axial
+    coordinate, angle wrapped across the +-pi seam) of any crown/fillet/arc control point,
+    or if its curvature radius is below `curvature_radius`.
+    """
+    x, y, z = edge.pointOn[0]
+    theta = math.atan2(y, x)
+    for f in features:
+        d_theta = (theta - math.atan2(f['y'], f['x']) + math.pi) % (2.0 * math.pi) - math.pi
+        ds = math.hypot(f['x'], f['y']) * d_theta
+        dz = z - f['z']
+        if ds * ds + dz * dz <= feature_radius * feature_radius:
+            return True
+    try:
+        curv = edge.getCurvature(parameter=0.5)
+    except Exception as e:
+        # no curvature for this edge: report each kind of failure once, decide by distance only
+        if str(e) not in _CURVATURE_ERRORS:
+            _CURVATURE_ERRORS.add(str(e))
+            print(" ***getCurvature failed (edges without curvature use the feature distance only): " + str(e))
+        return False
+    return 0.0 < curv['radius'] < curvature_radius
+
+
+def seed_by_features(part, features, coarse_size, fine_size,
+                     feature_radius=0.5, curvature_radius=1.0):
+    """
+    Local sizing field: coarse global seed, fine seed on edges near crowns, fillets and
+    high-curvature arcs. Returns the number of refined edges.
+    """
+    part.seedPart(size=coarse_size, deviationFactor=0.1)
+    n_fine = 0
+    for i, edge in enumerate(part.edges):
+        if _is_feature_edge(edge, features, feature_radius, curvature_radius):
+            part.seedEdgeBySize(edges=part.edges[i:i + 1], size=fine_size,
+                                deviationFactor=0.1, constraint=FINER)
+            n_fine += 1
+    return n_fine
+
+# seed sizes the frame was actually meshed with, next to the design's metrics (mesh_convergence.py)
+MESH_NAME = 'mesh.json'
+
+
+def write_mesh_record(solver_cfg, seed_size, fine_seed_size=None):
+    """
+    <results_root>/<job>/mesh.json with the seeds of the generated mesh: the mesh-error loop may
+    shrink solver.mesh.seed_size, so the configured value is not always the meshed one.
+    """
+    res_path = os.path.join(str(solver_cfg.results_root), str(solver_cfg.job_name_prefix))
+    if not os.path.exists(res_path):
+        os.makedirs(res_path)
+    with open(os.path.join(res_path, MESH_NAME), 'w') as f:
+        json.dump({'seed_size': seed_size, 'fine_seed_size': fine_seed_size}, f, indent=1, sort_keys=True)
+
+# design metrics (solver.outputs.metrics) -> field output abq_parse_results reads for them:
+# (instance, set, variable, output position). RF of rigid loaders comes from the reference-point
+# history of load_rigid_jaws instead of the balloon nodes.
+METRIC_OUTPUTS = {
+    'S_mises': ('FRAME', 'set-cells', 'S', INTEGRATION_POINTS),
+    'Diameter': ('FRAME', 'set-cells', 'U', NODES),
+    'RF': ('balloon', 'set-all', 'RF', NODES),
+}
+DEFAULT_METRICS = ('S_mises', 'RF', 'Diameter')
+# nodal variables of outputs.field_outputs, requested at NODES in full mode
+NODAL_VARIABLES = ('U', 'V', 'A', 'RF', 'RM', 'UR', 'CF', 'COORD', 'NT')
+ENERGY_HISTORY = ('ALLWK', 'ALLIE', 'ALLKE', 'ALLAE', 'ALLVD', 'ALLFD')   # energy balance: utils/abq_stability.py
+
+
+# StaticStep controls shared by all designs unless the increment tuner passes its own
+STEP_CONTROLS = {
+    'initial_inc': 0.01,
+    'min_inc': 1e-8,
+    'max_inc': 0.1,
+    'stabilization': 2e-4,
+    'damping_ratio': 0.05,
+}
+
+
+def step_controls(solver_cfg):
+    """
+    StaticStep increment and stabilisation controls: STEP_CONTROLS (initial increment capped by
+    the output interval) overridden by solver_cfg.step_controls from the increment tuner.
+    """
+    out = dict(STEP_CONTROLS)
+    out['initial_inc'] = min(out['initial_inc'], float(solver_cfg.outputs.time_interval))
+    tuned = getattr(solver_cfg, 'step_controls', None)
+    if tuned is not None:
+        out.update(dict((k, float(v)) for k, v in vars(tuned).items()))
+    return out
+
+
+def time_scale(solver_cfg):
+    """
+    Explicit time scaling: model times = pseudo times of the config (step_time, output intervals,
+    amplitudes, load cases) * solver_cfg.explicit.time_scaling. 1 for Standard.
+    """
+    if str(getattr(solver_cfg, 'analysis', 'standard')) != 'explicit':
+        return 1.0
+    return float(getattr(getattr(solver_cfg, 'explicit', None), 'time_scaling', 1.0))
+
+
+def mass_scaling(solver_cfg):
+    """
+    massScaling of the explicit load step: semi-automatic to the target stable increment
+    (explicit.target_dt), else by a fixed factor (explicit.mass_factor), else none.
+    """
+    explicit_cfg = getattr(solver_cfg, 'explicit', None)
+    target_dt = getattr(explicit_cfg, 'target_dt', None)
+    factor = getattr(explicit_cfg, 'mass_factor', None)
+    if target_dt:
+        return ((SEMI_AUTOMATIC, MODEL, AT_BEGINNING, 0.0, float(target_dt), BELOW_MIN, 0, 0, 0.0, 0.0, 0, None),)
+    if factor:
+        return ((SEMI_AUTOMATIC, MODEL, AT_BEGINNING, float(factor), 0.0, None, 0, 0, 0.0, 0.0, 0, None),)
+    return PREVIOUS_STEP
+
+
+def output_time_points(step_time, time_interval, metric_times=()):
+    """
+    Uniform grid 0..step_time with `time_interval` merged with the metric times.
+
+    Returns
+    -------
+    tuple
+        ((t0,), (t1,), ...) sorted, without duplicates, as expected by model.TimePoint.
+    """
+    n = int(round(float(step_time) / float(time_interval)))
+    grid = np.linspace(0.0, n * float(time_interval), n + 1)
+    grid = np.concatenate([grid, np.asarray([float(t) for t in metric_times], dtype=float)])
+    grid = np.unique(np.round(grid[(grid >= 0.0) & (grid <= float(step_time) + 1e-9)], 6))
+    return tuple((float(t),) for t in grid.tolist())
+
+
+def metric_outputs(solver_cfg):
+    """
+    [(instance, set, variable, position)] of the metrics in solver_cfg.outputs.metrics
+    (METRIC_OUTPUTS, all metrics by default), without duplicates.
+    """
+    metrics = [str(m) for m in getattr(solver_cfg.outputs, 'metrics', DEFAULT_METRICS)]
+    unknown = [m for m in metrics if m not in METRIC_OUTPUTS]
+    if unknown:
+        raise ValueError('Unknown outputs.metrics %s, expected %s' % (unknown, list(METRIC_OUTPUTS)))
+    out = []
+    for m in metrics:
+        if METRIC_OUTPUTS[m] not in out:
+            out.append(METRIC_OUTPUTS[m])
+    return out
+
+
+def request_outputs(model, solver_cfg):
+    """
+    Field and history output requests of the load step.
+
+    Full mode (default): solver_cfg.outputs.field_outputs on the whole model every `time_interval`,
+    element variables at integration points and nodal ones (NODAL_VARIABLES) at nodes.
+    Lean mode (outputs.lean): only the variables abq_parse_results reads for outputs.metrics --
+    S on the FRAME cells for S_mises, U on the FRAME nodes for Diameter, RF on the balloon nodes
+    for RF (METRIC_OUTPUTS) -- at the metric times plus a coarse grid (`lean_time_interval`) that
+    keeps enough frames for the last-stable-frame search. Energy histories are kept in both modes.
+    """
+    step_name = str(solver_cfg.step_name)
+    outputs = solver_cfg.outputs
+    metric_times = list(getattr(outputs, 'frame_time_for_metric', []))
+    lean = bool(getattr(outputs, 'lean', False))
+    scale = time_scale(solver_cfg)
+
+    if not lean:
+        points = output_time_points(solver_cfg.step_time, outputs.time_interval)
+        model.TimePoint(name='tp', points=tuple((t * scale,) for (t,) in points))
+        variables = [str(v) for v in outputs.field_outputs]
+        for name, position, group in (('Field-Output-1', INTEGRATION_POINTS,
+                                       [v for v in variables if v not in NODAL_VARIABLES]),
+                                      ('Field-Output-nodal', NODES,
+                                       [v for v in variables if v in NODAL_VARIABLES])):
+            if group:
+                model.FieldOutputRequest(name=name,
+                                         createStepName=step_name,
+                                         timePoint='tp',
+                                         timeMarks=ON,
+                                         position=position,
+                                         variables=group)
+    else:
+        lean_interval = float(getattr(outputs, 'lean_time_interval', 0.1))
+        points = output_time_points(solver_cfg.step_time, lean_interval, metric_times)
+        model.TimePoint(name='tp', points=tuple((t * scale,) for (t,) in points))
+        requested = metric_outputs(solver_cfg)
+        for inst_name, set_name, variable, position in requested:
+            if inst_name not in model.rootAssembly.instances.keys():
+                continue    # rigid loaders: RF comes from the reference-point history
+            model.FieldOutputRequest(name='Field-Output-%s-%s' % (inst_name, variable),
+                                     createStepName=step_name,
+                                     timePoint='tp',
+                                     timeMarks=ON,
+                                     position=position,
+                                     region=model.rootAssembly.instances[inst_name].sets[set_name],
+                                     variables=(variable,))
+        dropped = [str(v) for v in outputs.field_outputs if str(v) not in [r[2] for r in requested]]
+        print(" ***Lean outputs: metric times " + str(metric_times) + ", metric variables "
+              + str([r[2] for r in requested]) + ", dropped variables " + str(dropped))
+
+    model.HistoryOutputRequest(
+        name='History-Output-stable_check',
+        createStepName=step_name,
+        variables=ENERGY_HISTORY,
+        region=MODEL,        # whole-assembly history region
+        timeInterval=float(outputs.time_interval) * scale,
+        timeMarks=ON         # write time marks
+    )
+
+
+def request_fil_outputs(model, solver_cfg):
+    """
+    Results-file (.fil) requests of the load step for utils/fil_reader.py (outputs.fil), for the
+    configured outputs.metrics: S on the FRAME cells, U and COORD on their nodes, RF on the balloon
+    (rigid loaders: reference points), plus the whole-model energies every `fil_frequency` increments.
+    Standard only: the keywords are inserted into the keyword block before the step's *End Step.
+    """
+    outputs = solver_cfg.outputs
+    if not bool(getattr(outputs, 'fil', False)) or str(getattr(solver_cfg, 'analysis', 'standard')) == 'explicit':
+        return
+    freq = int(getattr(outputs, 'fil_frequency', 1))
+    variables = [r[2] for r in metric_outputs(solver_cfg)]
+    if 'balloon' in model.rootAssembly.instances.keys():
+        rf_set = 'balloon.set-all'
+    else:
+        rf_set = 'set-rp'
+    lines = []
+    if 'S' in variables:
+        lines += ['*EL FILE, ELSET=FRAME.set-cells, FREQUENCY=%d' % freq, 'S']
+    if 'U' in variables:
+        lines += ['*NODE FILE, NSET=FRAME.set-cells, FREQUENCY=%d' % freq, 'U, COORD']
+    if 'RF' in variables:
+        lines += ['*NODE FILE, NSET=%s, FREQUENCY=%d' % (rf_set, freq), 'RF']
+    text = '\n'.join(lines + ['*ENERGY FILE, FREQUENCY=%d' % freq])
+
+    block = model.keywordBlock
+    block.synchVersions(storeNodesAndElements=False)
+    step_name = str(solver_cfg.step_name).lower()
+    in_step = False
+    for i, kw in enumerate(block.sieBlocks):
+        head = kw.strip().lower()
+        if head.startswith('*step') and 'name=' + step_name in head.replace(' ', ''):
+            in_step = True
+        elif in_step and head.startswith('*end step'):
+            block.insert(i - 1, text)
+            return
+    raise RuntimeError('request_fil_outputs: *Step name=%s not found in the keyword block' % solver_cfg.step_name)
+
+
+def _face_frame(face, frame_rad):
+    """
+    Face centroid and unit normal in unrolled (s = R*theta, z) coordinates.
+
+    Returns
+    -------
+    tuple or None
+        (s, z, ns, nz) or None if Abaqus cannot evaluate the normal of this face.
+    """
+    try:
+        c = face.getCentroid()
+        c = c[0] if hasattr(c[0], '__len__') else c
+        n = face.getNormal()
+    except Exception:
+        return None
+    theta = math.atan2(c[1], c[0])
+    ns = -math.sin(theta) * n[0] + math.cos(theta) * n[1]
+    nz = n[2]
+    norm = math.sqrt(ns * ns + nz * nz)
+    if norm < 1e-6:     # radial face (outer/inner skin), cannot touch a neighbour strut
+        return None
+    return frame_rad * theta, c[2], ns / norm, nz / norm
+
+
+def prune_self_contact(part, surface_name, frame_rad, thk, phi_rad, radius_ratio,
+                       axial_margin=0.2, contact_margin=0.05, cos_opposing=0.5):
+    """
+    Faces of `surface_name` that can touch another face of the frame under radial compression.
+
+    Radial compression to `radius_ratio` of the initial radius closes at most
+    (1 - radius_ratio) * C of circumferential gap per sector (C = R * phi, struts keep their
+    width). Axial closure is bounded by `axial_margin`. A pair of faces with opposing normals
+    that face each other is kept if its normal gap fits into this closure (+ `contact_margin`)
+    and the faces overlap laterally.
+
+    Returns
+    -------
+    list of int
+        Indices (in part.faces) of the faces that belong to at least one candidate pair.
+        None if the surface cannot be analysed (the full surface is used then).
+    """
+    closure_s = (1.0 - radius_ratio) * frame_rad * phi_rad
+    faces = part.surfaces[surface_name].faces
+    data = []
+    for face in faces:
+        fr = _face_frame(face, frame_rad)
+        if fr is None:
+            continue
+        try:
+            half_len = 0.5 * face.getSize(printResults=False) / thk
+        except Exception:
+            half_len = 0.5 * frame_rad * phi_rad
+        data.append((face.index, fr, half_len))
+    if not data:
+        return None
+
+    keep = set()
+    for i in range(len(data)):
+        idx_i, (si, zi, nsi, nzi), li = data[i]
+        for j in range(i + 1, len(data)):
+            idx_j, (sj, zj, nsj, nzj), lj = data[j]
+            if nsi * nsj + nzi * nzj > -cos_opposing:
+                continue
+            ds, dz = sj - si, zj - zi
+            gap = ds * nsi + dz * nzi
+            # i must face j (normals point out of the material)
+            if gap < -contact_margin or ds * nsj + dz * nzj > contact_margin:
+                continue
+            lateral = abs(-ds * nzi + dz * nsi)
+            if lateral > li + lj + axial_margin:
+                continue
+            closure = abs(nsi) * closure_s + abs(nzi) * axial_margin + contact_margin
+            if gap <= closure:
+                keep.add(idx_i)
+                keep.add(idx_j)
+    return sorted(keep)
+
+
+LOADING_MODELS = ('membrane', 'rigid_cylinder', 'crimper')
+
+
+def build_rigid_jaws(model, loading_model, phi_rad, start_rad, frame_length, segments):
+    """
+    Analytic rigid loaders around the frame sector, each with its own reference point.
+
+    The sector [0, phi] is split into `segments` jaws. 'rigid_cylinder' jaws are arcs of the
+    starting cylinder (radius `start_rad`), 'crimper' jaws are flat plates tangent to it. A rigid
+    cylinder cannot shrink as one rigid body, so both models move every jaw radially along
+    its own bisector; with segments=1 'rigid_cylinder' is a single rigid arc.
+
+    Returns
+    -------
+    list of (str, float, int)
+        (instance name, bisector angle [rad], reference point id) per jaw.
+    """
+    width = phi_rad / float(segments)
+    overlap = 0.1 * width          # jaws overlap so the frame never slips between them
+    jaws = []
+    for k in range(segments):
+        a = (k + 0.5) * width
+        a0, a1 = a - 0.5 * width - overlap, a + 0.5 * width + overlap
+        name = 'jaw-' + str(k)
+        sketch = model.ConstrainedSketch(name=name, sheetSize=4.0 * start_rad)
+        if loading_model == 'rigid_cylinder':
+            sketch.ArcByCenterEnds(center=(0, 0),
+                                   point1=(start_rad * math.cos(a0), start_rad * math.sin(a0)),
+                                   point2=(start_rad * math.cos(a1), start_rad * math.sin(a1)),
+                                   direction=COUNTERCLOCKWISE)
+        else:
+            half = start_rad * math.tan(0.5 * width + overlap)
+            c, t = (start_rad * math.cos(a), start_rad * math.sin(a)), (-math.sin(a), math.cos(a))
+            sketch.Line(point1=(c[0] - half * t[0], c[1] - half * t[1]),
+                        point2=(c[0] + half * t[0], c[1] + half * t[1]))
+        part = model.Part(name=name, dimensionality=THREE_D, type=ANALYTIC_RIGID_SURFACE)
+        # symmetric about the sketch plane: z in [-frame_length, frame_length], as the balloon
+        part.AnalyticRigidSurfExtrude(sketch=sketch, depth=2.0 * frame_length)
+        rp_id = part.ReferencePoint(point=(start_rad * math.cos(a), start_rad * math.sin(a), 0.0)).id
+        part.Surface(name='surface-contact', side2Faces=part.faces)
+        model.rootAssembly.Instance(name=name, part=part, dependent=ON)
+        jaws.append((name, a, rp_id))
+    return jaws
+
+
+def load_rigid_jaws(model, jaws, step_name, amp_name, radial_travel):
+    """Radial DisplacementBC on the jaw reference points; RP set 'set-rp' + RF/U history for the parser."""
+    asm = model.rootAssembly
+    rps = []
+    for name, a, rp_id in jaws:
+        rp = asm.instances[name].referencePoints[rp_id]
+        rps.append(rp)
+        model.DisplacementBC(name='BC-' + name, createStepName=step_name, amplitude=amp_name,
+                             region=r.Region(referencePoints=(rp,)),
+                             u1=-radial_travel * math.cos(a), u2=-radial_travel * math.sin(a), u3=0,
+                             ur1=0, ur2=0, ur3=0)
+    asm.Set(name='set-rp', referencePoints=tuple(rps))
+    return asm.sets['set-rp']
+
+
+def add_explicit_contacts(model, step_name, frame_surface, self_contact_surface, loaders):
+    """
+    Explicit counterparts of the Standard contacts: frame against each loader (balloon or rigid
+    jaws, loader as master) and frame self-contact, penalty enforcement (kinematic contact
+    with a rigid master and mass scaling gives noisy reaction forces).
+    """
+    for name in loaders:
+        model.SurfaceToSurfaceContactExp(name='contact_' + name, createStepName=step_name,
+                                         master=model.rootAssembly.instances[name].surfaces['surface-contact'],
+                                         slave=frame_surface,
+                                         sliding=FINITE,
+                                         interactionProperty='InterProp',
+                                         mechanicalConstraint=PENALTY)
+    model.SelfContactExp(name='self-contact-frame', createStepName=step_name,
+                         surface=self_contact_surface,
+                         interactionProperty='InterProp',
+                         mechanicalConstraint=PENALTY)
+
+
+def add_load_cases(model, solver_cfg, loaded_bcs, controls):
+    """
+    Extra static (explicit: dynamic) steps after the main step, one per solver_cfg.load_cases entry
+    (crimp to catheter, release, self-expansion ...), sharing the model, mesh and contacts.
+
+    Each case has a `name`, a step `time` and `levels` [[step time, level], ...]: the loader
+    travel of the main step (level 1) scaled by its own amplitude. Levels should start where
+    the previous step ended (Ampl-compress ends at 0.75). The last increment of each case is
+    always written to the ODB for the per-case metrics.
+
+    Returns
+    -------
+    list of str
+        Names of the created steps.
+    """
+    names = []
+    previous = str(solver_cfg.step_name)
+    scale = time_scale(solver_cfg)
+    for case in getattr(solver_cfg, 'load_cases', None) or []:
+        name = str(case.name)
+        if str(getattr(solver_cfg, 'analysis', 'standard')) == 'explicit':
+            # mass scaling of the load step carries over (PREVIOUS_STEP)
+            model.ExplicitDynamicsStep(name=name, previous=previous, timePeriod=float(case.time) * scale,
+                                       improvedDtMethod=ON, nlgeom=ON)
+        else:
+            model.StaticStep(name=name, previous=previous, timePeriod=float(case.time),
+                             timeIncrementationMethod=AUTOMATIC, maxNumInc=10000,
+                             initialInc=min(controls['initial_inc'], float(case.time)),
+                             minInc=controls['min_inc'],
+                             maxInc=min(controls['max_inc'], float(case.time)),
+                             nlgeom=ON,
+                             stabilizationMethod=DISSIPATED_ENERGY_FRACTION,
+                             stabilizationMagnitude=controls['stabilization'],
+                             adaptiveDampingRatio=controls['damping_ratio'])
+        amp_name = 'Ampl-' + name
+        model.TabularAmplitude(name=amp_name, data=tuple((float(t) * scale, float(v)) for t, v in case.levels))
+        for bc_name, components in loaded_bcs:
+            model.boundaryConditions[bc_name].setValuesInStep(stepName=name, amplitude=amp_name, **components)
+        model.FieldOutputRequest(name='Field-Output-' + name, createStepName=name,
+                                 variables=('S', 'U', 'RF'), frequency=LAST_INCREMENT)
+        names.append(name)
+        previous = name
+    return names
+
+
 ## Model
 # create model
 def connector(
@@ -179,60 +645,77 @@ def connector(
     #     del mdb.Model['Model-1']
     balloon_rad = (geometry_cfg.diameter+0.4) / 2
     frame_rad = geometry_cfg.diameter / 2
-    sketch_balloon = model.ConstrainedSketch(name='balloon', sheetSize=1.0)
+    loading_cfg = getattr(solver_cfg, 'loading', None)
+    loading_model = str(getattr(loading_cfg, 'model', 'membrane'))
+    if loading_model not in LOADING_MODELS:
+        raise ValueError('solver.loading.model must be one of ' + str(LOADING_MODELS) + ', got ' + loading_model)
+    # radial travel of the loader (the balloon BC before)
+    radial_travel = balloon_rad - 3
+    # Abaqus/Explicit on the same sector model (solver.analysis, chosen per design by solver_selector)
+    explicit = str(getattr(solver_cfg, 'analysis', 'standard')) == 'explicit'
+    scale = time_scale(solver_cfg)
 
     phi_deg = 360.0 / float(geometry_cfg.repeat)
     phi_rad = math.radians(phi_deg)
     half = 0.5 * phi_rad
-
-    p1 = (balloon_rad * math.cos(0), balloon_rad * math.sin(0))
-    p2 = (balloon_rad * math.cos(phi_rad), balloon_rad * math.sin(phi_rad))
     p_half = (balloon_rad * math.cos(half), balloon_rad * math.sin(half))
 
-    sketch_balloon.ArcByCenterEnds(center=(0, 0), point1=p1, point2=p2, direction=COUNTERCLOCKWISE)
+    if loading_model == 'membrane':
+        sketch_balloon = model.ConstrainedSketch(name='balloon', sheetSize=1.0)
 
 
-    # set part
-    part = model.Part(name='ballon', dimensionality=THREE_D, type=DEFORMABLE_BODY)
+        p1 = (balloon_rad * math.cos(0), balloon_rad * math.sin(0))
+        p2 = (balloon_rad * math.cos(phi_rad), balloon_rad * math.sin(phi_rad))
+
+        sketch_balloon.ArcByCenterEnds(center=(0, 0), point1=p1, point2=p2, direction=COUNTERCLOCKWISE)
+
+
+        # set part
+        part = model.Part(name='ballon', dimensionality=THREE_D, type=DEFORMABLE_BODY)
+
+        # extrude sketch
+        part.BaseShellExtrude(sketch=sketch_balloon, depth=frame_length*2)
+        # mdb.saveAs('a_compression.cae')
+        # create partition
+        # datumPlane = part.DatumPlaneByPrincipalPlane(principalPlane=XZPLANE, offset=0.0)
+        # part.PartitionFaceByDatumPlane(datumPlane=part.datums[datumPlane.id], faces=part.faces)
+        part.setMeshControls(regions=part.cells, elemShape=HEX, technique=STRUCTURED)
+
+        ## Mesh balloon
+        # set elem type
+        part.setElementType(regions=(part.faces,),
+                            elemTypes=[mesh.ElemType(elemCode=SFM3D4R, elemLibrary=EXPLICIT) if explicit
+                                       else mesh.ElemType(elemCode=SFM3D4)])
+
+        # set number of element per edge
+        part.seedPart(size=0.2, deviationFactor=0.1)
+        # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((balloon_rad, 0, frame_length),)), number=1)
+        # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((-balloon_rad, 0, frame_length),)), number=1)
+        # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=(
+        #     (0, balloon_rad, 0.0),
+        #     (0, balloon_rad, 2*frame_length)
+        # )
+        # ), number=150)
+        # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=(
+        #     (0, p_half[0], 2 * frame_length),
+        #     (0, -p_half[0], 2*frame_length)
+        # )
+        # ), number=150)
+        # create mesh
+        part.generateMesh()
+        ## Create sets
+        # set for section assingment
+        part.Set(name='set-all', faces=part.faces)
+        # surface for  BC and contact
+        part.Surface(name='surface-contact',
+                     side2Faces=part.faces.findAt(coordinates=((p_half[0], p_half[1],  frame_length),)), )
 
-    # extrude sketch
-    part.BaseShellExtrude(sketch=sketch_balloon, depth=frame_length*2)
-    # mdb.saveAs('a_compression.cae')
-    # create partition
-    # datumPlane = part.DatumPlaneByPrincipalPlane(principalPlane=XZPLANE, offset=0.0)
-    # part.PartitionFaceByDatumPlane(datumPlane=part.datums[datumPlane.id], faces=part.faces)
-    part.setMeshControls(regions=part.cells, elemShape=HEX, technique=STRUCTURED)
     # import frame from STEP
-    geom_file = mdb.openStep(fileName=str('../geoms/'+solver_cfg.job_name_prefix+'.stp'))
+    # STEP from cad_drawer; absolute geoms_root lets the job run outside the project tree (scratch)
+    geoms_root = str(getattr(solver_cfg, 'geoms_root', '../geoms'))
+    geom_file = mdb.openStep(fileName=str(os.path.join(geoms_root, solver_cfg.job_name_prefix + '.stp')))
     part2 = model.PartFromGeometryFile(name='FRAME', geometryFile=geom_file, dimensionality=THREE_D, type=DEFORMABLE_BODY)
 
-    ## Mesh balloon
-    # set elem type
-    part.setElementType(regions=(part.faces,), elemTypes=[mesh.ElemType(elemCode=SFM3D4)])
-
-    # set number of element per edge
-    part.seedPart(size=0.2, deviationFactor=0.1)
-    # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((balloon_rad, 0, frame_length),)), number=1)
-    # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((-balloon_rad, 0, frame_length),)), number=1)
-    # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=(
-    #     (0, balloon_rad, 0.0),
-    #     (0, balloon_rad, 2*frame_length)
-    # )
-    # ), number=150)
-    # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=(
-    #     (0, p_half[0], 2 * frame_length),
-    #     (0, -p_half[0], 2*frame_length)
-    # )
-    # ), number=150)
-    # create mesh
-    part.generateMesh()
-    ## Create sets
-    # set for section assingment
-    part.Set(name='set-all', faces=part.faces)
-    # surface for  BC and contact
-    part.Surface(name='surface-contact',
-                 side2Faces=part.faces.findAt(coordinates=((p_half[0], p_half[1],  frame_length),)), )
-
     ## Mesh Frame
     # set elem type
     try:
@@ -245,14 +728,24 @@ def connector(
     part2.setMeshControls(regions=part2.cells, elemShape=HEX_DOMINATED, technique=SWEEP, allowMapped=ON)
     el_c3d8 = mesh.ElemType(elemCode=C3D8, elemLibrary=STANDARD,hourglassControl=ENHANCED)
     el_c3d8r = mesh.ElemType(elemCode=C3D8R, elemLibrary=STANDARD, hourglassControl=ENHANCED)
-    part2.setElementType(regions=(part2.cells,), elemTypes=(el_c3d8,))
+    if explicit:
+        # reduced integration with enhanced hourglass control: the stable increment of a full C3D8 is no larger
+        el_c3d8r = mesh.ElemType(elemCode=C3D8R, elemLibrary=EXPLICIT, hourglassControl=ENHANCED)
+        part2.setElementType(regions=(part2.cells,), elemTypes=(el_c3d8r,))
+    else:
+        part2.setElementType(regions=(part2.cells,), elemTypes=(el_c3d8,))
 
     # # set number of element per edge
     # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((3.3, 0, 1.0), (-3.3, 0, 1.0))), number=1)
     # part.seedEdgeByNumber(edges=part.edges.findAt(coordinates=((0, 3.3, 0.0), (0, 3.3, 30.0))), number=50)
 
     numErrorMesh = 1
-    raw_mesh_seed_size = 0.2
+    mesh_cfg = getattr(solver_cfg, 'mesh', None)
+    raw_mesh_seed_size = float(getattr(mesh_cfg, 'seed_size', 0.2))
+    features = []
+    if getattr(mesh_cfg, 'refinement', False):
+        features = load_mesh_features(str(os.path.join(geoms_root, solver_cfg.job_name_prefix + '_features.json')))
+        fine_ratio = float(mesh_cfg.fine_seed_size) / raw_mesh_seed_size
     # create mesh
     # part2.seedPart(size=raw_mesh_seed_size, deviationFactor=0.1)
     # part2.generateMesh()
@@ -267,7 +760,16 @@ def connector(
     # print(" ***Elements with errors: " + str(numErrorMesh) + ". Seed size " + str(raw_mesh_seed_size))
 
     while numErrorMesh > 0:
-        part2.seedPart(size=raw_mesh_seed_size, deviationFactor=0.1)
+        mesh_seed_size = raw_mesh_seed_size
+        if features:
+            n_fine = seed_by_features(part2, features,
+                                      coarse_size=raw_mesh_seed_size,
+                                      fine_size=raw_mesh_seed_size * fine_ratio,
+                                      feature_radius=float(mesh_cfg.feature_radius),
+                                      curvature_radius=float(mesh_cfg.curvature_radius))
+            print(" ***Refined edges: " + str(n_fine) + ". Fine seed size " + str(raw_mesh_seed_size * fine_ratio))
+        else:
+            part2.seedPart(size=raw_mesh_seed_size, deviationFactor=0.1)
         part2.generateMesh()
         bad_elems = part2.verifyMeshQuality(
             criterion=ANALYSIS_CHECKS
@@ -279,6 +781,7 @@ def connector(
         raw_mesh_seed_size -= 0.025
         # if raw_mesh_seed_size < 0.1:
         #     numErrorMesh = 0
+    write_mesh_record(solver_cfg, mesh_seed_size, mesh_seed_size * fine_ratio if features else None)
 
     part2.Set(name='set-cells', cells=part2.cells)
 
@@ -331,6 +834,27 @@ def connector(
         operation=DIFFERENCE
     )
 
+    # self contact only on faces that can reach each other under the expected compression
+    self_contact_name = 'self-contact'
+    contact_cfg = getattr(solver_cfg, 'contact', None)
+    if str(getattr(contact_cfg, 'self_contact', 'full')) == 'pruned':
+        try:
+            kept = prune_self_contact(part2, 'self-contact', frame_rad, float(geometry_cfg.thk), phi_rad,
+                                      radius_ratio=(balloon_rad - radial_travel) / balloon_rad,
+                                      axial_margin=float(getattr(contact_cfg, 'axial_margin', 0.2)),
+                                      contact_margin=float(getattr(contact_cfg, 'contact_margin', 0.05)))
+        except Exception as e:
+            print(" ***Self-contact pruning failed: " + str(e))
+            kept = None
+        if kept:
+            pruned_faces = part2.faces[kept[0]:kept[0] + 1]
+            for i in kept[1:]:
+                pruned_faces = pruned_faces + part2.faces[i:i + 1]
+            part2.Surface(name='self-contact-pruned', side2Faces=pruned_faces)
+            self_contact_name = 'self-contact-pruned'
+        print(" ***Self-contact faces: " + str(len(part2.surfaces['self-contact'].faces))
+              + " -> " + str(len(part2.surfaces[self_contact_name].faces)))
+
     ## Assembly
     # create cylindrical coordinate system
     csys = model.rootAssembly
@@ -340,7 +864,12 @@ def connector(
         line1=(0, 0, 1), line2=(0, 1, 0), name='test').id
 
     # create assembly
-    model.rootAssembly.Instance(name='balloon', part=part, dependent=ON).translate(vector=(0, 0, -frame_length))
+    if loading_model == 'membrane':
+        model.rootAssembly.Instance(name='balloon', part=part, dependent=ON).translate(vector=(0, 0, -frame_length))
+        jaws = []
+    else:
+        jaws = build_rigid_jaws(model, loading_model, phi_rad, balloon_rad, frame_length,
+                                int(getattr(loading_cfg, 'segments', 4)))
     model.rootAssembly.Instance(name='FRAME', part=part2, dependent=ON)
 
     # faces_inst = model.rootAssembly.instances['FRAME'].faces.findAt(coordinates=(coords_xy + coords_rotated))
@@ -365,75 +894,76 @@ def connector(
                     material_prop.T0, material_prop.dSig_dT_L_per_C, material_prop.dSig_dT_U_per_C),),
             nonassociated=material_prop.eps_V   # None or number; if None then eps_V = eps_L
         )
+    if explicit:
+        material.Density(table=((float(material_prop.density),),))
     ## Section
     # ballon section
-    model.SurfaceSection(name='section_balloon', useDensity=OFF)
     model.HomogeneousSolidSection(name='section_frame', material=str(material_prop.name), thickness=None)
-    part.SectionAssignment(region=part.sets['set-all'], sectionName='section_balloon')
+    if loading_model == 'membrane':
+        model.SurfaceSection(name='section_balloon', useDensity=OFF)
+        part.SectionAssignment(region=part.sets['set-all'], sectionName='section_balloon')
     part2.SectionAssignment(region=part2.sets['set-cells'], sectionName='section_frame')
 
     ## Step
-    model.StaticStep(name=str(solver_cfg.step_name), previous='Initial', description='',
-                     timePeriod=solver_cfg.step_time, timeIncrementationMethod=AUTOMATIC,
-                     maxNumInc=10000,
-                     initialInc=(0.01 if 0.01<solver_cfg.outputs.time_interval else solver_cfg.outputs.time_interval),
-                     minInc=1E-8,
-                     maxInc=0.1,
-                     nlgeom=ON,
-                     stabilizationMethod=DISSIPATED_ENERGY_FRACTION,
-                     stabilizationMagnitude=2e-4,
-                     adaptiveDampingRatio=0.05)
+    controls = step_controls(solver_cfg)
+    if explicit:
+        # quasi-static explicit: shortened step time (time scaling) and mass scaling
+        model.ExplicitDynamicsStep(name=str(solver_cfg.step_name), previous='Initial', description='',
+                                   timePeriod=float(solver_cfg.step_time) * scale,
+                                   massScaling=mass_scaling(solver_cfg),
+                                   timeIncrementationMethod=AUTOMATIC_GLOBAL,
+                                   improvedDtMethod=ON,
+                                   nlgeom=ON)
+    else:
+        model.StaticStep(name=str(solver_cfg.step_name), previous='Initial', description='',
+                         timePeriod=solver_cfg.step_time, timeIncrementationMethod=AUTOMATIC,
+                         maxNumInc=10000,
+                         initialInc=controls['initial_inc'],
+                         minInc=controls['min_inc'],
+                         maxInc=controls['max_inc'],
+                         nlgeom=ON,
+                         stabilizationMethod=DISSIPATED_ENERGY_FRACTION,
+                         stabilizationMagnitude=controls['stabilization'],
+                         adaptiveDampingRatio=controls['damping_ratio'])
+    recovery_cfg = getattr(solver_cfg, 'recovery', None)
+    if getattr(recovery_cfg, 'enabled', False) and not explicit:
+        # restart data at time marks (last one kept) for resubmission after divergence
+        model.steps[str(solver_cfg.step_name)].Restart(numberIntervals=int(recovery_cfg.restart_intervals),
+                                                       overlay=ON, timeMarks=ON)
 
     ## Output request
+    request_outputs(model, solver_cfg)
 
-    _time_num_points = int(round(solver_cfg.step_time / solver_cfg.outputs.time_interval))
-    _time_points_array = np.linspace(
-        0.0,
-        _time_num_points * float(solver_cfg.outputs.time_interval),
-        _time_num_points + 1
-    )
-    _time_points_array = np.round(_time_points_array, 6)
-    points_seq = tuple((float(t),) for t in _time_points_array.tolist())
-    model.TimePoint(name='tp', points=points_seq)
-
-    model.FieldOutputRequest(
-                             name='Field-Output-1',
-                             createStepName=str(solver_cfg.step_name),
-                             timePoint='tp',
-                             timeMarks=ON,
-                             position=INTEGRATION_POINTS,
-                             variables=list([str(v) for v in solver_cfg.outputs.field_outputs])
-                             )
-    model.HistoryOutputRequest(
-        name='History-Output-stable_check',
-        createStepName=str(solver_cfg.step_name),
-        variables= (
-                'ALLWK',  # external work
-                'ALLIE',  # internal energy
-                'ALLKE',  # kinetic energy
-                'ALLAE',  # artificial energy (if stabilization/penalty present)
-            ),
-        region=MODEL,        # whole-assembly history region
-        timeInterval=float(solver_cfg.outputs.time_interval),         # every increment
-        timeMarks=ON         # write time marks
-    )
     ## Boundary condition
     # create Amplitude
     amp_name = 'Ampl-compress'
-    model.TabularAmplitude(name=amp_name, data=((0, 0), (0.75, 1), (1, 0.75),), )
-    # define boundary to set BC
-    expanding_disp = model.rootAssembly.instances['balloon'].sets['set-all']
-    # create BC in specific coordinate system
-    model.DisplacementBC(
-        name='BC-compress_balloon',
-        createStepName=str(solver_cfg.step_name),
-        localCsys=csys.datums[datum],
-        amplitude=amp_name,
-        region=expanding_disp,
-        u1=-(balloon_rad - 3),
-        u2=0,
-        u3=0
-    )
+    model.TabularAmplitude(name=amp_name, data=((0, 0), (0.75 * scale, 1), (1 * scale, 0.75),), )
+    if loading_model == 'membrane':
+        # define boundary to set BC
+        expanding_disp = model.rootAssembly.instances['balloon'].sets['set-all']
+        # create BC in specific coordinate system
+        model.DisplacementBC(
+            name='BC-compress_balloon',
+            createStepName=str(solver_cfg.step_name),
+            localCsys=csys.datums[datum],
+            amplitude=amp_name,
+            region=expanding_disp,
+            u1=-radial_travel,
+            u2=0,
+            u3=0
+        )
+        loaded_bcs = [('BC-compress_balloon', {'u1': -radial_travel})]
+    else:
+        # RF is read from the reference-point history instead of the balloon nodes
+        set_rp = load_rigid_jaws(model, jaws, str(solver_cfg.step_name), amp_name, radial_travel)
+        model.HistoryOutputRequest(name='History-Output-rp',
+                                   createStepName=str(solver_cfg.step_name),
+                                   variables=('RF1', 'RF2', 'RF3', 'U1', 'U2', 'U3'),
+                                   region=set_rp,
+                                   timeInterval=float(solver_cfg.outputs.time_interval) * scale,
+                                   timeMarks=ON)
+        loaded_bcs = [('BC-' + name, {'u1': -radial_travel * math.cos(a), 'u2': -radial_travel * math.sin(a)})
+                      for name, a, _ in jaws]
 
     model.DisplacementBC(
         name='BC-no_rotation',
@@ -442,26 +972,41 @@ def connector(
         localCsys=csys.datums[datum],
         u2=0
     )
+    # further load cases as steps of the same analysis
+    add_load_cases(model, solver_cfg, loaded_bcs, controls)
     # mdb.saveAs('a_compression.cae')
     ## interaction
     set_frame = model.rootAssembly.instances['FRAME'].surfaces['surface-contact']
-    set_balloon = model.rootAssembly.instances['balloon'].surfaces['surface-contact']
-    set_frame_self_contact = model.rootAssembly.instances['FRAME'].surfaces['self-contact']
+    set_frame_self_contact = model.rootAssembly.instances['FRAME'].surfaces[self_contact_name]
     prop = model.ContactProperty(name='InterProp')
     prop.TangentialBehavior(formulation=PENALTY, table=((0.2,),), fraction=0.005, )
     prop.NormalBehavior(pressureOverclosure=HARD, )
 
-    model.SurfaceToSurfaceContactStd(name='contact_test', createStepName=str(solver_cfg.step_name),
-                                     slave=set_frame,
-                                     master=set_balloon,
-                                     sliding=FINITE, interferenceType=NONE,
-                                     interactionProperty='InterProp', enforcement=NODE_TO_SURFACE)
-
-    model.SelfContactStd(name='self-contact-frame', createStepName=str(solver_cfg.step_name),
-                         surface=set_frame_self_contact,
-                         interactionProperty='InterProp', enforcement=SURFACE_TO_SURFACE)
-
-    if _ADPTIVE_MESH:
+    if explicit:
+        add_explicit_contacts(model, str(solver_cfg.step_name), set_frame, set_frame_self_contact,
+                              ['balloon'] if loading_model == 'membrane' else [name for name, _, _ in jaws])
+        jaws = []
+    elif loading_model == 'membrane':
+        set_balloon = model.rootAssembly.instances['balloon'].surfaces['surface-contact']
+        model.SurfaceToSurfaceContactStd(name='contact_test', createStepName=str(solver_cfg.step_name),
+                                         slave=set_frame,
+                                         master=set_balloon,
+                                         sliding=FINITE, interferenceType=NONE,
+                                         interactionProperty='InterProp', enforcement=NODE_TO_SURFACE)
+    for name, _, _ in jaws:
+        # analytic rigid surface is always the master
+        model.SurfaceToSurfaceContactStd(name='contact_' + name, createStepName=str(solver_cfg.step_name),
+                                         slave=set_frame,
+                                         master=model.rootAssembly.instances[name].surfaces['surface-contact'],
+                                         sliding=FINITE, interferenceType=NONE,
+                                         interactionProperty='InterProp', enforcement=NODE_TO_SURFACE)
+
+    if not explicit:
+        model.SelfContactStd(name='self-contact-frame', createStepName=str(solver_cfg.step_name),
+                             surface=set_frame_self_contact,
+                             interactionProperty='InterProp', enforcement=SURFACE_TO_SURFACE)
+
+    if _ADPTIVE_MESH and not explicit:
 
         #remeshing
         ale_ctrl = model.AdaptiveMeshControl(
@@ -508,14 +1053,22 @@ def connector(
     # delete default field output with printing every step
     del model.fieldOutputRequests['F-Output-1']
     # del model.historyOutputRequests['H-Output-1']
-
+    # .fil records for licence-free metric extraction (keyword edits go last: CAE features above
+    # would re-synchronise the keyword block)
+    request_fil_outputs(model, solver_cfg)
+
+    job_kwargs = {}
+    if explicit:
+        # long quasi-static runs accumulate round-off in single precision
+        job_kwargs = dict(explicitPrecision=DOUBLE_PLUS_PACK, nodalOutputPrecision=FULL)
     job = mdb.Job(
         name=job_name,
         model='Compress_frame',
         numCpus=int(solver_cfg.cpus),
         numDomains=int(solver_cfg.cpus),
         multiprocessingMode=THREADS,
-        type=ANALYSIS
+        type=ANALYSIS,
+        **job_kwargs
     )
 
     job.writeInput()
@@ -69,6 +69,31 @@ def _to_plain(obj: Any):
     return obj  # уже JSON-совместимое
 
 
+def write_payload(
+    json_path: str,
+    geometry_cfg: Union[Dict[str, Any], SimpleNamespace, None] = None,
+    frame_lenght: Union[float, None] = None,
+    material_model: str = "linear",
+    material_prop: Union[Dict[str, Any], SimpleNamespace, None] = None,
+    solver_cfg: Union[Dict[str, Any], SimpleNamespace, None] = None,
+) -> str:
+    """
+    JSON с параметрами задания для скриптов Abaqus (компилятор CAE и парсер ODB).
+    frame_lenght=None — длина каркаса неизвестна (дека собрана без CAD, например морфингом).
+    """
+    payload = {
+        "geometry_cfg": _to_plain(geometry_cfg),
+        "frame_lenght": float(frame_lenght) if frame_lenght is not None else None,
+        "material_model": str(material_model),
+        "material_prop": _to_plain(material_prop or {}),
+        "solver_cfg": _to_plain(solver_cfg or {}),
+    }
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return json_path
+
+
 def connector_console(
     geometry_cfg: Union[Dict[str, Any], SimpleNamespace, None] = None,
     frame_lenght: float = 30.0,
@@ -98,22 +123,11 @@ def connector_console(
         or (solver_cfg or {}).get("abaqus_cmd") if isinstance(solver_cfg, dict) else None
     ) or "abaqus"
 
-    # Сериализуем параметры
-    payload = {
-        "geometry_cfg": _to_plain(geometry_cfg),
-        "frame_lenght": float(frame_lenght),
-        "material_model": str(material_model),
-        "material_prop": _to_plain(material_prop or {}),
-        "solver_cfg": _to_plain(solver_cfg or {}),
-    }
-
     # Путь к JSON
     if json_path is None:
         tmpdir = tempfile.mkdtemp(prefix="abq_params_", dir=solver_path)
         json_path = os.path.join(tmpdir, "params.json")
-    os.makedirs(os.path.dirname(json_path), exist_ok=True)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    write_payload(json_path, geometry_cfg, frame_lenght, material_model, material_prop, solver_cfg)
 
     # Путь к вашему скрипту abq_connector.py
     script_path = os.path.join(solver_path, script_relpath)
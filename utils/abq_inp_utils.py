@@ -0,0 +1,283 @@
+import os
+import re
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+_PARAM_RE = re.compile(r'\s*([^=,\s]+)\s*(?:=\s*([^,]+))?')
+
+
+def _keyword(line: str) -> Tuple[str, Dict[str, str]]:
+    """'*Element, type=C3D8' -> ('element', {'type': 'C3D8'}). Параметры в нижнем регистре (ключи)."""
+    parts = line.strip()[1:].split(',')
+    params = dict()
+    for p in parts[1:]:
+        m = _PARAM_RE.match(p)
+        if m and m.group(1):
+            params[m.group(1).lower()] = (m.group(2) or '').strip()
+    return parts[0].strip().lower(), params
+
+
+def _data_block(lines: List[str], start: int) -> int:
+    """Индекс первой строки после блока данных, начинающегося с lines[start]."""
+    end = start
+    while end < len(lines) and not lines[end].lstrip().startswith('*'):
+        end += 1
+    return end
+
+
+def read_part_mesh(inp_path: str, part_name: str) -> Dict[str, Any]:
+    """
+    Сетка детали из .inp, записанного Abaqus/CAE (job.writeInput):
+      node_labels (n,), coords (n,3), node_block (start, end) — строки с узлами в файле,
+      elements {type: (labels (m,), connectivity (m,k))}.
+    """
+    with open(inp_path, 'r') as f:
+        lines = f.readlines()
+
+    current_part = None
+    out = {'node_labels': None, 'coords': None, 'node_block': None, 'elements': dict()}
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.startswith('*') or line.startswith('**'):
+            i += 1
+            continue
+        key, params = _keyword(line)
+        if key == 'part':
+            current_part = params.get('name')
+        elif key == 'end part':
+            current_part = None
+        elif current_part == part_name and key in ('node', 'element'):
+            end = _data_block(lines, i + 1)
+            data = np.array([[float(v) for v in l.replace(',', ' ').split()] for l in lines[i + 1:end]
+                             if l.strip()])
+            if key == 'node':
+                out['node_labels'] = data[:, 0].astype(int)
+                out['coords'] = data[:, 1:4]
+                out['node_block'] = (i + 1, end)
+            else:
+                out['elements'][params.get('type', '').upper()] = (data[:, 0].astype(int),
+                                                                   data[:, 1:].astype(int))
+            i = end
+            continue
+        i += 1
+    if out['coords'] is None:
+        raise ValueError(f'part {part_name} has no *Node block in {inp_path}')
+    return out
+
+
+def write_part_nodes(inp_path: str, out_path: str, node_block: Tuple[int, int],
+                     node_labels: np.ndarray, coords: np.ndarray) -> None:
+    """Копия .inp с заменёнными координатами узлов в блоке node_block (из read_part_mesh)."""
+    with open(inp_path, 'r') as f:
+        lines = f.readlines()
+    start, end = node_block
+    node_lines = ['%7d, %.9g, %.9g, %.9g\n' % (n, x, y, z) for n, (x, y, z) in zip(node_labels, coords)]
+    with open(out_path, 'w') as f:
+        f.writelines(lines[:start] + node_lines + lines[end:])
+
+
+def count_mesh_entities(inp_path: str) -> Tuple[int, int]:
+    """
+    Число узлов и элементов во всех блоках *Node / *Element деки (без разбора значений),
+    включая файлы *Include (сетка мастер-деки варианта материала).
+    """
+    n_nodes = n_elements = 0
+    counter = None
+    with open(inp_path, 'r') as f:
+        for line in f:
+            if line.startswith('*'):
+                if line.startswith('**'):
+                    continue
+                key, params = _keyword(line)
+                counter = key if key in ('node', 'element') else None
+                if key == 'include' and params.get('input'):
+                    nodes, elements = count_mesh_entities(os.path.join(os.path.dirname(inp_path), params['input']))
+                    n_nodes, n_elements = n_nodes + nodes, n_elements + elements
+                continue
+            if counter is None or not line.strip():
+                continue
+            if counter == 'node':
+                n_nodes += 1
+            elif not line.rstrip().endswith(','):   # продолжение строки связности — тот же элемент
+                n_elements += 1
+    return n_nodes, n_elements
+
+
+def deck_analysis(inp_path: str) -> str:
+    """Решатель деки: explicit, если в ней есть шаг *Dynamic, Explicit, иначе standard."""
+    with open(inp_path, 'r') as f:
+        for line in f:
+            if line.startswith('*') and not line.startswith('**'):
+                key, params = _keyword(line)
+                if key == 'dynamic' and 'explicit' in params:
+                    return 'explicit'
+    return 'standard'
+
+
+# ключевые слова, которые в объединённой деке должны встречаться один раз
+_SINGLETON_KEYS = ('heading', 'preprint', 'physical constants')
+_OUTPUT_KEYS = ('output', 'node output', 'element output', 'contact output', 'energy output', 'restart',
+                'monitor', 'node print', 'el print', 'contact print', 'energy print', 'node file', 'el file',
+                'file format', 'controls', 'contact controls', 'solver controls')
+# подчинённые *Output ключевые слова (остальные из _OUTPUT_KEYS начинают свою группу)
+_OUTPUT_SUBKEYS = ('node output', 'element output', 'contact output', 'energy output', 'node print', 'el print',
+                   'contact print', 'energy print', 'node file', 'el file')
+_REGION_PARAMS = ('nset', 'elset', 'surface', 'master', 'slave')
+# параметры, значение которых — имя (набора, поверхности, детали, материала, амплитуды ...)
+_NAME_PARAMS = ('name', 'nset', 'elset', 'part', 'instance', 'material', 'interaction', 'amplitude',
+                'time points', 'ref node', 'analytical surface', 'orientation', 'surface', 'master', 'slave',
+                'controls')
+# блоки, в строках данных которых встречаются имена наборов / поверхностей
+_REF_DATA_KEYS = ('boundary', 'contact pair', 'surface', 'nset', 'elset', 'cload', 'dload', 'dsload', 'tie',
+                  'coupling')
+# имена уровня сборки и модели, общие для всей деки (имена внутри *Part локальны)
+_GLOBAL_DEFS = {
+    'assembly': ('nset', 'elset', 'surface', 'orientation'),
+    'model': ('material', 'surface interaction', 'amplitude', 'time points', 'orientation',
+              'adaptive mesh controls'),
+}
+
+
+def _inp_blocks(inp_path: str) -> List[dict]:
+    """Ключевые слова деки с данными и контекстом (model / part / assembly / instance / step)."""
+    blocks, ctx, step = [], 'model', -1
+    with open(inp_path, 'r') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith('**') or not line.strip():
+                continue
+            if not line.startswith('*'):
+                if blocks:
+                    blocks[-1]['data'].append(line)
+                continue
+            key, params = _keyword(line)
+            if key == 'part':
+                ctx = 'part'
+            elif key == 'assembly':
+                ctx = 'assembly'
+            elif key == 'instance':
+                ctx = 'instance'
+            elif key == 'step':
+                ctx, step = 'step', step + 1
+            blocks.append({'key': key, 'params': params, 'line': line, 'data': [], 'ctx': ctx, 'step': step})
+            if key in ('end part', 'end assembly', 'end step'):
+                ctx = 'model'
+            elif key == 'end instance':
+                ctx = 'assembly'
+    return blocks
+
+
+def _rename_maps(blocks: List[dict], tag: str) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    parts, instances, names = dict(), dict(), dict()
+    for b in blocks:
+        if b['key'] == 'part':
+            parts[b['params']['name'].lower()] = f'{b["params"]["name"]}_{tag}'
+        elif b['key'] == 'instance':
+            instances[b['params']['name'].lower()] = f'{b["params"]["name"]}_{tag}'
+        elif b['ctx'] == 'assembly' and b['key'] == 'node':
+            raise ValueError('assembly-level nodes cannot be batched (labels would clash)')
+        elif b['key'] in _GLOBAL_DEFS.get(b['ctx'], ()):
+            name = b['params'].get('name') or b['params'].get(b['key'])
+            if name:
+                names[name.lower()] = f'{name}_{tag}'
+    return parts, instances, names
+
+
+def _renamed_block(b: dict, parts: dict, instances: dict, names: dict) -> List[str]:
+    local = b['ctx'] in ('part', 'instance')
+
+    def ren(value: str, key: str = None) -> str:
+        v = value.strip()
+        if key == 'part':
+            return parts.get(v.lower(), v)
+        if key == 'instance' or (key == 'name' and b['key'] == 'instance'):
+            return instances.get(v.lower(), v)
+        if key == 'name' and b['key'] == 'part':
+            return parts.get(v.lower(), v)
+        prefix, dot, rest = v.partition('.')
+        if dot and prefix.lower() in instances:
+            return instances[prefix.lower()] + '.' + rest
+        if (not local or key == 'material') and v.lower() in names:
+            return names[v.lower()]
+        return v
+
+    items = b['line'].split(',')
+    for i in range(1, len(items)):
+        key, eq, value = items[i].partition('=')
+        if eq and key.strip().lower() in _NAME_PARAMS:
+            items[i] = f'{key}={ren(value, key.strip().lower())}'
+    out = [','.join(items)]
+    if b['key'] in _REF_DATA_KEYS and not local and 'generate' not in b['params']:
+        out += [', '.join(ren(token) for token in line.split(',')) for line in b['data']]
+    else:
+        out += b['data']
+    return out
+
+
+def _regional(group: List[dict]) -> bool:
+    return any(p in b['params'] for b in group for p in _REGION_PARAMS)
+
+
+def merge_decks(inp_paths: List[str], tags: List[str], out_path: str) -> None:
+    """
+    Одна дека из нескольких независимых дек Abaqus/CAE (пакетный расчёт K дизайнов одним заданием).
+    Детали, экземпляры, наборы и поверхности сборки, материалы, свойства контакта, амплитуды и
+    отметки времени получают суффикс _<tag> (экземпляр FRAME дизайна D1 -> FRAME_D1). Шаги
+    объединяются по номеру: заголовок шага и процедура берутся из первой деки, граничные условия
+    и контакты — из всех, запросы вывода по всей модели — из первой, по наборам — из всех.
+    Дизайны могут совпадать в пространстве: общих контактов между ними нет.
+    """
+    decks = []
+    for path, tag in zip(inp_paths, tags):
+        blocks = _inp_blocks(path)
+        decks.append((blocks, _rename_maps(blocks, tag)))
+
+    def section(first_only: bool, select) -> List[str]:
+        out = []
+        for k, (blocks, maps) in enumerate(decks):
+            if first_only and k > 0:
+                break
+            for b in blocks:
+                if select(b):
+                    out += _renamed_block(b, *maps)
+        return out
+
+    lines = [f'** batch: {" ".join(tags)}']
+    lines += section(True, lambda b: b['key'] in _SINGLETON_KEYS)
+    lines += section(False, lambda b: b['ctx'] == 'part')
+    lines += [decks[0][0][[b['key'] for b in decks[0][0]].index('assembly')]['line']]
+    lines += section(False, lambda b: b['ctx'] in ('assembly', 'instance')
+                     and b['key'] not in ('assembly', 'end assembly'))
+    lines += ['*End Assembly']
+    lines += section(False, lambda b: b['ctx'] == 'model' and b['key'] not in _SINGLETON_KEYS
+                     and b['key'] not in ('end part', 'end assembly', 'end step'))
+
+    n_steps = 1 + max(b['step'] for b in decks[0][0])
+    for s in range(n_steps):
+        step_lines = []
+        for k, (blocks, maps) in enumerate(decks):
+            step = [b for b in blocks if b['ctx'] == 'step' and b['step'] == s and b['key'] != 'end step']
+            if k == 0:
+                step_lines += _renamed_block(step[0], *maps) + _renamed_block(step[1], *maps)
+            group = []
+            for b in step[2:] + [None]:
+                if b is not None and b['key'] in _OUTPUT_SUBKEYS and group:
+                    group.append(b)
+                    continue
+                # закончилась группа вывода (*Output + подчинённые ключевые слова)
+                if group and (k == 0 or _regional(group)):
+                    for g in group:
+                        step_lines += _renamed_block(g, *maps)
+                group = []
+                if b is None:
+                    break
+                if b['key'] in _OUTPUT_KEYS:
+                    group = [b]
+                else:
+                    step_lines += _renamed_block(b, *maps)
+        lines += step_lines + ['*End Step']
+
+    with open(out_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
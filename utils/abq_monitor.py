@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import subprocess
+from types import SimpleNamespace
+from typing import List
+
+# строка инкремента в .sta Standard:
+#  STEP  INC ATT SEVERE EQUIL TOTAL  TOTAL      STEP       INC OF
+#                DISCON ITERS ITERS  TIME/      TIME/LPF    TIME/LPF
+#    1     5   1U    2     4     6  0.0450     0.0450     0.002500
+_STA_LINE = re.compile(
+    r'^\s*(\d+)\s+(\d+)\s+(\d+)(U?)\s+(\d+)\s+(\d+)\s+(\d+)\s+'
+    r'([-+0-9.Ee]+)\s+([-+0-9.Ee]+)\s+([-+0-9.Ee]+)'
+)
+# строка инкремента в .sta Explicit (WALLCLOCK TIME есть не во всех версиях):
+#  INCREMENT  STEP TIME  TOTAL TIME  CPU TIME  [WALLCLOCK]  STABLE INC  CRITICAL ELEMENT  KINETIC  TOTAL  % MASS
+#       1200  1.632E-03   1.632E-03  00:00:41   00:00:42    1.361E-06        FRAME.1234  2.1E-03  -1.E-5  4.1E+01
+_STA_EXPLICIT_LINE = re.compile(
+    r'^\s*(\d+)\s+([-+0-9.Ee]+)\s+([-+0-9.Ee]+)\s+[\d:]+\s+(?:[\d:]+\s+)?'
+    r'([-+0-9.Ee]+)\s+\S+\s+([-+0-9.Ee]+)\s+([-+0-9.Ee]+)(?:\s+([-+0-9.Ee]+))?\s*$'
+)
+_STA_EXPLICIT_STEP = re.compile(r'^\s*STEP\s+(\d+)\s+ORIGIN')
+_MSG_FATAL = (
+    'TIME INCREMENT REQUIRED IS LESS THAN THE MINIMUM SPECIFIED',
+    'TOO MANY ATTEMPTS MADE FOR THIS INCREMENT',
+    'THE ANALYSIS HAS BEEN TERMINATED DUE TO PREVIOUS ERRORS',
+)
+
+
+class _FileTail(object):
+    """Инкрементальное чтение дописываемого файла: только новые полные строки с прошлого вызова."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.buffer = ''
+
+    def new_lines(self) -> List[str]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+            self.offset = f.tell()
+        if not chunk:
+            return []
+        text = self.buffer + chunk.decode('latin-1')
+        lines = text.split('\n')
+        self.buffer = lines.pop()     # незавершённая строка дочитывается в следующий раз
+        return lines
+
+
+class JobMonitor(object):
+    """
+    Живой разбор .sta/.msg работающего задания Abaqus/Standard (explicit=True — .sta Abaqus/Explicit:
+    inc_size — устойчивый инкремент, плюс kinetic_energy и mass_change, %; уменьшений шага нет).
+
+    Состояние (атрибуты): step, increment, step_time, total_time, inc_size, attempts, cutbacks,
+    consecutive_cutbacks, equil_iters, severe_iters, warnings, errors, completed.
+    poll() возвращает вердикт: 'running', 'completed', 'captured' (все нужные моменты времени
+    пройдены — можно останавливать), 'diverged: <причина>'.
+    """
+
+    def __init__(
+            self,
+            work_path: str,
+            job_name: str,
+            required_times: List[float] = (),
+            min_inc: float = 1e-6,
+            max_consecutive_cutbacks: int = 5,
+            stall_minutes: float = 10.0,
+            explicit: bool = False,
+    ):
+        self.sta = _FileTail(os.path.join(work_path, job_name + '.sta'))
+        self.msg = _FileTail(os.path.join(work_path, job_name + '.msg'))
+        self.required_times = sorted(float(t) for t in required_times)
+        self.min_inc = float(min_inc)
+        self.max_consecutive_cutbacks = int(max_consecutive_cutbacks)
+        self.stall_seconds = 60.0 * float(stall_minutes)
+        self.explicit = bool(explicit)
+
+        self.step = 0
+        self.increment = 0
+        self.step_time = 0.0
+        self.total_time = 0.0
+        self.inc_size = None
+        self.attempts = 0
+        self.cutbacks = 0
+        self.consecutive_cutbacks = 0
+        self.equil_iters = 0
+        self.severe_iters = 0
+        self.warnings = 0
+        self.errors = 0
+        self.completed = False
+        self.fatal = None
+        self.kinetic_energy = None
+        self.mass_change = None
+        self._last_progress = time.time()
+
+    def _read_sta(self):
+        for line in self.sta.new_lines():
+            if 'HAS COMPLETED SUCCESSFULLY' in line:
+                self.completed = True
+                continue
+            if 'HAS NOT BEEN COMPLETED' in line:
+                self.fatal = self.fatal or 'analysis not completed'
+                continue
+            if self.explicit:
+                self._read_explicit_line(line)
+                continue
+            m = _STA_LINE.match(line)
+            if m is None:
+                continue
+            self.step, self.increment = int(m.group(1)), int(m.group(2))
+            self.attempts += 1
+            self.severe_iters += int(m.group(5))
+            self.equil_iters += int(m.group(6))
+            self._last_progress = time.time()
+            if m.group(4) == 'U':
+                # попытка не сошлась, инкремент будет уменьшен
+                self.cutbacks += 1
+                self.consecutive_cutbacks += 1
+                continue
+            self.consecutive_cutbacks = 0
+            self.total_time = float(m.group(8))
+            self.step_time = float(m.group(9))
+            self.inc_size = float(m.group(10))
+
+    def _read_explicit_line(self, line: str):
+        m = _STA_EXPLICIT_STEP.match(line)
+        if m is not None:
+            self.step = int(m.group(1))
+            return
+        m = _STA_EXPLICIT_LINE.match(line)
+        if m is None:
+            return
+        self.increment = int(m.group(1))
+        self.step_time, self.total_time = float(m.group(2)), float(m.group(3))
+        self.inc_size = float(m.group(4))
+        self.kinetic_energy = float(m.group(5))
+        if m.group(7) is not None:
+            self.mass_change = float(m.group(7))
+        self.attempts = self.increment
+        self._last_progress = time.time()
+
+    def _read_msg(self):
+        for line in self.msg.new_lines():
+            if '***WARNING' in line:
+                self.warnings += 1
+            elif '***ERROR' in line:
+                self.errors += 1
+            for text in _MSG_FATAL:
+                if text in line:
+                    self.fatal = text.lower()
+
+    def poll(self) -> str:
+        self._read_sta()
+        self._read_msg()
+        if self.completed:
+            return 'completed'
+        if self.required_times and self.total_time >= self.required_times[-1] - 1e-9:
+            return 'captured'
+        if self.fatal is not None:
+            return 'diverged: ' + self.fatal
+        if self.consecutive_cutbacks >= self.max_consecutive_cutbacks:
+            return 'diverged: %d cutbacks in a row' % self.consecutive_cutbacks
+        if self.inc_size is not None and self.consecutive_cutbacks > 0 and self.inc_size < self.min_inc:
+            return 'diverged: increment %.2e < %.2e' % (self.inc_size, self.min_inc)
+        if time.time() - self._last_progress > self.stall_seconds:
+            return 'diverged: no progress for %.0f min' % (self.stall_seconds / 60.0)
+        return 'running'
+
+    def summary(self) -> dict:
+        return {
+            'step': self.step, 'increment': self.increment,
+            'step_time': self.step_time, 'total_time': self.total_time, 'inc_size': self.inc_size,
+            'attempts': self.attempts, 'cutbacks': self.cutbacks,
+            'equil_iters': self.equil_iters, 'severe_iters': self.severe_iters,
+            'warnings': self.warnings, 'errors': self.errors,
+            **({'kinetic_energy': self.kinetic_energy, 'mass_change': self.mass_change} if self.explicit else {}),
+        }
+
+
+def converged_increments(sta_path: str) -> List[tuple]:
+    """Сошедшиеся инкременты из .sta: [(step, increment, step_time, total_time), ...]."""
+    out = []
+    if not os.path.exists(sta_path):
+        return out
+    with open(sta_path, 'r', errors='replace') as f:
+        for line in f:
+            m = _STA_LINE.match(line)
+            if m is None or m.group(4) == 'U':
+                continue
+            out.append((int(m.group(1)), int(m.group(2)), float(m.group(9)), float(m.group(8))))
+    return out
+
+
+def increment_schedule(sta_path: str) -> List[tuple]:
+    """
+    График сошедшихся инкрементов из .sta: [(total_time, inc_size, attempt), ...];
+    attempt > 1 — инкремент сошёлся после уменьшения шага.
+    """
+    out = []
+    if not os.path.exists(sta_path):
+        return out
+    with open(sta_path, 'r', errors='replace') as f:
+        for line in f:
+            m = _STA_LINE.match(line)
+            if m is None or m.group(4) == 'U':
+                continue
+            out.append((float(m.group(8)), float(m.group(10)), int(m.group(3))))
+    return out
+
+
+def required_times(solver_cfg: SimpleNamespace) -> List[float]:
+    """
+    Моменты времени, после которых расчёт можно останавливать: frame_time_for_metric + monitor.stop_after.
+    Пустой список, если нужен весь шаг (досрочная остановка не даёт выигрыша) или за основным
+    шагом идут случаи нагружения (solver.load_cases). Для Explicit — в масштабированном времени модели.
+    """
+    if getattr(solver_cfg, 'load_cases', None):
+        return []
+    times = [float(t) for t in getattr(solver_cfg.outputs, 'frame_time_for_metric', [])
+             if isinstance(t, (int, float))]
+    stop_after = getattr(getattr(solver_cfg, 'monitor', None), 'stop_after', None)
+    if stop_after is not None:
+        times.append(float(stop_after))
+    if not times or max(times) >= float(solver_cfg.step_time) - 1e-9:
+        return []
+    scale = float(solver_cfg.explicit.time_scaling) if is_explicit(solver_cfg) else 1.0
+    return sorted(t * scale for t in times)
+
+
+def is_explicit(solver_cfg: SimpleNamespace) -> bool:
+    return str(getattr(solver_cfg, 'analysis', 'standard')) == 'explicit'
+
+
+def terminate_job(job_name: str, work_path: str, abaqus_cmd: str = 'abaqus', wait_seconds: float = 120) -> bool:
+    """`abaqus terminate job=...` в каталоге задания; ждёт исчезновения .lck. True — задание остановлено."""
+    subprocess.run(f'{abaqus_cmd} terminate job={job_name}', shell=True, cwd=work_path,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    lck = os.path.join(work_path, job_name + '.lck')
+    t0 = time.time()
+    while os.path.exists(lck) and time.time() - t0 < wait_seconds:
+        time.sleep(2)
+    return not os.path.exists(lck)
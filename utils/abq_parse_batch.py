@@ -0,0 +1,90 @@
+# -*- utf-8 -*-
+"""
+Parse many ODBs in one Abaqus Python session (odbAccess only: no CAE start-up, no CAE token).
+
+    abaqus python abq_parse_batch.py -- spool.json                 {"payloads": [<payload.json>, ...]}
+    abaqus python abq_parse_batch.py -- <spool dir>                every *.json payload in the directory
+    abaqus python abq_parse_batch.py -- payload.json a.odb b.odb   ODBs parsed with the payload settings
+
+A payload is the json the orchestrator writes for abq_parse_results.py (solver_cfg, optional
+geometry_cfg); its ODB <job_name_prefix>.odb is looked up in the payload's "work_dir" or, by
+default, next to the payload. Each ODB goes through abq_parse_results.parce_results; a failed
+ODB is reported and the session moves on to the next one.
+"""
+
+import os, sys
+import glob
+import copy
+import traceback
+
+from abq_parse_results import parce_results, load_json_utf8, _ns
+
+
+def _entries(args):
+    """[(payload dict, work_dir)] from the command line."""
+    entries = []
+    i = 0
+    while i < len(args):
+        a = args[i]
+        i += 1
+        if os.path.isdir(a):
+            for path in sorted(glob.glob(os.path.join(a, '*.json'))):
+                entry = _payload_entry(path)
+                if 'solver_cfg' in entry[0]:    # spool lists and other json in the directory are skipped
+                    entries.append(entry)
+        elif a.lower().endswith('.json'):
+            data = load_json_utf8(a)
+            if 'payloads' in data:
+                entries.extend(_payload_entry(path) for path in data['payloads'])
+                continue
+            odbs = []
+            while i < len(args) and args[i].lower().endswith('.odb'):
+                odbs.append(args[i])
+                i += 1
+            if not odbs:
+                entries.append(_payload_entry(a, data))
+            for odb in odbs:
+                entries.append(_odb_entry(data, odb))
+        else:
+            raise RuntimeError("%s: expects a spool .json, a payload .json (+ .odb) or a spool directory" % a)
+    return entries
+
+
+def _odb_entry(template, odb_path):
+    # the payload's settings for another ODB: its job name and directory, no design geometry
+    data = copy.deepcopy(template)
+    data['solver_cfg']['job_name_prefix'] = os.path.splitext(os.path.basename(odb_path))[0]
+    data.pop('geometry_cfg', None)
+    return data, os.path.dirname(os.path.abspath(odb_path))
+
+
+def _payload_entry(path, data=None):
+    data = data if data is not None else load_json_utf8(path)
+    return data, data.get('work_dir') or os.path.dirname(os.path.abspath(path))
+
+
+def parse_batch(entries):
+    """Parse every (payload, work_dir) entry; returns the number of failed ODBs."""
+    prev_path = os.getcwd()
+    failed = 0
+    for data, work_dir in entries:
+        solver_cfg = _ns(data.get('solver_cfg', {}))
+        try:
+            os.chdir(work_dir)
+            parce_results(solver_cfg, data.get('geometry_cfg'))
+            sys.stdout.write("OK: parsed %s\n" % os.path.join(work_dir, solver_cfg.job_name_prefix + '.odb'))
+        except Exception:
+            failed += 1
+            sys.stderr.write("ERROR: %s/%s.odb\n" % (work_dir, getattr(solver_cfg, 'job_name_prefix', '?')))
+            traceback.print_exc()
+        finally:
+            os.chdir(prev_path)
+    return failed
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != '--']
+    entries = _entries(args)
+    if not entries:
+        raise RuntimeError("No payloads to parse (expects spool .json, spool dir or payload .json + .odb).")
+    sys.exit(1 if parse_batch(entries) else 0)
@@ -3,10 +3,23 @@
 import os, sys
 import math
 import json
+import bisect
 
 from odbAccess import openOdb
 
+try:
+    import numpy as np
+    import abq_stability
+except ImportError:  # pragma: no cover
+    np = None
+    abq_stability = None
+
 SYS_AGREEMENT_ERROR_BY_TIME = 0.01
+METRICS_NAME = 'metrics.json'
+# binary full-field archive (solver.outputs.field_archive), read by utils/field_archive.py
+FIELDS_DIR = 'fields'
+MISES_DTYPE = [('element', '<i4'), ('ip', '<i2'), ('mises', '<f4')]
+U1_DTYPE = [('node', '<i4'), ('u1', '<f4')]
 
 if sys.version_info.major >=3:
     xrange = range
@@ -21,6 +34,11 @@ except Exception:  # pragma: no cover
 
 
 
+def _ns(obj):
+    if isinstance(obj, dict):
+        return SimpleNamespace(**{k: _ns(v) for k, v in obj.items()})
+    return obj
+
 def load_json_utf8(path):
     try:
         import io
@@ -30,20 +48,53 @@ def load_json_utf8(path):
         with open(path, 'rb') as f:
             return json.loads(f.read().decode('utf-8'))
 
-def _nearest_frame(step, target_time):
-    # Return (frame, idx, actual_time) closest to target_time
-    frames = step.frames
-    if not frames:
-        return None, -1, None
-    best = None
-    best_idx = -1
-    best_dt = 1e99
-    for i, fr in enumerate(frames):
-        t = fr.frameValue
-        dt = abs(t - target_time)
-        if dt < best_dt:
-            best = fr; best_idx = i; best_dt = dt
-    return best, best_idx, (best.frameValue if best else None)
+def _stability_limits(solver_cfg):
+    # solver.stability thresholds (abq_stability.THRESHOLDS defaults without numpy too)
+    if abq_stability is not None:
+        return abq_stability.thresholds(solver_cfg)
+    cfg = getattr(solver_cfg, 'stability', None)
+    return {'tau_k': float(getattr(cfg, 'tau_k', 0.05)), 'tau_a': float(getattr(cfg, 'tau_a', 0.05)),
+            'tau_delta': float(getattr(cfg, 'tau_delta', 0.2)), 'tau_e': None}
+
+def _time_scale(solver_cfg):
+    # explicit jobs run in scaled time (solver.explicit.time_scaling); metrics use config times
+    if str(getattr(solver_cfg, 'analysis', 'standard')) != 'explicit':
+        return 1.0
+    return float(solver_cfg.explicit.time_scaling)
+
+def _step_chain(odb, step_name, time_scale=1.0):
+    """
+    Frames of the step and of its restart continuations '<step>-rK' (appended by restartjoin)
+    as a list of (frame, step, total_time). Frames of an attempt beyond the point the next
+    attempt restarted from are dropped, so the chain is monotone in total time.
+    Total times are divided by `time_scale` (config times of an explicit job).
+    """
+    steps = [odb.steps[k] for k in odb.steps.keys() if k == step_name or k.startswith(step_name + '-r')]
+    chain = []
+    for i, step in enumerate(steps):
+        t_next = steps[i + 1].totalTime if i + 1 < len(steps) else 1e99
+        for fr in step.frames:
+            t = step.totalTime + fr.frameValue
+            if t < t_next - 1e-9 * time_scale:
+                chain.append((fr, step, t / time_scale))
+    return chain
+
+def _nearest_frame(chain, target_time, times=None):
+    """
+    (frame, step, idx, actual_total_time) closest to target_time: binary search on the chain's
+    monotone total times (`times`, precomputed once per ODB); ties go to the earlier frame.
+    """
+    if not chain:
+        return None, None, -1, None
+    if times is None:
+        times = [c[2] for c in chain]
+    i = bisect.bisect_left(times, target_time)
+    if i == len(times) or (i > 0 and target_time - times[i - 1] <= times[i] - target_time):
+        i -= 1
+    while i > 0 and times[i - 1] == times[i]:
+        i -= 1
+    fr, step, t = chain[i]
+    return fr, step, i, t
 
 def _write_csv(path, header, rows):
     import csv
@@ -53,11 +104,52 @@ def _write_csv(path, header, rows):
         for r in rows:
             w.writerow(r)
 
-def _sum_reaction_forces(frame, inst_name):
-    """Sum nodal RF over all nodes of instance 'inst_name' in this frame."""
+def _bulk_blocks(field, instance):
+    """
+    Bulk data of `field` on `instance` (getSubset(region=instance).bulkDataBlocks): one block per
+    element type / position with labels and data as NumPy arrays, no per-value Python objects.
+    None when this Abaqus Python has no bulk access (no numpy, no bulkDataBlocks, no instance):
+    the callers then loop over FieldValues as before.
+    """
+    if np is None or instance is None:
+        return None
+    try:
+        blocks = field.getSubset(region=instance).bulkDataBlocks
+    except Exception:
+        return None
+    return [b for b in blocks if b.instance is None or b.instance.name == instance.name]
+
+def _block_data(block):
+    # block.data as a 2D float array (rows: output locations, columns: components)
+    data = np.asarray(block.data, dtype=float)
+    return data.reshape(data.shape[0], -1) if data.size else data.reshape(0, 1)
+
+def _block_mises(block):
+    """Mises of a stress block: block.mises when Abaqus filled it, else from the components."""
+    mises = getattr(block, 'mises', None)
+    if mises is not None and len(mises):
+        return np.asarray(mises, dtype=float).ravel()
+    d = _block_data(block)
+    d = np.hstack([d, np.zeros((d.shape[0], max(6 - d.shape[1], 0)))])[:, :6]
+    s11, s22, s33, s12, s13, s23 = d.T
+    j2 = 0.5*((s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2) + 3.0*(s12**2 + s13**2 + s23**2)
+    return np.sqrt(np.maximum(j2, 0.0))
+
+def _sum_reaction_forces(frame, inst_name, instance=None):
+    """Sum nodal RF over all nodes of instance 'inst_name' in this frame (bulk arrays with `instance`)."""
     if 'RF' not in frame.fieldOutputs:
         return None  # not available
     RF = frame.fieldOutputs['RF']
+    blocks = _bulk_blocks(RF, instance)
+    if blocks is not None:
+        total = np.zeros(3)
+        n = 0
+        for b in blocks:
+            d = _block_data(b)
+            total[:min(d.shape[1], 3)] += d.sum(axis=0)[:3]
+            n += d.shape[0]
+        sx, sy, sz = [float(c) for c in total]
+        return sx, sy, sz, math.sqrt(sx*sx + sy*sy + sz*sz), n
     # Filter values by instance
     vals = [v for v in RF.values if v.instance and v.instance.name == inst_name]
     sx = sy = sz = 0.0
@@ -68,21 +160,80 @@ def _sum_reaction_forces(frame, inst_name):
     mag = math.sqrt(sx*sx + sy*sy + sz*sz)
     return sx, sy, sz, mag, len(vals)
 
-def _transform_U_to_cyl(frame, datum):
-    """Return transformed U field (Ur, Utheta, Uz) using cylindrical datum."""
-    if 'U' not in frame.fieldOutputs:
+def _sum_rp_reaction_forces(step, target_time, suffix=''):
+    """
+    Sum RF1..RF3 history over the loader reference points (rigid_cylinder / crimper models)
+    at the history point nearest to target_time. Same tuple as _sum_reaction_forces.
+    With `suffix` only the jaws of one batched design (instances JAW-k<suffix>) are summed.
+    """
+    sx = sy = sz = 0.0
+    n = 0
+    for key, hr in step.historyRegions.items():
+        if suffix and (suffix + '.') not in key.upper():
+            continue
+        if 'RF1' not in hr.historyOutputs:
+            continue
+        comps = []
+        for comp in ('RF1', 'RF2', 'RF3'):
+            data = hr.historyOutputs[comp].data if comp in hr.historyOutputs else ()
+            if not data:
+                comps.append(0.0)
+                continue
+            j = _nearest_indices([target_time], [tv[0] for tv in data])[0]
+            comps.append(float(data[j][1]))
+        sx += comps[0]; sy += comps[1]; sz += comps[2]
+        n += 1
+    if n == 0:
         return None
-    U = frame.fieldOutputs['U']
-    try:
-        Uc = U.getTransformedField(datumCsys=datum)  # vector field transformation
-        return Uc
-    except Exception as e:
+    mag = math.sqrt(sx*sx + sy*sy + sz*sz)
+    return sx, sy, sz, mag, n
+
+def _cyl_axis(datum):
+    """(origin, unit axis) of the cylindrical datum csys; None without datum."""
+    if datum is None:
+        return None
+    origin = tuple(float(c) for c in datum.origin)
+    axis = tuple(float(c) for c in datum.zAxis)
+    norm = math.sqrt(sum(c*c for c in axis))
+    return origin, tuple(c / norm for c in axis)
+
+def _node_coordinates(instance, cache):
+    """
+    Undeformed node coordinates of `instance`, read once per design into `cache`:
+    (sorted labels, coords) arrays with numpy, {label: coords} otherwise.
+    """
+    if instance is None:
         return None
+    if instance.name not in cache:
+        nodes = instance.nodes
+        if np is not None:
+            labels = np.asarray([n.label for n in nodes], dtype=int)
+            coords = np.asarray([n.coordinates for n in nodes], dtype=float).reshape(len(labels), -1)
+            order = np.argsort(labels)
+            cache[instance.name] = (labels[order], coords[order])
+        else:
+            cache[instance.name] = dict((n.label, tuple(n.coordinates)) for n in nodes)
+    return cache[instance.name]
 
-def _collect_S_mises(frame, inst_name):
-    """Collect (elementLabel, ipIndex, mises) for instance 'inst_name'."""
+def _radial(points, u, axis):
+    """
+    Radial component of the displacements `u` at `points` (N x 3 arrays) about the datum axis:
+    u . e_r with e_r the unit radius of the undeformed position (0 on the axis itself).
+    """
+    origin, z = np.asarray(axis[0]), np.asarray(axis[1])
+    rel = points[:, :3] - origin
+    rel -= np.outer(rel.dot(z), z)
+    r = np.sqrt((rel*rel).sum(axis=1))
+    r[r == 0.0] = np.inf
+    return (u[:, :3] * rel).sum(axis=1) / r
+
+def _mises_arrays(frame, inst_name, instance=None):
+    """
+    (elementLabels, ipIndices, mises) for instance 'inst_name': NumPy arrays from bulk data with
+    `instance`, lists from the FieldValue loop otherwise. None if S is not in the frame.
+    """
     if 'S' not in frame.fieldOutputs:
-        return []
+        return None
     S = frame.fieldOutputs['S']
     # prefer integration points
     try:
@@ -90,7 +241,18 @@ def _collect_S_mises(frame, inst_name):
         S = S.getSubset(position=INTEGRATION_POINT)
     except Exception:
         pass
-    out = []
+    blocks = _bulk_blocks(S, instance)
+    if blocks is not None:
+        labels, ips, mises = [np.zeros(0, int)], [np.zeros(0, int)], [np.zeros(0)]
+        for b in blocks:
+            block_labels = np.asarray(b.elementLabels).ravel()
+            block_ips = getattr(b, 'integrationPoints', None)
+            labels.append(block_labels)
+            ips.append(np.asarray(block_ips).ravel() if block_ips is not None and len(block_ips) == len(block_labels)
+                       else np.ones(len(block_labels), int))
+            mises.append(_block_mises(b))
+        return np.concatenate(labels), np.concatenate(ips), np.concatenate(mises)
+    labels, ips, mises = [], [], []
     for v in S.values:
         if not v.instance or v.instance.name != inst_name:
             continue
@@ -105,22 +267,88 @@ def _collect_S_mises(frame, inst_name):
             s11, s22, s33, s12, s13, s23 = d
             j2 = 0.5*((s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2) + 3.0*(s12**2 + s13**2 + s23**2)
             vm = math.sqrt(max(j2,0.0))
-        out.append((v.elementLabel, ipID, vm))
-    return out
-
+        labels.append(v.elementLabel); ips.append(ipID); mises.append(vm)
+    return labels, ips, mises
 
-def _collect_U1_cyl(frame, datum, inst_name):
-    """Collect (nodeLabel, U1) where U transformed to cylindrical CS."""
-    Uc = _transform_U_to_cyl(frame, datum)
-    if Uc is None:
-        return []
-    out = []
-    for v in Uc.values:
+def _u1_arrays(frame, axis, inst_name, instance=None, coords=None):
+    """
+    (nodeLabels, U1) with U1 the radial displacement about the cylindrical datum `axis`
+    (_cyl_axis), projected on the undeformed node positions `coords` (_node_coordinates)
+    instead of a getTransformedField copy of the whole field. None without U, datum or coords.
+    """
+    if 'U' not in frame.fieldOutputs or axis is None or coords is None:
+        return None
+    U = frame.fieldOutputs['U']
+    blocks = _bulk_blocks(U, instance)
+    if blocks is not None:
+        node_labels, node_coords = coords
+        labels, u1 = [np.zeros(0, int)], [np.zeros(0)]
+        for b in blocks:
+            d = _block_data(b)
+            if d.shape[1] > 1:
+                block_labels = np.asarray(b.nodeLabels).ravel()
+                d = np.hstack([d, np.zeros((d.shape[0], max(3 - d.shape[1], 0)))])
+                points = node_coords[np.searchsorted(node_labels, block_labels)]
+                labels.append(block_labels)
+                u1.append(_radial(points, d, axis))
+        return np.concatenate(labels), np.concatenate(u1)
+    origin, z = axis
+    if not isinstance(coords, dict):
+        coords = dict(zip(coords[0].tolist(), coords[1].tolist()))
+    labels, u1 = [], []
+    for v in U.values:
         if not v.instance or v.instance.name != inst_name:
             continue
-        d = v.data
-        u1 = d[0] if len(d) > 1 else ''
-        out.append((v.nodeLabel, u1))
+        d = tuple(v.data) + (0.0,)*3
+        if len(v.data) > 1:
+            rel = [p - o for p, o in zip(coords[v.nodeLabel], origin)]
+            along = sum(a*b for a, b in zip(rel, z))
+            rel = [a - along*b for a, b in zip(rel, z)]
+            r = math.sqrt(sum(a*a for a in rel))
+            labels.append(v.nodeLabel)
+            u1.append(sum(a*b for a, b in zip(d, rel)) / r if r > 0.0 else 0.0)
+    return labels, u1
+
+def _rows(columns):
+    # CSV rows from the column arrays / lists of _mises_arrays, _u1_arrays
+    if columns is None:
+        return []
+    return list(zip(*[c.tolist() if hasattr(c, 'tolist') else list(c) for c in columns]))
+
+def _percentile(values, q):
+    """q-th percentile (linear interpolation, as numpy.percentile)."""
+    if np is not None:
+        return float(np.percentile(np.asarray(values, dtype=float), q))
+    v = sorted(values)
+    pos = (len(v) - 1) * q / 100.0
+    lo = int(math.floor(pos)); hi = min(lo + 1, len(v) - 1)
+    return float(v[lo] + (v[hi] - v[lo]) * (pos - lo))
+
+def _frame_metrics(t_act, mises, rf, u1, percentile, diameter):
+    """
+    Reductions of one frame of a design inside the ODB session (arrays of _mises_arrays,
+    _u1_arrays): max / percentile Mises with the element of the max, RF resultant, max / mean
+    radial displacement and the crimped diameter (diameter + 2 * max U1; None when the design's
+    diameter is not in the payload).
+    """
+    out = {'time': t_act}
+    if mises is not None and len(mises[2]):
+        labels, _, values = mises
+        k = int(np.argmax(values)) if np is not None else max(xrange(len(values)), key=values.__getitem__)
+        out['mises_max'] = float(values[k])
+        out['mises_max_element'] = int(labels[k])
+        out['mises_p%g' % percentile] = _percentile(values, percentile)
+    if rf is not None:
+        sx, sy, sz, mag, n = rf
+        out.update({'rf': [sx, sy, sz], 'rf_resultant': mag, 'rf_nodes': n})
+    if u1 is not None and len(u1[1]):
+        if np is not None:
+            values = np.asarray(u1[1], dtype=float)
+            out['u1_max'], out['u1_mean'] = float(values.max()), float(values.mean())
+        else:
+            values = u1[1]
+            out['u1_max'], out['u1_mean'] = float(max(values)), float(sum(values) / float(len(values)))
+        out['diameter'] = diameter + 2.0 * out['u1_max'] if diameter is not None else None
     return out
 
 def _series(history_region, key):
@@ -180,6 +408,34 @@ def _nearest_indices(query_t, src_t):
         idx[i] = j
     return idx
 
+def _energy_ratio(steps, rel_floor=1e-3, key='ALLAE'):
+    """
+    (max, last) of <key>/ALLIE (ALLAE: artificial, ALLKE: kinetic share of an explicit job)
+    over the 'History-Output-stable_check' energies of `steps`.
+    Points where ALLIE is below rel_floor * max(ALLIE) (start of loading) are skipped.
+    Returns (None, None) without energy history.
+    """
+    I, A = [], []
+    for step in steps:
+        try:
+            hr = step.historyRegions['Assembly ASSEMBLY']
+        except Exception:
+            continue
+        tI, vI = _series(hr, 'ALLIE')
+        tA, vA = _series(hr, key)
+        if not (tI and tA):
+            continue
+        iA = _nearest_indices(tI, tA)
+        I.extend(vI)
+        A.extend([vA[j] for j in iA])
+    if not I:
+        return None, None
+    floor = rel_floor * max(abs(v) for v in I)
+    ratios = [abs(_safe_div(a, i)) for i, a in zip(I, A) if abs(i) > floor]
+    if not ratios:
+        return None, None
+    return max(ratios), ratios[-1]
+
 def _safe_div(a, b, eps=1e-16):
     """
     Numerically safe division a/b with sign-preserving epsilon.
@@ -204,11 +460,12 @@ def last_stable_frame_fast(frames, step,
                            tauK=0.05, tauA=0.05, tauDelta=0.2):
     """
     Pick the last stable frame based on energy criteria using O(N+M) time matching.
+    Fallback for an Abaqus Python without numpy; otherwise _stability_chain (abq_stability.py)
+    evaluates the same criteria plus the energy balance for all frames at once.
 
     Criteria per frame f (quasi-static intent):
       - RK = ALLKE/ALLIE <= tauK  (small kinetic energy)
       - RA = ALLAE/ALLIE <= tauA  (small artificial energy; 0 if ALLAE missing)
-      - Ebal = |ALLWK - (ALLIE+ALLKE+ALLAE+ALLVD+ALLCD)| / max(|ALLWK|, eps) <= tauE
       - Smoothness: dI = |delta(ALLIE)| / max(1, |ALLIE|) <= tauDelta
 
     The function scans frames from the end to achieve early exit on the first stable frame.
@@ -224,8 +481,6 @@ def last_stable_frame_fast(frames, step,
         Threshold for RK.
     tauA : float
         Threshold for RA.
-    tauE : float
-        Threshold for Ebal.
     tauDelta : float
         Threshold for the relative increment of ALLIE.
 
@@ -286,120 +541,277 @@ def last_stable_frame_fast(frames, step,
 
     return frames[best_idx], best_idx
 
+def _stability_chain(chain, limits):
+    """
+    Stability series of every frame of the chain (abq_stability.stability_series per restart
+    attempt, matched to that attempt's energy histories) and the chain index of the last stable
+    frame of the last attempt under `limits` (solver.stability).
+    """
+    steps = []
+    for c in chain:
+        if c[1] not in steps:
+            steps.append(c[1])
+    parts = []
+    for attempt, step in enumerate(steps):
+        try:
+            hr = step.historyRegions['Assembly ASSEMBLY']
+            energies = dict((key, _series(hr, key)) for key in abq_stability.ENERGY_KEYS)
+        except Exception:
+            energies = {}
+        rows = [c for c in chain if c[1] is step]
+        parts.append((attempt, [c[2] for c in rows],
+                      abq_stability.stability_series([c[0].frameValue for c in rows], energies)))
+    series = abq_stability.concat_series(parts)
+    last = parts[-1][2]
+    idx_last = abq_stability.select_last_stable(last, **limits) + len(chain) - len(last['RK'])
+    return series, idx_last
+
+def _batch_members(solver_cfg):
+    """
+    [(job_name, instance suffix)] of the designs in the ODB: one design with the plain
+    FRAME / BALLOON instances, or the members of a batched deck (instances FRAME_<tag>, ...).
+    """
+    members = getattr(getattr(solver_cfg, 'batch', None), 'members', None) or []
+    if not members:
+        return [(solver_cfg.job_name_prefix, '')]
+    return [(str(job), '_' + str(tag).upper()) for tag, job in members]
+
+def _instance(instances, name):
+    # OdbInstance for bulk extraction; None (FieldValue loop) if the assembly has no such name
+    return instances[name] if name in instances.keys() else None
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+def _write_dumps(out_dir, names, mises, rf, u1):
+    """Full-field CSVs of one frame (solver.outputs.field_dumps): every IP Mises, RF sum, every node U1."""
+    _write_csv(os.path.join(out_dir, names[0]), ['elementLabel', 'ipIndex', 'Mises'], _rows(mises))
+    if rf is not None:
+        _write_csv(os.path.join(out_dir, names[1]), ['sum_RFx', 'sum_RFy', 'sum_RFz', 'resultant', 'n_nodes'],
+                   [rf])
+    u_rows = _rows(u1)
+    if u_rows:
+        _write_csv(os.path.join(out_dir, names[2]), ['nodeLabel', 'U1_cyl'], u_rows)
+
+def _write_field_archive(out_dir, tag, mises, u1):
+    """
+    Binary full fields of one frame (solver.outputs.field_archive) as structured .npy arrays:
+    fields/<tag>_mises.npy (element, ip, mises) and fields/<tag>_u1.npy (node, u1);
+    np.load(..., mmap_mode='r') reads them without parsing (utils/field_archive.py).
+    """
+    if np is None:
+        sys.stderr.write("INFO: no numpy in this Abaqus Python; skip field archive.\n")
+        return
+    path = os.path.join(out_dir, FIELDS_DIR)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    if mises is not None:
+        arr = np.zeros(len(mises[2]), dtype=MISES_DTYPE)
+        arr['element'], arr['ip'], arr['mises'] = mises
+        np.save(os.path.join(path, tag + '_mises.npy'), arr)
+    if u1 is not None:
+        arr = np.zeros(len(u1[1]), dtype=U1_DTYPE)
+        arr['node'], arr['u1'] = u1
+        np.save(os.path.join(path, tag + '_u1.npy'), arr)
+
+def _frame_fields(frame, rf, frame_inst, frame_obj, cyl_axis, report):
+    """(mises, rf, u1) of one frame of a design: S and U read from the ODB once."""
+    mises = _mises_arrays(frame, frame_inst, frame_obj)
+    u1 = _u1_arrays(frame, cyl_axis, frame_inst, frame_obj, _node_coordinates(frame_obj, report.coords))
+    return mises, rf, u1
+
+def _export_frame(out_dir, tag, dump_names, t_act, fields, report):
+    """
+    Reduced metrics of one frame's fields (returned), CSV dumps (report.field_dumps, files
+    dump_names) and the binary archive <tag> (report.field_archive).
+    """
+    mises, rf, u1 = fields
+    if report.field_dumps:
+        _write_dumps(out_dir, dump_names, mises, rf, u1)
+    if report.field_archive:
+        _write_field_archive(out_dir, tag, mises, u1)
+    return _frame_metrics(t_act, mises, rf, u1, report.percentile, report.diameter)
+
+def _export_design(out_dir, chain, idx_last, cyl_axis, targets, loading_model, suffix,
+                   energies, instances, report):
+    """
+    Metrics of one design (instances FRAME<suffix>, BALLOON<suffix>) reduced in the ODB session:
+    returns the summary written to out_dir/metrics.json (targets by configured time, last stable
+    frame chain[idx_last], energies). Frames are picked first and each distinct frame is read
+    once, also when targets and the last frame coincide. Full fields only with
+    report.field_dumps (CSV) / report.field_archive (npy).
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    frame_inst = 'FRAME' + suffix
+    frame_obj = _instance(instances, frame_inst)
+    balloon_obj = _instance(instances, 'BALLOON' + suffix)
+
+    def _reaction_force(frame, frame_step):
+        if loading_model == 'membrane':
+            return _sum_reaction_forces(frame, 'BALLOON' + suffix, balloon_obj)
+        return _sum_rp_reaction_forces(frame_step, frame.frameValue, suffix)
+
+    fields = {}
+
+    def _metrics(idx, tag, dump_tag):
+        frame, frame_step, t_act = chain[idx]
+        if idx not in fields:
+            rf = _reaction_force(frame, frame_step)
+            if rf is None:
+                sys.stderr.write("INFO: RF not present at %s; skip RF sum.\n" % tag)
+            fields[idx] = _frame_fields(frame, rf, frame_inst, frame_obj, cyl_axis, report)
+        dump_names = [name % dump_tag for name in
+                      ("S_Mises_frame_%s.csv", "RF_balloon_SUM_%s.csv", "U1_frame_cyl_%s.csv")]
+        return _export_frame(out_dir, tag, dump_names, t_act, fields[idx], report)
+
+    time_last = chain[idx_last][2]
+    times = [c[2] for c in chain]
+    summary = {'last_time': time_last, 'targets': {}, 'cases': {}}
+    for tt in targets:
+        fr, fr_step, idx, t_act = _nearest_frame(chain, tt, times)
+        if fr is None:
+            sys.stderr.write("WARN: no frames in step; skip t=%.3f\n" % tt); continue
+
+        print('expects %5f > get %5f' % (tt, t_act))
+        if tt - t_act > SYS_AGREEMENT_ERROR_BY_TIME:
+            print('\t Error: nearest time frame not found.')
+            continue
+        summary['targets']['%g' % tt] = _metrics(idx, 't%g' % tt, 't%.2f' % t_act)
+        sys.stdout.write("OK: exported t_target=%.2f (frame idx=%d, t_actual=%.6f)\n" % (tt, idx, t_act))
+
+    summary['last'] = _metrics(idx_last, 't_last', 't_last')
+    if report.field_dumps:
+        _write_csv(os.path.join(out_dir, "last_time_step.csv"),
+                   ['last_time',], [(time_last,)])
+
+    # artificial / kinetic energy shares (increment tuner, explicit quasi-static check)
+    (ratio_max, ratio_last), (kinetic_max, kinetic_last) = energies
+    if ratio_max is not None:
+        _write_csv(os.path.join(out_dir, "energies.csv"),
+                   ['max_ALLAE_ALLIE', 'last_ALLAE_ALLIE', 'max_ALLKE_ALLIE', 'last_ALLKE_ALLIE'],
+                   [(ratio_max, ratio_last, kinetic_max, kinetic_last)])
+    summary['energies'] = {'max_ALLAE_ALLIE': ratio_max, 'last_ALLAE_ALLIE': ratio_last,
+                           'max_ALLKE_ALLIE': kinetic_max, 'last_ALLKE_ALLIE': kinetic_last}
+    return summary
+
+def _export_load_case(out_dir, case_name, case_chain, cyl_axis, loading_model, suffix, instances, report):
+    """
+    End-of-case metrics of one design for a load case step (solver_cfg.load_cases) on the last
+    frame of the case; with report.field_dumps also case_<name>_{S_Mises,RF,U1}.csv, with
+    report.field_archive fields/case_<name>_{mises,u1}.npy.
+    """
+    fr, fr_step, t_act = case_chain[-1]
+    frame_inst = 'FRAME' + suffix
+    frame_obj = _instance(instances, frame_inst)
+    if loading_model == 'membrane':
+        rf = _sum_reaction_forces(fr, 'BALLOON' + suffix, _instance(instances, 'BALLOON' + suffix))
+    else:
+        rf = _sum_rp_reaction_forces(fr_step, fr.frameValue, suffix)
+    sys.stdout.write("OK: exported load case %s (t_actual=%.6f)\n" % (case_name, t_act))
+    dump_names = ['case_%s_%s.csv' % (case_name, name) for name in ('S_Mises', 'RF', 'U1')]
+    return _export_frame(out_dir, 'case_' + case_name, dump_names, t_act,
+                         _frame_fields(fr, rf, frame_inst, frame_obj, cyl_axis, report), report)
+
 def parce_results(
-    solver_cfg
+    solver_cfg,
+    geometry_cfg=None
 ):
+    """
+    Reduce the metrics of every design in <job>.odb inside this session and write one
+    <results_root>/<job>/metrics.json per design (plus energies.csv for the increment tuner).
+    Full-field CSVs (every IP Mises, every node U1) only with solver.outputs.field_dumps,
+    binary fields/*.npy with solver.outputs.field_archive.
+    """
     step_name  = solver_cfg.step_name
     job_name   = solver_cfg.job_name_prefix
     res_root   = solver_cfg.results_root
 
     odb_path = str(job_name+'.odb')
 
-    out_dir = os.path.join(res_root, job_name)
-
     if not os.path.exists(res_root):
         os.makedirs(res_root)
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
 
     # open ODB
     print(odb_path)
     odb = openOdb(odb_path, readOnly=True)
-    asm = odb.rootAssembly
-
-    step = odb.steps[str(step_name)]
-
-    # build cylindrical datum as in the model (origin, point1=(1,0,0), point2=(0,1,0), axis Z)
-    cyl_datum = asm.datumCsyses[asm.datumCsyses.keys()[-1]]
-
-    # target times
-    # targets = [0.1, 0.75, 1.0]
-    targets = solver_cfg.outputs.frame_time_for_metric
+    try:
+        asm = odb.rootAssembly
 
-    frame_last, idx_last = last_stable_frame_fast(step.frames, step, tauK=0.05, tauA=0.05, tauDelta=0.2)
+        # the step plus its restart continuations (utils/restart_recovery.py)
+        time_scale = _time_scale(solver_cfg)
+        chain = _step_chain(odb, str(step_name), time_scale)
+        step = chain[-1][1]
 
-    print(' *-* Found last frame: ', step.frames[idx_last].frameValue)
+        # cylindrical datum as in the model (origin, point1=(1,0,0), point2=(0,1,0), axis Z):
+        # radial U is projected on the node positions, no transformed field copies
+        cyl_axis = _cyl_axis(asm.datumCsyses[asm.datumCsyses.keys()[-1]]) if asm.datumCsyses.keys() else None
 
-    for tt in targets:
-        fr, idx, t_act = _nearest_frame(step, tt)
+        # target times
+        # targets = [0.1, 0.75, 1.0]
+        targets = solver_cfg.outputs.frame_time_for_metric
 
-        print('expects %5f > get %5f' % (tt, step.frames[idx].frameValue))
-        if tt - step.frames[idx].frameValue > SYS_AGREEMENT_ERROR_BY_TIME:
-            print('\t Error: nearest time frame not found.')
-            continue
-        tt = step.frames[idx].frameValue
-        if fr is None:
-            sys.stderr.write("WARN: no frames in step; skip t=%.3f\n" % tt); continue
+        loading_model = str(getattr(getattr(solver_cfg, 'loading', None), 'model', 'membrane'))
 
-        # 1) S_Mises on frame
-        print('_collect_S_mises')
-        s_rows = _collect_S_mises(fr, 'FRAME')
-        _write_csv(os.path.join(out_dir, "S_Mises_frame_t%.2f.csv" % tt),
-                  ['elementLabel','ipIndex','Mises'],
-                  s_rows)
-
-        # 2) Sum RF on balloon (vector sum -> resultant)
-        print('_sum_reaction_forces')
-        rf = _sum_reaction_forces(fr, 'BALLOON')
-        if rf is not None:
-            sx, sy, sz, mag, n = rf
-            print(rf)
-            _write_csv(os.path.join(out_dir, "RF_balloon_SUM_t%.2f.csv" % tt),
-                      ['sum_RFx','sum_RFy','sum_RFz','resultant','n_nodes'],
-                      [(sx, sy, sz, mag, n)])
-        else:
-            sys.stderr.write("INFO: RF field not present at t=%.2f; skip RF sum.\n" % tt)
-
-        # 3) U1 in cylindrical CS on frame
-        u_rows = []
-        if cyl_datum is not None:
-            u_rows = _collect_U1_cyl(fr, cyl_datum, 'FRAME')
-        if u_rows:
-            _write_csv(os.path.join(out_dir, "U1_frame_cyl_t%.2f.csv" % tt),
-                      ['nodeLabel','U1_cyl'],
-                      u_rows)
+        # stability is judged on the last attempt's own frames and energy histories
+        # (whole-model energies: shared by all designs of a batch)
+        limits = _stability_limits(solver_cfg)
+        if abq_stability is not None:
+            stability, idx_last = _stability_chain(chain, limits)
         else:
-            sys.stderr.write("INFO: cannot transform U to cylindrical at t=%.2f (no U or no datum).\n" % tt)
-
-        sys.stdout.write("OK: exported t_target=%.2f (frame idx=%d, t_actual=%.6f)\n" % (tt, idx, t_act))
-
-
-    s_rows = _collect_S_mises(frame_last, 'FRAME')
-    _write_csv(os.path.join(out_dir, "S_Mises_frame_t_last.csv"),
-               ['elementLabel', 'ipIndex', 'Mises'],
-               s_rows)
-    rf = _sum_reaction_forces(frame_last, 'BALLOON')
-
-    sx, sy, sz, mag, n = rf
-    print(rf)
-    _write_csv(os.path.join(out_dir, "RF_balloon_SUM_t_last.csv"),
-               ['sum_RFx', 'sum_RFy', 'sum_RFz', 'resultant', 'n_nodes'],
-               [(sx, sy, sz, mag, n)])
-
-    u_rows = _collect_U1_cyl(step.frames[idx_last], cyl_datum, 'FRAME')
-    _write_csv(os.path.join(out_dir, "U1_frame_cyl_t_last.csv"),
-               ['nodeLabel', 'U1_cyl'],
-               u_rows)
-
-    _write_csv(os.path.join(out_dir, "last_time_step.csv"),
-               ['last_time',], [(frame_last.frameValue,)])
-    odb.close()
+            stability = None
+            last_frames = [c[0] for c in chain if c[1] is step]
+            frame_last, idx_last = last_stable_frame_fast(last_frames, step, tauK=limits['tau_k'],
+                                                          tauA=limits['tau_a'], tauDelta=limits['tau_delta'])
+            idx_last += len(chain) - len(last_frames)    # the last attempt's frames close the chain
+
+        print(' *-* Found last frame: ', chain[idx_last][2])
+
+        steps = []
+        for c in chain:
+            if c[1] not in steps:
+                steps.append(c[1])
+        energies = (_energy_ratio(steps), _energy_ratio(steps, key='ALLKE'))
+
+        outputs = getattr(solver_cfg, 'outputs', None)
+        members = _batch_members(solver_cfg)
+        summaries = {}
+        for member_job, suffix in members:
+            # the payload carries the geometry of a single design only (batch members: diameter from U1 later)
+            diameter = (geometry_cfg or {}).get('diameter') if suffix == '' else None
+            report = SimpleNamespace(field_dumps=bool(getattr(outputs, 'field_dumps', False)),
+                                     field_archive=str(getattr(outputs, 'field_archive', 'none')) != 'none',
+                                     percentile=float(getattr(outputs, 'mises_percentile', 99)),
+                                     diameter=float(diameter) if diameter is not None else None,
+                                     coords={})
+            summaries[member_job] = (report, _export_design(
+                os.path.join(res_root, member_job), chain, idx_last, cyl_axis,
+                targets, loading_model, suffix, energies, asm.instances, report))
+
+        # load cases sequenced after the main step (crimp, release, ...)
+        for case in getattr(solver_cfg, 'load_cases', None) or []:
+            case_chain = _step_chain(odb, str(case.name), time_scale)
+            if not case_chain:
+                sys.stderr.write("INFO: load case %s not reached; skip.\n" % case.name)
+                continue
+            for member_job, suffix in members:
+                report, summary = summaries[member_job]
+                summary['cases'][str(case.name)] = _export_load_case(
+                    os.path.join(res_root, member_job), str(case.name), case_chain, cyl_axis,
+                    loading_model, suffix, asm.instances, report)
+        for member_job, (report, summary) in summaries.items():
+            _write_json(os.path.join(res_root, member_job, METRICS_NAME), summary)
+            if stability is not None:
+                # per-frame criteria for re-tuning the thresholds without the ODB
+                abq_stability.write_series(os.path.join(res_root, member_job, abq_stability.STABILITY_NAME),
+                                           stability)
+    finally:
+        # batch sessions (abq_parse_batch.py) go on with the next ODB after a failure
+        odb.close()
 
 if __name__ == "__main__":
 
-    try:
-        from types import SimpleNamespace  # type: ignore
-    except Exception:
-        class SimpleNamespace(object):
-            def __init__(self, **kwargs):
-                for k, v in kwargs.items():
-                    setattr(self, k, v)
-
-    def _ns(obj):
-        if isinstance(obj, dict):
-            return SimpleNamespace(**{k: _ns(v) for k, v in obj.items()})
-        return obj
-
     json_arg = None
     for a in sys.argv[1:]:
         if a.lower().endswith(".json"):
@@ -412,4 +824,4 @@ if __name__ == "__main__":
     data = load_json_utf8(json_arg)
 
     solver_cfg = _ns(data.get("solver_cfg", {}))
-    parce_results(solver_cfg)
\ No newline at end of file
+    parce_results(solver_cfg, data.get("geometry_cfg"))
@@ -8,10 +8,13 @@ import getpass, math
 import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, List, Tuple
 
 import numpy as np
 
+from utils.abq_monitor import JobMonitor, required_times, terminate_job, is_explicit
+from utils.field_archive import design_members, pack_design
+
 try:
     from types import SimpleNamespace  # type: ignore
 except Exception:  # pragma: no cover
@@ -20,14 +23,40 @@ except Exception:  # pragma: no cover
             for k, v in kwargs.items():
                 setattr(self, k, v)
 
+# сводка метрик дизайна, которую пишет abq_parse_results.py в <results_root>/<job>/
+METRICS_NAME = 'metrics.json'
+
 def run_solver(
     solver_cfg: Union[Dict[str, Any], SimpleNamespace, None] = None,
     project_root: str = None,
     abaqus_cmd: str = None,
-    globalPath: str = None
+    globalPath: str = None,
+    timeout_min: float = None,
+    sleep_retries: int = None,
+    oldjob: str = None,
 ) -> (str, float):
+    def _job_processes(name: str) -> list:
+        # only processes of this job (its working directory): several jobs may run on the node
+        out = []
+        for proc in psu.process_iter(['pid', 'name', 'username', 'cwd']):
+            if (proc.info['name'] == name and proc.info['username'] == current_user
+                    and proc.info['cwd'] is not None
+                    and os.path.realpath(proc.info['cwd']) == os.path.realpath(work_path)):
+                out.append(proc)
+        return out
+
+    def _kill(procs: list) -> None:
+        for proc in procs:
+            try:
+                proc.kill()
+            except psu.Error:
+                pass
+
     def _get_info_about_solving_process() -> (str, float):
-        with open(project_root + '/' + solver_cfg.job_name_prefix + '.sta', 'r') as f:
+        if monitor is not None:
+            monitor.poll()
+            return 'monitor', monitor.total_time
+        with open(os.path.join(work_path, solver_cfg.job_name_prefix + '.sta'), 'r') as f:
             lines = f.readlines()
             line_status = lines[-1].strip('\n').strip('  ')
             _temp_array = np.array(lines[-3].strip('\n').strip('  ').split(' '))
@@ -35,8 +64,9 @@ def run_solver(
         return line_status, line_time
 
 
-    TIMEOUT_MIN = 60
-    SLEEP_RETRIES = 4
+    # timeout_min: предсказанный бюджет задания (utils/runtime_predictor.py)
+    TIMEOUT_MIN = 60 if timeout_min is None else timeout_min
+    SLEEP_RETRIES = 4 if sleep_retries is None else sleep_retries
 
     t0 = datetime.datetime.now()
     project_root = project_root or os.getcwd()
@@ -44,18 +74,33 @@ def run_solver(
         (getattr(solver_cfg, "abaqus_cmd", None) if isinstance(solver_cfg, SimpleNamespace) else None)
         or (solver_cfg or {}).get("abaqus_cmd") if isinstance(solver_cfg, dict) else None
     ) or "abaqus"
+    work_path = os.path.join(globalPath or os.getcwd(), project_root)
+    lck_path = os.path.join(work_path, solver_cfg.job_name_prefix + '.lck')
     prev_path = os.getcwd()
-    os.chdir(project_root)
+    os.chdir(work_path)
     cmd = (f'{abaqus_cmd} '
            f'job={solver_cfg.job_name_prefix} '
            f'inp={solver_cfg.job_name_prefix} '
-           f'cpus={solver_cfg.cpus} mp_mode=threads ask_delete=OFF')
+           + (f'oldjob={oldjob} ' if oldjob else '') +
+           f'cpus={solver_cfg.cpus} mp_mode={getattr(solver_cfg, "mp_mode", "threads")} ask_delete=OFF')
 
     # print("-------------------------------------------------------")
     # print("Running the following command:")
     # print(cmd)
     # print("-------------------------------------------------------")
 
+    monitor_cfg = getattr(solver_cfg, 'monitor', None)
+    monitor = None
+    if getattr(monitor_cfg, 'enabled', True):
+        monitor = JobMonitor(work_path, solver_cfg.job_name_prefix,
+                             required_times=required_times(solver_cfg),
+                             min_inc=getattr(monitor_cfg, 'min_inc', 1e-6),
+                             max_consecutive_cutbacks=getattr(monitor_cfg, 'max_consecutive_cutbacks', 5),
+                             stall_minutes=getattr(monitor_cfg, 'stall_minutes', 10),
+                             explicit=is_explicit(solver_cfg))
+    # процесс решателя: standard или explicit (explicit_dp при двойной точности)
+    solver_names = ('explicit', 'explicit_dp') if is_explicit(solver_cfg) else ('standard',)
+
     subprocess.run(
         cmd,
         shell=True,
@@ -66,48 +111,90 @@ def run_solver(
     current_user = getpass.getuser()
     times_check_sleep = 0
     time.sleep(5)
-    if (os.path.exists(globalPath+'/' + project_root + '/' + solver_cfg.job_name_prefix + '.lck')):
-        while (os.path.exists(globalPath+'/' + project_root + '/' + solver_cfg.job_name_prefix + '.lck')):
+    try:
+        while os.path.exists(lck_path):
             t = datetime.datetime.now() - t0
-            sec = t.seconds
-            m = int(t.total_seconds() // 60)
-            h = int(sec / 3600)
+            m = t.total_seconds() / 60
+            if monitor is not None:
+                verdict = monitor.poll()
+                if verdict == 'captured' or verdict.startswith('diverged'):
+                    terminate_job(solver_cfg.job_name_prefix, work_path, abaqus_cmd)
+                    print(f'[monitor] {verdict}: {monitor.summary()}')
+                    if verdict == 'captured':
+                        return 'ABAQUS stopped early: metric times reached', monitor.total_time
+                    return f'ABAQUS terminated: {verdict}', monitor.total_time
             if m > 1 and not checked:
-                for proc in psu.process_iter(['pid','name', 'username']):
-                    if proc.info['name'] == 'pre' and proc.info['username'] == current_user:
-                        os.system(f'pkill -n -9 pre')
-                        message = 'ABAQUS terminated with error in pre'
-                        os.chdir(prev_path)
-                        return message, 1
-                    if proc.info['name'] == 'package' and proc.info['username'] == current_user:
-                        os.system(f'pkill -n -9 package')
-                        message = 'ABAQUS terminated with error in package'
-                        os.chdir(prev_path)
+                for name in ('pre', 'package'):
+                    procs = _job_processes(name)
+                    if procs:
+                        _kill(procs)
+                        message = f'ABAQUS terminated with error in {name}'
                         return message, 1
                 checked = True
             if m < TIMEOUT_MIN:
-                for proc in psu.process_iter(['name', 'username']):
-                    if proc.info['name'] == 'standard' and proc.info['username'] == current_user:
-                        if psu.Process(proc.pid).status() == psu.STATUS_SLEEPING:
-                            times_check_sleep += 1
-                            if times_check_sleep > SLEEP_RETRIES:
-                                os.system(f'pkill -n -9 standard')
-                                message = 'ABAQUS standard killed with sleep status'
-                                if os.path.exists(project_root + '/' + solver_cfg.job_name_prefix + '.lck'):
-                                    os.remove(project_root + '/' + solver_cfg.job_name_prefix + '.lck')
-                                os.chdir(prev_path)
-                                return _get_info_about_solving_process()
-                        else:
-                            times_check_sleep = 0
+                for proc in [p for name in solver_names for p in _job_processes(name)]:
+                    if psu.Process(proc.pid).status() == psu.STATUS_SLEEPING:
+                        times_check_sleep += 1
+                        if times_check_sleep > SLEEP_RETRIES:
+                            _kill([proc])
+                            message = 'ABAQUS standard killed with sleep status'
+                            if os.path.exists(lck_path):
+                                os.remove(lck_path)
+                            _, _time = _get_info_about_solving_process()
+                            return message, _time
+                    else:
+                        times_check_sleep = 0
 
                 time.sleep(5)
             else:
-                os.system('pkill -n -9 standard')
+                _kill([p for name in solver_names for p in _job_processes(name)])
                 message = 'ABAQUS terminated due time'
                 _, _time = _get_info_about_solving_process()
-                os.chdir(prev_path)
                 return message, _time
-    return 'ok', 1.0
+        if monitor is not None:
+            verdict = monitor.poll()
+            print(f'[monitor] finished: {monitor.summary()}')
+            if verdict.startswith('diverged'):
+                # Standard stopped by itself (too many attempts, increment below minimum)
+                return f'ABAQUS terminated: {verdict}', monitor.total_time
+        return 'ok', 1.0
+    finally:
+        os.chdir(prev_path)
+
+
+def parce_results_batch(
+    jobs: List[Tuple[SimpleNamespace, str]] = None,
+    abaqus_cmd: str = 'abaqus',
+    processes: int = 1,
+) -> None:
+    """
+    Выгрузка метрик нескольких ODB в сессиях `abaqus python` (только odbAccess: без запуска CAE
+    и без токена CAE). jobs — [(solver_cfg, json_path)], json_path — payload парсера в каталоге
+    задания. Задания делятся между processes сессиями abq_parse_batch.py, идущими параллельно;
+    в каждой ODB разбираются по очереди.
+    """
+    if not jobs:
+        return
+    utils_path = os.path.join(os.getcwd(), 'utils')
+    payloads = [os.path.abspath(json_path) for _, json_path in jobs]
+    spool_dir = os.path.dirname(payloads[0])
+    n_sessions = max(min(int(processes), len(payloads)), 1)
+    procs = []
+    for k in range(n_sessions):
+        spool = os.path.join(spool_dir, f'parse_spool_{k}.json')
+        with open(spool, 'w', encoding='utf-8') as f:
+            json.dump({'payloads': payloads[k::n_sessions]}, f, indent=2)
+        procs.append(subprocess.Popen(
+            f'{abaqus_cmd} python {os.path.join(utils_path, "abq_parse_batch.py")} -- {spool}',
+            shell=True, cwd=spool_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    for proc in procs:
+        proc.wait()
+
+    # npy полей, записанные парсером, -> сжатый fields.h5 дизайна (solver.outputs.field_archive)
+    for solver_cfg, json_path in jobs:
+        if str(getattr(solver_cfg.outputs, 'field_archive', 'none')) == 'hdf5':
+            for job in design_members(solver_cfg):
+                pack_design(os.path.join(os.path.dirname(os.path.abspath(json_path)), solver_cfg.results_root, job))
 
 
 def parce_results(
@@ -115,39 +202,54 @@ def parce_results(
     abaqus_cmd: str = 'abaqus',
     json_path: str = None,
 ):
-    project_root = solver_cfg.work_root or os.getcwd()
-    prev_path = os.getcwd()
-    # print('Previous path: ',  prev_path)
-    # print('Project path: ',  project_root)
-    os.chdir(project_root)
-
-    cmd = (f'{abaqus_cmd} cae '
-           f'noGUI={os.path.join(prev_path, "utils", "abq_parse_results.py")} -- {json_path}'
-           )
-    #
-    # print("-------------------------------------------------------")
-    # print("Running the following command:")
-    # print(cmd)
-    # print("-------------------------------------------------------")
+    """Выгрузка метрик одного задания (payload json_path в его каталоге) — сессия из одной ODB."""
+    parce_results_batch([(solver_cfg, json_path)], abaqus_cmd)
 
-    subprocess.run(
-        cmd,
-        shell=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    os.chdir(prev_path)
+def _metrics_from_summary(
+        summary: Dict[str, Any] = None,
+        geometry_cfg: Union[SimpleNamespace, dict] = None,
+        solver_cfg: Union[SimpleNamespace, dict] = None,
+) -> Dict[str, Any]:
+    """Метрики дизайна из metrics.json (редукции посчитаны парсером в сессии ODB)."""
+    def _frame(frame: Union[Dict[str, Any], None], suffix: str) -> Dict[str, Any]:
+        frame = frame or dict()
+        u1_max = frame.get('u1_max')
+        diameter = frame.get('diameter')
+        if diameter is None and u1_max is not None:
+            diameter = geometry_cfg['diameter'] + 2 * u1_max
+        return {
+            f'S_mises_{suffix}': frame.get('mises_max', 'None'),
+            f'RF_{suffix}': frame.get('rf_resultant', 'None'),
+            f'Diameter_{suffix}': diameter if diameter is not None else 'None',
+        }
 
-def process_results(
+    data_out = dict()
+    for time_frame in solver_cfg.outputs.frame_time_for_metric:
+        data_out.update(_frame(summary['targets'].get(f'{float(time_frame):g}'), time_frame))
+    data_out['last time'] = summary['last_time']
+    data_out.update(_frame(summary['last'], 'last'))
+    # случаи нагружения после основного шага (solver.load_cases); недостигнутый случай — 'None'
+    for case in getattr(solver_cfg, 'load_cases', None) or []:
+        data_out.update(_frame(summary['cases'].get(case.name), case.name))
+    return data_out
+
+
+def collect_metrics(
         geometry_cfg: Union[SimpleNamespace, dict] = None,
         solver_cfg: Union[SimpleNamespace, dict] = None,
         work_path: str = None,
-        wbResults: Any= None,
-        filename: Any= None,
-        sheet_short: Any= None,
-        begining_time: Any = None,
-        fea_time: Any = None
-):
+) -> Union[Dict[str, Any], None]:
+    """
+    Метрики дизайна (S_mises_*, RF_*, Diameter_*, last time, *_last, *_<случай нагружения>)
+    из metrics.json, который пишет parce_results; без него — из полноформатных CSV
+    (solver.outputs.field_dumps, старые результаты). None, если расчёт не дал последнего кадра.
+    """
+    res_path = os.path.join(work_path, solver_cfg.results_root, solver_cfg.job_name_prefix)
+    summary_path = os.path.join(res_path, METRICS_NAME)
+    if os.path.exists(summary_path):
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            return _metrics_from_summary(json.load(f), geometry_cfg, solver_cfg)
+
     def _find_element_in_array_by_float(str_array: [str] = None, mask: Union[float, int, str] = None):
         out = []
         if type(mask) == float or type(mask) == int:
@@ -166,7 +268,6 @@ def process_results(
             return _data
         else:
             return 'None'
-    res_path = os.path.join(work_path, solver_cfg.results_root, solver_cfg.job_name_prefix)
     list_of_stress = glob.glob(os.path.join(res_path,'S_Mises*.csv'))
     list_of_reaction_force = glob.glob(os.path.join(res_path,'RF*.csv'))
     list_of_radial_displacement = glob.glob(os.path.join(res_path,'U1_frame*.csv'))
@@ -175,9 +276,6 @@ def process_results(
 
 
     data_out = dict()
-    data_out.update(
-            geometry_cfg
-    )
     for time_frame in analizing_frames:
         max_s_mises = "None"
         data_rf = "None"
@@ -206,7 +304,7 @@ def process_results(
     if os.path.exists(_path):
         last_time = np.genfromtxt(_path, delimiter=',')[1]
     else:
-        return
+        return None
 
     max_deformation = (geometry_cfg['diameter']
                        + 2*np.max(np.genfromtxt(list_of_radial_displacement[-1], delimiter=',')[1:, -1]))
@@ -217,6 +315,38 @@ def process_results(
         'Diameter_last': max_deformation
     })
 
+    # случаи нагружения после основного шага (solver.load_cases); недостигнутый случай — 'None'
+    for case in getattr(solver_cfg, 'load_cases', None) or []:
+        prefix = os.path.join(res_path, f'case_{case.name}_')
+        stress, rf, u = (_read_from_txt(prefix + name) for name in ('S_Mises.csv', 'RF.csv', 'U1.csv'))
+        data_out.update({
+            f'S_mises_{case.name}': np.max(stress[1:, 2]) if not isinstance(stress, str) else 'None',
+            f'RF_{case.name}': rf[1, 3] if not isinstance(rf, str) else 'None',
+            f'Diameter_{case.name}': (geometry_cfg['diameter'] + 2 * np.max(u[1:, -1])
+                                      if not isinstance(u, str) else 'None'),
+        })
+    return data_out
+
+
+def process_results(
+        geometry_cfg: Union[SimpleNamespace, dict] = None,
+        solver_cfg: Union[SimpleNamespace, dict] = None,
+        work_path: str = None,
+        wbResults: Any= None,
+        filename: Any= None,
+        sheet_short: Any= None,
+        begining_time: Any = None,
+        fea_time: Any = None
+):
+    metrics = collect_metrics(geometry_cfg, solver_cfg, work_path)
+    if metrics is None:
+        return
+
+    data_out = dict()
+    data_out.update(
+            geometry_cfg
+    )
+    data_out.update(metrics)
     data_out.update(
         {
                 f'Time per design': datetime.datetime.now() - begining_time,
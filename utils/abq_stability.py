@@ -0,0 +1,182 @@
+# -*- utf-8 -*-
+"""
+Energy stability of the frames of a quasi-static run, evaluated for all frames at once with NumPy.
+
+Used inside the ODB session (abq_parse_results.py, Abaqus Python 2.7), by the .fil reader and by
+the orchestrator: every design gets <results_root>/<job>/stability.csv with the matched energies
+and the criteria per frame, so the thresholds (solver.stability) can be re-tuned over many designs
+without reopening ODBs (iter_series + last_stable_time).
+
+Criteria per frame (quasi-static intent):
+  - RK   = ALLKE/ALLIE                                   <= tau_k  (small kinetic energy)
+  - RA   = ALLAE/ALLIE                                   <= tau_a  (small artificial energy; 0 without ALLAE)
+  - Ebal = |ALLIE + ALLVD + ALLFD + ALLKE - ALLWK| / |ALLWK| <= tau_e  (energy balance; not enforced when None)
+  - dI   = |delta ALLIE| / max(1, |ALLIE|)               <= tau_delta  (smooth internal energy)
+"""
+
+import os
+
+import numpy as np
+
+STABILITY_NAME = 'stability.csv'
+ENERGY_KEYS = ('ALLIE', 'ALLKE', 'ALLAE', 'ALLWK', 'ALLVD', 'ALLFD')
+CRITERIA = ('RK', 'RA', 'Ebal', 'dI')
+COLUMNS = ('attempt', 'time') + ENERGY_KEYS + CRITERIA
+# defaults of solver.stability
+THRESHOLDS = {'tau_k': 0.05, 'tau_a': 0.05, 'tau_delta': 0.2, 'tau_e': None}
+_EPS = 1e-16
+
+
+def thresholds(solver_cfg):
+    """Thresholds of solver_cfg.stability (SimpleNamespace or dict) over THRESHOLDS."""
+    cfg = getattr(solver_cfg, 'stability', None)
+    out = dict(THRESHOLDS)
+    for key in THRESHOLDS:
+        value = cfg.get(key, out[key]) if isinstance(cfg, dict) else getattr(cfg, key, out[key])
+        out[key] = float(value) if value is not None else None
+    return out
+
+
+def nearest_indices(query_t, src_t):
+    """
+    Index of the nearest source time for every query time (monotone arrays, searchsorted).
+
+    Parameters
+    ----------
+    query_t : array_like
+        Query times (e.g., frame values).
+    src_t : array_like
+        Non-decreasing source times of a history output.
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices into src_t; ties and repeated source times resolve to the right.
+        Zeros if src_t is empty.
+    """
+    q = np.asarray(query_t, dtype=float)
+    src = np.asarray(src_t, dtype=float)
+    if len(src) < 2 or not len(q):
+        return np.zeros(len(q), dtype=int)
+    hi = np.clip(np.searchsorted(src, q), 1, len(src) - 1)
+    lo = hi - 1
+    idx = np.where(np.abs(src[hi] - q) <= np.abs(q - src[lo]), hi, lo)
+    return np.searchsorted(src, src[idx], side='right') - 1
+
+
+def _safe_div(a, b):
+    # a / b with a sign-preserving epsilon for |b| <= eps (as _safe_div of the parser)
+    return a / np.where(np.abs(b) > _EPS, b, np.where(b >= 0.0, _EPS, -_EPS))
+
+
+def stability_series(frame_t, energies):
+    """
+    Energies matched to the frames and the criteria for every frame.
+
+    Parameters
+    ----------
+    frame_t : array_like
+        Frame times in the time base of the histories (step time).
+    energies : dict
+        {key: (times, values)} of whole-model energy histories (ENERGY_KEYS); missing or empty
+        keys are allowed.
+
+    Returns
+    -------
+    dict
+        {key: array over the frames} for ENERGY_KEYS (NaN without history) and CRITERIA.
+        RK, Ebal and dI are NaN without ALLIE / ALLKE / ALLWK histories.
+    """
+    frame_t = np.asarray(frame_t, dtype=float)
+    n = len(frame_t)
+    out = {}
+    for key in ENERGY_KEYS:
+        t, v = energies.get(key) or ((), ())
+        if len(t):
+            out[key] = np.asarray(v, dtype=float)[nearest_indices(frame_t, t)]
+        else:
+            out[key] = np.full(n, np.nan)
+    allie, allke, allwk = out['ALLIE'], out['ALLKE'], out['ALLWK']
+    out['RK'] = np.abs(_safe_div(allke, allie))
+    out['RA'] = np.abs(_safe_div(np.nan_to_num(out['ALLAE']), allie))
+    dissipated = np.nan_to_num(out['ALLVD']) + np.nan_to_num(out['ALLFD'])
+    out['Ebal'] = np.abs(allie + dissipated + np.nan_to_num(allke) - allwk) / np.maximum(np.abs(allwk), _EPS)
+    out['dI'] = np.zeros(n)
+    if n > 1:
+        out['dI'][1:] = np.abs(np.diff(allie)) / np.maximum(1.0, np.abs(allie[1:]))
+    out['dI'][np.isnan(allie)] = np.nan
+    return out
+
+
+def select_last_stable(series, tau_k=0.05, tau_a=0.05, tau_delta=0.2, tau_e=None):
+    """
+    Index of the last frame meeting all criteria of `series` (stability_series).
+
+    If no frame qualifies, the frame with the smallest summed violation (the latest of equal ones);
+    without ALLIE / ALLKE / ALLWK histories the last frame. -1 for no frames.
+    """
+    n = len(series['RK'])
+    if n == 0:
+        return -1
+    if np.isnan(series['RK']).all() or np.isnan(series['ALLWK']).all():
+        return n - 1
+    violation = [series['RK'] - tau_k, series['RA'] - tau_a, series['dI'] - tau_delta]
+    if tau_e is not None:
+        violation.append(series['Ebal'] - tau_e)
+    violation = np.vstack(violation)
+    violation[np.isnan(violation)] = np.inf
+    ok = np.flatnonzero((violation <= 0.0).all(axis=0))
+    if len(ok):
+        return int(ok[-1])
+    score = np.maximum(violation, 0.0).sum(axis=0)
+    return int(n - 1 - np.argmin(score[::-1]))
+
+
+def concat_series(parts):
+    """One series from [(attempt, total times, series)] of consecutive restart attempts."""
+    out = {'attempt': np.concatenate([np.full(len(t), a, dtype=int) for a, t, _ in parts] or [np.zeros(0, int)]),
+           'time': np.concatenate([np.asarray(t, dtype=float) for _, t, _ in parts] or [np.zeros(0)])}
+    for key in ENERGY_KEYS + CRITERIA:
+        out[key] = np.concatenate([s[key] for _, _, s in parts] or [np.zeros(0)])
+    return out
+
+
+def write_series(path, series):
+    """stability.csv: one row per frame, COLUMNS (total time in config time, attempt = restart index)."""
+    with open(path, 'w') as f:
+        f.write(','.join(COLUMNS) + '\n')
+        for row in zip(*[series[c].tolist() for c in COLUMNS]):
+            f.write(','.join(repr(v) for v in row) + '\n')
+
+
+def read_series(path):
+    """stability.csv -> {column: array}; None if the file does not exist."""
+    if not os.path.exists(path):
+        return None
+    data = np.atleast_2d(np.genfromtxt(path, delimiter=',', skip_header=1))
+    data = data.reshape(-1, len(COLUMNS))
+    out = dict((c, data[:, i]) for i, c in enumerate(COLUMNS))
+    out['attempt'] = out['attempt'].astype(int)
+    return out
+
+
+def last_stable_time(series, **tau):
+    """
+    Time of the last stable frame of an exported series under other thresholds (the search runs
+    on the last restart attempt only, as in the parser). None for an empty series.
+    """
+    if not len(series['time']):
+        return None
+    rows = np.flatnonzero(series['attempt'] == series['attempt'].max())
+    part = dict((k, series[k][rows]) for k in ENERGY_KEYS + CRITERIA)
+    limits = dict(THRESHOLDS)
+    limits.update(tau)
+    return float(series['time'][rows[select_last_stable(part, **limits)]])
+
+
+def iter_series(results_path):
+    """(job, series) for every design <results_path>/<job>/stability.csv."""
+    for job in sorted(os.listdir(results_path)):
+        series = read_series(os.path.join(results_path, job, STABILITY_NAME))
+        if series is not None:
+            yield job, series
@@ -1,4 +1,5 @@
 import os
+import json
 from os.path import exists
 from types import SimpleNamespace
 
@@ -8,30 +9,49 @@ from jupyter_cadquery.viewer.client import show, show_object
 from typing import Union
 import math
 
+def cell_control_points(w, h1, h2, h3, l1, l2, arc_offset, offset_l) -> dict:
+    """Опорные точки эскиза ячейки (a0…top1, c_ark0/1) в плоскости эскиза."""
+    return {
+        'a0': (w / 2, 0),
+        'a1': (-w / 2, 0),
+        'b0': (w / 2, h1),
+        'b1': (-w / 2, h1),
+        'c0': (offset_l + w / 2, l1 + h1),
+        'c1': (-1 * (offset_l + w / 2), l1 + h1),
+        'c_ark0': (offset_l + w / 2 + arc_offset, l1 + h1 + h2 / 2),
+        'c_ark1': (-1 * (offset_l + w / 2 + arc_offset), l1 + h1 + h2 / 2),
+        'd0': (offset_l + w / 2, l1 + h1 + h2),
+        'd1': (-1 * (offset_l + w / 2), l1 + h1 + h2),
+        'e0': (w / 2, l1 + h1 + h2 + l2),
+        'e1': (-w / 2, l1 + h1 + h2 + l2),
+        'top0': (w / 2, l1 + h1 + h2 + l2 + h3),
+        'top1': (-w / 2, l1 + h1 + h2 + l2 + h3),
+    }
+
+def cell_dimensions(w, h1, h2, h3, l1, l2, arc_offset, offset_l) -> tuple:
+    """Размеры ячейки без построения эскиза: (cell_size_height, cell_size_width, ark_len, d0_y, c0_y|b0_y)."""
+    pts = cell_control_points(w, h1, h2, h3, l1, l2, arc_offset, offset_l)
+    a0, top0 = pts['a0'], pts['top0']
+    c_ark0, c_ark1 = pts['c_ark0'], pts['c_ark1']
+    cell_size_height = a0[1] + top0[1]
+    cell_size_width = np.abs(c_ark0[0]) + np.abs(c_ark1[0])
+    if l1 > l2:
+        ark_len = top0[1] - c_ark0[1]
+    else:
+        ark_len = c_ark0[1] - a0[1]
+    last_point = pts['c0'][1] if arc_offset != 0 else pts['b0'][1]
+    return cell_size_height, cell_size_width, ark_len, pts['d0'][1], last_point
+
 def create_cell(w, h1, h2, h3, l1, l2, arc_offset, offset_l, fillet_a, fillet_b, fillet_c):
     def create_cell_no_arc():
-        a0 = (w / 2, 0)
-        a1 = (-w / 2, 0)
-
-        b0 = (w / 2, h1)
-        b1 = (-w / 2, h1)
-
-        c0 = (offset_l + w / 2, l1 + h1)
-        c1 = (-1 * (offset_l + w / 2), l1 + h1)
-
-        c_ark0 = (offset_l + w / 2 + arc_offset,
-                  l1 + h1 + h2 / 2)
-        c_ark1 = (-1 * (offset_l + w / 2 + arc_offset),
-                  l1 + h1 + h2 / 2)
-
-        d0 = (offset_l + w / 2, l1 + h1 + h2)
-        d1 = (-1 * (offset_l + w / 2), l1 + h1 + h2)
-
-        e0 = (w / 2, l1 + h1 + h2 + l2)
-        e1 = (-w / 2, l1 + h1 + h2 + l2)
-
-        top0 = (w / 2, l1 + h1 + h2 + l2 + h3)
-        top1 = (-w / 2, l1 + h1 + h2 + l2 + h3)
+        pts = cell_control_points(w, h1, h2, h3, l1, l2, arc_offset, offset_l)
+        a0, a1 = pts['a0'], pts['a1']
+        b0, b1 = pts['b0'], pts['b1']
+        c0, c1 = pts['c0'], pts['c1']
+        c_ark0, c_ark1 = pts['c_ark0'], pts['c_ark1']
+        d0, d1 = pts['d0'], pts['d1']
+        e0, e1 = pts['e0'], pts['e1']
+        top0, top1 = pts['top0'], pts['top1']
 
         sketch = (cq.Sketch()
                   .segment(a0, b0)  # a_up
@@ -64,36 +84,17 @@ def create_cell(w, h1, h2, h3, l1, l2, arc_offset, offset_l, fillet_a, fillet_b,
             sketch.vertices(cq.NearestToPointSelector(d1)).fillet(fillet_c).reset()
             sketch.vertices(cq.NearestToPointSelector(c1)).fillet(fillet_c).reset()
 
-        cell_size_height = a0[1] + top0[1]
-        cell_size_width = np.abs(c_ark0[0]) + np.abs(c_ark1[0])
-        if l1 > l2:
-            ark_len = top0[1] - c_ark0[1]
-        else:
-            ark_len = c_ark0[1] - a0[1]
-        return sketch, cell_size_height, cell_size_width, ark_len, d0[1], b0[1]
+        return (sketch,) + cell_dimensions(w, h1, h2, h3, l1, l2, arc_offset, offset_l)
 
     def create_cell_arc():
-        a0 = (w / 2, 0)
-        a1 = (-w / 2, 0)
-
-        b0 = (w / 2, h1)
-        b1 = (-w / 2, h1)
-
-        c0 = (offset_l + w / 2, l1 + h1)
-        c1 = (-1 * (offset_l + w / 2), l1 + h1)
-
-        c_ark0 = (offset_l + w / 2 + arc_offset,
-                  l1 + h1 + h2 / 2)
-        c_ark1 = (-1 * (offset_l + w / 2 + arc_offset),
-                  l1 + h1 + h2 / 2)
-        d0 = (offset_l + w / 2, l1 + h1 + h2)
-        d1 = (-1 * (offset_l + w / 2), l1 + h1 + h2)
-
-        e0 = (w / 2, l1 + h1 + h2 + l2)
-        e1 = (-w / 2, l1 + h1 + h2 + l2)
-
-        top0 = (w / 2, l1 + h1 + h2 + l2 + h3)
-        top1 = (-w / 2, l1 + h1 + h2 + l2 + h3)
+        pts = cell_control_points(w, h1, h2, h3, l1, l2, arc_offset, offset_l)
+        a0, a1 = pts['a0'], pts['a1']
+        b0, b1 = pts['b0'], pts['b1']
+        c0, c1 = pts['c0'], pts['c1']
+        c_ark0, c_ark1 = pts['c_ark0'], pts['c_ark1']
+        d0, d1 = pts['d0'], pts['d1']
+        e0, e1 = pts['e0'], pts['e1']
+        top0, top1 = pts['top0'], pts['top1']
 
         sketch = (cq.Sketch()
                   .segment(a0, b0)  # a_up
@@ -126,13 +127,7 @@ def create_cell(w, h1, h2, h3, l1, l2, arc_offset, offset_l, fillet_a, fillet_b,
             sketch.vertices(cq.NearestToPointSelector(d1)).fillet(fillet_c).reset()
             sketch.vertices(cq.NearestToPointSelector(c1)).fillet(fillet_c).reset()
 
-        cell_size_height = a0[1] + top0[1]
-        cell_size_width = np.abs(c_ark0[0]) + np.abs(c_ark1[0])
-        if l1 > l2:
-            ark_len = top0[1] - c_ark0[1]
-        else:
-            ark_len = c_ark0[1] - a0[1]
-        return sketch, cell_size_height, cell_size_width, ark_len, d0[1], c0[1]
+        return (sketch,) + cell_dimensions(w, h1, h2, h3, l1, l2, arc_offset, offset_l)
 
     if arc_offset != 0:
         return create_cell_arc()
@@ -156,8 +151,58 @@ def _radial_compound(base: Union[cq.Workplane, cq.Shape, cq.Compound], count: in
     copies = [base.rotate((0, 0, 0), (0, 0, 1), i * step_deg) for i in range(count)]
     return cq.Compound.makeCompound(copies)
 
-
-def model_drawer(local_geometry_cfg, file_name) -> float:
+# тип особенности для каждой опорной точки ячейки (для локального сгущения сетки)
+_FEATURE_KIND = {
+    'a0': 'crown', 'a1': 'crown', 'top0': 'crown', 'top1': 'crown',
+    'b0': 'fillet', 'b1': 'fillet', 'e0': 'fillet', 'e1': 'fillet',
+    'c0': 'fillet', 'c1': 'fillet', 'd0': 'fillet', 'd1': 'fillet',
+    'c_ark0': 'arc', 'c_ark1': 'arc',
+}
+
+def _place_cell_points(points: dict, layer: str, radius: float, repeat: int,
+                       z0: float, flip: bool = False, rot_deg: float = 0.0) -> list:
+    """
+    Перенос опорных точек эскиза ячейки на цилиндр каркаса и свёртка в сектор [0, 360/repeat).
+
+    Повторяет преобразования вырезов в model_drawer: rotate(X, 90) -> translate(0, radius, z0)
+    [-> rotate(Y, 180)] -> rotate(Z, rot_deg) -> радиальный паттерн. Точки возвращаются
+    на средней поверхности стенки в координатах (x, y, z) сборки Abaqus.
+    """
+    sector = 2 * np.pi / repeat
+    r_mid = radius - 0.25
+    out = []
+    for name, (px, py) in points.items():
+        kind = _FEATURE_KIND.get(name)
+        if kind is None:
+            continue
+        x = -px if flip else px
+        z = -(py + z0) if flip else py + z0
+        if abs(x) >= r_mid:
+            continue
+        theta = math.atan2(math.sqrt(r_mid ** 2 - x ** 2), x) + math.radians(rot_deg)
+        theta = math.fmod(theta, sector)
+        theta = theta + sector if theta < 0 else theta
+        thetas = [theta]
+        # точки на плоскостях симметрии сектора принадлежат обеим границам
+        if theta < 1e-6 or sector - theta < 1e-6:
+            thetas = [0.0, sector]
+        for t in thetas:
+            out.append({
+                'name': f'{layer}.{name}',
+                'kind': kind,
+                'x': float(r_mid * math.cos(t)),
+                'y': float(r_mid * math.sin(t)),
+                'z': float(z),
+            })
+    return out
+
+
+def frame_layout(local_geometry_cfg: dict) -> SimpleNamespace:
+    """
+    Раскладка каркаса без CadQuery: параметры ячеек каждого слоя (аргументы create_cell
+    без скруглений), смещения вырезов и высоты. Используется model_drawer и для
+    вычисления опорных точек (сгущение сетки, морфинг).
+    """
     # -*-*- parce cfg -*-*-
     local_geometry_cfg = SimpleNamespace(**local_geometry_cfg)
     diameter = local_geometry_cfg.diameter
@@ -168,9 +213,6 @@ def model_drawer(local_geometry_cfg, file_name) -> float:
     width_low_cut = local_geometry_cfg.width_low_cut
     cell_height_1st_layer =local_geometry_cfg.cell_height_1st_layer
     repeat =local_geometry_cfg.repeat
-    fillet_a =local_geometry_cfg.fillet_a
-    fillet_b =local_geometry_cfg.fillet_b
-    fillet_c =local_geometry_cfg.fillet_c
     assymetry_1st_layer =local_geometry_cfg.assymetry_1st_layer
     padding = local_geometry_cfg.padding
     arc_offset = local_geometry_cfg.arc_offset
@@ -183,37 +225,18 @@ def model_drawer(local_geometry_cfg, file_name) -> float:
     length_2 = np.round((cell_height_1st_layer - (h1 + h2 + h3)) - length_1, 4)
     tri_a = 0.5 * (cell_size_width - width_low_cut)
 
-    # draw cell
-    s_low_cut, cell_size_low_cut, _, arc_line_low_cut, d_point_low_cut, c_point_low_cut = create_cell(
-        width_low_cut, h1, 5 * h2, h3,
-        length_1, length_2,
-        0,
-        tri_a, fillet_a, fillet_b,
-        fillet_c)
-
-    s_1st_layer, _, _, arc_line_1st_layer, _, _ = create_cell(
-        width_low_cut, h1, h2, h3,
-        length_1, length_2,
-        arc_offset,
-        tri_a, fillet_a, fillet_b, fillet_c)
-
-    s_2nd_layer, cell_size_2nd_layer, _, arc_line_2nd_layer, _, _ = create_cell(
-        width_low_cut, h1, h2, h1,
-        length_1, length_1,
-        arc_offset,
-        tri_a, fillet_a, fillet_b, fillet_c)
-
-    s_3rd_layer, cell_size_3rd_layer, _, _, d_point_3rd_layer, _ = create_cell(
-        width_low_cut, h1, h2_3rd_layer, h1,
-        length_1, length_1,
-        arc_offset,
-        tri_a, fillet_a, fillet_b, fillet_c)
-    s_top_cut, cell_size_top_cut, _, _, d_point_top_cut, _ = create_cell(
-        width_low_cut, h1, 5 * h2, h3,
-        length_1, length_2,
-        0,
-        tri_a, fillet_a, fillet_b,
-        fillet_c)
+    cells = {
+        'low_cut': (width_low_cut, h1, 5 * h2, h3, length_1, length_2, 0, tri_a),
+        '1st_layer': (width_low_cut, h1, h2, h3, length_1, length_2, arc_offset, tri_a),
+        '2nd_layer': (width_low_cut, h1, h2, h1, length_1, length_1, arc_offset, tri_a),
+        '3rd_layer': (width_low_cut, h1, h2_3rd_layer, h1, length_1, length_1, arc_offset, tri_a),
+        'top_cut': (width_low_cut, h1, 5 * h2, h3, length_1, length_2, 0, tri_a),
+    }
+    cell_size_low_cut, _, _, d_point_low_cut, _ = cell_dimensions(*cells['low_cut'])
+    _, _, arc_line_1st_layer, _, _ = cell_dimensions(*cells['1st_layer'])
+    _, _, arc_line_2nd_layer, _, _ = cell_dimensions(*cells['2nd_layer'])
+    _, _, _, d_point_3rd_layer, _ = cell_dimensions(*cells['3rd_layer'])
+
     radius = diameter / 2
     if assymetry_1st_layer < 1:
         height_1st_layer = cell_height_1st_layer + arc_line_1st_layer + 2 * padding
@@ -255,6 +278,59 @@ def model_drawer(local_geometry_cfg, file_name) -> float:
     height_3rd_layer = d_point_3rd_layer + 0.5 * padding
     height = height_1st_layer + height_2nd_layer + height_3rd_layer
 
+    return SimpleNamespace(
+        radius=radius, repeat=repeat, rot=360 / repeat, cells=cells,
+        direct_shift=direct_shift, inversed_shift=inversed_shift,
+        direct_shift_2nd_layer=direct_shift_2nd_layer, direct_shift_3rd_layer=direct_shift_3rd_layer,
+        direct_low_cut=direct_low_cut, direct_top_cut=direct_top_cut,
+        height_1st_layer=height_1st_layer, height=height,
+    )
+
+def frame_feature_points(layout: SimpleNamespace) -> list:
+    """
+    Опорные точки всех вырезов (вершины/скругления/дуги), свёрнутые в сектор
+    [0, 360/repeat). Порядок точек детерминирован и одинаков для дизайнов одной топологии.
+    """
+    def _cell_pts(cell):
+        pts = cell_control_points(*cell)
+        if cell[6] == 0:  # arc_offset == 0: дуги нет
+            pts.pop('c_ark0'), pts.pop('c_ark1')
+        return pts
+
+    radius, repeat, rot = layout.radius, layout.repeat, layout.rot
+    pts_1st_layer = _cell_pts(layout.cells['1st_layer'])
+    return (
+        _place_cell_points(_cell_pts(layout.cells['low_cut']), 'low_cut', radius, repeat,
+                           -layout.direct_low_cut[2], flip=True, rot_deg=rot / 2)
+        + _place_cell_points(pts_1st_layer, '1st_layer', radius, repeat, layout.direct_shift[2])
+        + _place_cell_points(pts_1st_layer, '1st_layer_inv', radius, repeat,
+                             layout.inversed_shift[2], flip=True, rot_deg=rot / 2)
+        + _place_cell_points(_cell_pts(layout.cells['2nd_layer']), '2nd_layer', radius, repeat,
+                             layout.direct_shift_2nd_layer[2])
+        + _place_cell_points(_cell_pts(layout.cells['3rd_layer']), '3rd_layer', radius, repeat,
+                             layout.direct_shift_3rd_layer[2], rot_deg=rot / 2)
+        + _place_cell_points(_cell_pts(layout.cells['top_cut']), 'top_cut', radius, repeat,
+                             layout.direct_shift_2nd_layer[2] + layout.direct_top_cut[2])
+    )
+
+def model_drawer(local_geometry_cfg, file_name) -> float:
+    layout = frame_layout(local_geometry_cfg)
+    local_geometry_cfg = SimpleNamespace(**local_geometry_cfg)
+    fillets = (local_geometry_cfg.fillet_a, local_geometry_cfg.fillet_b, local_geometry_cfg.fillet_c)
+    repeat = local_geometry_cfg.repeat
+    radius = layout.radius
+    height, height_1st_layer = layout.height, layout.height_1st_layer
+    direct_shift, inversed_shift = layout.direct_shift, layout.inversed_shift
+    direct_shift_2nd_layer, direct_shift_3rd_layer = layout.direct_shift_2nd_layer, layout.direct_shift_3rd_layer
+    direct_low_cut, direct_top_cut = layout.direct_low_cut, layout.direct_top_cut
+
+    # draw cell
+    s_low_cut = create_cell(*layout.cells['low_cut'], *fillets)[0]
+    s_1st_layer = create_cell(*layout.cells['1st_layer'], *fillets)[0]
+    s_2nd_layer = create_cell(*layout.cells['2nd_layer'], *fillets)[0]
+    s_3rd_layer = create_cell(*layout.cells['3rd_layer'], *fillets)[0]
+    s_top_cut = create_cell(*layout.cells['top_cut'], *fillets)[0]
+
 
     cyl_out = cq.Workplane('XY').cylinder(height=height, radius=radius, direct=cq.Vector((0, 0, 1)))
     cyl_cut = cq.Workplane('XY').cylinder(height=height, radius=radius - 0.5, direct=cq.Vector((0, 0, 1)))
@@ -358,6 +434,11 @@ def model_drawer(local_geometry_cfg, file_name) -> float:
         raise Exception(f'Fail in model generation. With this parameters get {result.solids().size()}')
     cq.exporters.export(result, f'./geoms/{file_name}_full.stp', 'STEP')
 
+    # ---- опорные точки ячеек для локального сгущения сетки в Abaqus ----
+    features = frame_feature_points(layout)
+    with open(f'./geoms/{file_name}_features.json', 'w', encoding='utf-8') as f:
+        json.dump({'radius': float(radius), 'repeat': int(repeat), 'points': features}, f, indent=2)
+
     # ---- функция получения сектора ----
     def sector_of_cyl(solid: cq.Workplane,
                       outer_radius: float,
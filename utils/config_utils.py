@@ -1,4 +1,6 @@
 import os
+import re
+import json
 import pathlib
 import sys
 from typing import Tuple, Any, List
@@ -7,6 +9,56 @@ from types import SimpleNamespace
 from omegaconf import DictConfig
 
 
+def read_material(material: Any) -> Tuple[str, SimpleNamespace]:
+    """Свойства материала из секции вида `material:` (основной материал или вариант material_sweep)."""
+    material_cfg = SimpleNamespace()
+    material_model = str()
+    if hasattr(material, 'name'):
+        material_cfg.name = material.name
+    else:
+        print('No attr \'material.name\'. Set default = noname')
+        material_cfg.name = 1
+
+    if hasattr(material, 'EM'):
+        material_cfg.EM = material.EM
+    else:
+        print('No attr \'material.EM\'. Set default = 1 MPa')
+        material_cfg.EM = 1
+
+    if hasattr(material, 'density'):
+        material_cfg.density = float(str(material.density).replace(',','.'))
+    else:
+        print('No attr \'material.density\'. Set default = 1e-9 MPa')
+        material_cfg.density = 1e-9
+
+    if hasattr(material, 'Poisson'):
+        material_cfg.Poisson = material.Poisson
+    else:
+        print('No attr \'material.Poisson\'. Set default = 0.45')
+        material_cfg.Poisson = 0.45
+
+    if hasattr(material, 'material_model'):
+        material_cfg.material_model = material.material_model
+        material_model = material.material_model
+        if material.material_model.lower() == 'superelastic':
+            material_cfg.EA = material.superelastic.EA
+            material_cfg.nuA = material.superelastic.nuA
+            material_cfg.nuM = material.superelastic.nuM
+            material_cfg.sig_s_AS = material.superelastic.sig_s_AS
+            material_cfg.sig_f_AS = material.superelastic.sig_f_AS
+            material_cfg.sig_s_SA = material.superelastic.sig_s_SA
+            material_cfg.sig_f_SA = material.superelastic.sig_f_SA
+            material_cfg.sig_s_AC = material.superelastic.sig_s_AC
+            material_cfg.eps_L = material.superelastic.eps_L
+            material_cfg.eps_V = material.superelastic.eps_V
+            material_cfg.T0 = material.superelastic.T0
+            material_cfg.dSig_dT_L_per_C = material.superelastic.dSig_dT_L_per_C
+            material_cfg.dSig_dT_U_per_C = material.superelastic.dSig_dT_U_per_C
+        elif material.material_model.lower() == 'polynomial':
+            material_cfg.mat_table = material.mat_table
+    return material_model, material_cfg
+
+
 def read_conf(cfg:DictConfig, globalPath: str = None) -> tuple[list[str], list[str], SimpleNamespace, str, SimpleNamespace, SimpleNamespace]:
     geometry_cfg = SimpleNamespace()
     material_cfg =  SimpleNamespace()
@@ -159,49 +211,7 @@ def read_conf(cfg:DictConfig, globalPath: str = None) -> tuple[list[str], list[s
         error_count += 1
 
     if hasattr(cfg, 'material'):
-        if hasattr(cfg.material, 'name'):
-            material_cfg.name = cfg.material.name
-        else:
-            print('No attr \'material.name\'. Set default = noname')
-            material_cfg.name = 1
-
-        if hasattr(cfg.material, 'EM'):
-            material_cfg.EM = cfg.material.EM
-        else:
-            print('No attr \'material.EM\'. Set default = 1 MPa')
-            material_cfg.EM = 1
-
-        if hasattr(cfg.material, 'density'):
-            material_cfg.density = float(str(cfg.material.density).replace(',','.'))
-        else:
-            print('No attr \'material.density\'. Set default = 1e-9 MPa')
-            material_cfg.density = 1e-9
-
-        if hasattr(cfg.material, 'Poisson'):
-            material_cfg.Poisson = cfg.material.Poisson
-        else:
-            print('No attr \'material.Poisson\'. Set default = 0.45')
-            material_cfg.Poisson = 0.45
-
-        if hasattr(cfg.material, 'material_model'):
-            material_cfg.material_model = cfg.material.material_model
-            material_model = cfg.material.material_model
-            if cfg.material.material_model.lower() == 'superelastic':
-                material_cfg.EA = cfg.material.superelastic.EA
-                material_cfg.nuA = cfg.material.superelastic.nuA
-                material_cfg.nuM = cfg.material.superelastic.nuM
-                material_cfg.sig_s_AS = cfg.material.superelastic.sig_s_AS
-                material_cfg.sig_f_AS = cfg.material.superelastic.sig_f_AS
-                material_cfg.sig_s_SA = cfg.material.superelastic.sig_s_SA
-                material_cfg.sig_f_SA = cfg.material.superelastic.sig_f_SA
-                material_cfg.sig_s_AC = cfg.material.superelastic.sig_s_AC
-                material_cfg.eps_L = cfg.material.superelastic.eps_L
-                material_cfg.eps_V = cfg.material.superelastic.eps_V
-                material_cfg.T0 = cfg.material.superelastic.T0
-                material_cfg.dSig_dT_L_per_C = cfg.material.superelastic.dSig_dT_L_per_C
-                material_cfg.dSig_dT_U_per_C = cfg.material.superelastic.dSig_dT_U_per_C
-            elif cfg.material.material_model.lower() == 'polynomial':
-                material_cfg.mat_table = cfg.material.mat_table
+        material_model, material_cfg = read_material(cfg.material)
     else:
         print('No attr \'material\'. Exit')
         error_count += 1
@@ -230,6 +240,160 @@ def read_conf(cfg:DictConfig, globalPath: str = None) -> tuple[list[str], list[s
         else:
             print('No attr \'solver.cpus\'. Set default = 4')
             solver_cfg.cpus = 4
+        solver_cfg.mp_mode = str(getattr(cfg.solver, 'mp_mode', 'threads'))
+        solver_cfg.parallel_jobs = int(getattr(cfg.solver, 'parallel_jobs', 1))
+        # packing of CAD/CAE/solve/parse stages when parallel_jobs > 1 (utils/job_scheduler.py)
+        sched_cfg = cfg.solver.scheduler if hasattr(cfg.solver, 'scheduler') else None
+        solver_cfg.scheduler = SimpleNamespace()
+        solver_cfg.scheduler.cores = getattr(sched_cfg, 'cores', None)
+        solver_cfg.scheduler.tokens = getattr(sched_cfg, 'tokens', 50)
+        solver_cfg.scheduler.cae_tokens = getattr(sched_cfg, 'cae_tokens', 1)
+
+        solver_cfg.mesh = SimpleNamespace()
+        mesh_cfg = cfg.solver.mesh if hasattr(cfg.solver, 'mesh') else None
+        if mesh_cfg is not None and hasattr(mesh_cfg, 'seed_size'):
+            solver_cfg.mesh.seed_size = mesh_cfg.seed_size
+        else:
+            print('No attr \'solver.mesh.seed_size\'. Set default = 0.2 mm')
+            solver_cfg.mesh.seed_size = 0.2
+        # local refinement near crowns/fillets/arcs (points from cad_drawer)
+        solver_cfg.mesh.refinement = bool(getattr(mesh_cfg, 'refinement', False))
+        solver_cfg.mesh.fine_seed_size = getattr(mesh_cfg, 'fine_seed_size', solver_cfg.mesh.seed_size / 4)
+        solver_cfg.mesh.feature_radius = getattr(mesh_cfg, 'feature_radius', 0.5)
+        solver_cfg.mesh.curvature_radius = getattr(mesh_cfg, 'curvature_radius', 1.0)
+
+        # loader: meshed membrane balloon or analytic rigid jaws driven by reference points
+        loading_cfg = cfg.solver.loading if hasattr(cfg.solver, 'loading') else None
+        solver_cfg.loading = SimpleNamespace()
+        solver_cfg.loading.model = str(getattr(loading_cfg, 'model', 'membrane'))
+        if solver_cfg.loading.model not in ('membrane', 'rigid_cylinder', 'crimper'):
+            print(f'Unknown solver.loading.model = {solver_cfg.loading.model}. Exit')
+            error_count += 1
+        solver_cfg.loading.segments = int(getattr(loading_cfg, 'segments', 4))
+
+        # frame self contact: all strut side faces or only geometrically reachable ones
+        contact_cfg = cfg.solver.contact if hasattr(cfg.solver, 'contact') else None
+        solver_cfg.contact = SimpleNamespace()
+        solver_cfg.contact.self_contact = str(getattr(contact_cfg, 'self_contact', 'full'))
+        solver_cfg.contact.axial_margin = getattr(contact_cfg, 'axial_margin', 0.2)
+        solver_cfg.contact.contact_margin = getattr(contact_cfg, 'contact_margin', 0.05)
+
+        # live .sta/.msg monitor: early stop on divergence or once the metric times are passed
+        monitor_cfg = cfg.solver.monitor if hasattr(cfg.solver, 'monitor') else None
+        solver_cfg.monitor = SimpleNamespace()
+        solver_cfg.monitor.enabled = bool(getattr(monitor_cfg, 'enabled', True))
+        solver_cfg.monitor.min_inc = getattr(monitor_cfg, 'min_inc', 1e-6)
+        solver_cfg.monitor.max_consecutive_cutbacks = getattr(monitor_cfg, 'max_consecutive_cutbacks', 5)
+        solver_cfg.monitor.stall_minutes = getattr(monitor_cfg, 'stall_minutes', 10)
+        solver_cfg.monitor.stop_after = getattr(monitor_cfg, 'stop_after', None)
+
+        # per-job timeout predicted from past runs (utils/runtime_predictor.py)
+        runtime_cfg = cfg.solver.runtime if hasattr(cfg.solver, 'runtime') else None
+        solver_cfg.runtime = SimpleNamespace()
+        solver_cfg.runtime.predict = bool(getattr(runtime_cfg, 'predict', True))
+        solver_cfg.runtime.quantile = getattr(runtime_cfg, 'quantile', 0.95)
+        solver_cfg.runtime.safety = getattr(runtime_cfg, 'safety', 1.5)
+        solver_cfg.runtime.min_samples = getattr(runtime_cfg, 'min_samples', 10)
+        solver_cfg.runtime.default_timeout = getattr(runtime_cfg, 'default_timeout', 60)
+        solver_cfg.runtime.min_timeout = getattr(runtime_cfg, 'min_timeout', 5)
+        solver_cfg.runtime.max_timeout = getattr(runtime_cfg, 'max_timeout', 240)
+        solver_cfg.runtime.sleep_retries = getattr(runtime_cfg, 'sleep_retries', 4)
+
+        # resubmission from the last restart point after divergence / stall (utils/restart_recovery.py)
+        recovery_cfg = cfg.solver.recovery if hasattr(cfg.solver, 'recovery') else None
+        solver_cfg.recovery = SimpleNamespace()
+        solver_cfg.recovery.enabled = bool(getattr(recovery_cfg, 'enabled', False))
+        solver_cfg.recovery.restart_intervals = int(getattr(recovery_cfg, 'restart_intervals', 20))
+        solver_cfg.recovery.max_attempts = int(getattr(recovery_cfg, 'max_attempts', 2))
+        solver_cfg.recovery.stabilization_factor = getattr(recovery_cfg, 'stabilization_factor', 10.0)
+        solver_cfg.recovery.max_inc_factor = getattr(recovery_cfg, 'max_inc_factor', 0.25)
+        solver_cfg.recovery.contact_stabilization = getattr(recovery_cfg, 'contact_stabilization', 1.0)
+
+        # per-design StaticStep controls learned from past increment histories (utils/increment_tuner.py)
+        tuner_cfg = cfg.solver.tuner if hasattr(cfg.solver, 'tuner') else None
+        solver_cfg.tuner = SimpleNamespace()
+        solver_cfg.tuner.enabled = bool(getattr(tuner_cfg, 'enabled', False))
+        solver_cfg.tuner.k = int(getattr(tuner_cfg, 'k', 5))
+        solver_cfg.tuner.min_samples = int(getattr(tuner_cfg, 'min_samples', 10))
+        solver_cfg.tuner.explore = getattr(tuner_cfg, 'explore', 0.2)
+        solver_cfg.tuner.tau_a = getattr(tuner_cfg, 'tau_a', 0.05)
+        solver_cfg.tuner.max_inc_bounds = list(getattr(tuner_cfg, 'max_inc_bounds', [0.01, 0.2]))
+        solver_cfg.tuner.stabilization_bounds = list(getattr(tuner_cfg, 'stabilization_bounds', [2e-5, 2e-3]))
+
+        # initial increment from the nearest solved design's increment schedule (increment history)
+        warm_cfg = cfg.solver.warm_start if hasattr(cfg.solver, 'warm_start') else None
+        solver_cfg.warm_start = SimpleNamespace()
+        solver_cfg.warm_start.enabled = bool(getattr(warm_cfg, 'enabled', False))
+        solver_cfg.warm_start.max_distance = getattr(warm_cfg, 'max_distance', 2.0)
+        solver_cfg.warm_start.safety = getattr(warm_cfg, 'safety', 0.5)
+
+        # Standard / Explicit per job; auto picks the cheaper predicted solver per design (utils/solver_selector.py)
+        solver_cfg.analysis = str(getattr(cfg.solver, 'analysis', 'standard')).lower()
+        explicit_cfg = cfg.solver.explicit if hasattr(cfg.solver, 'explicit') else None
+        solver_cfg.explicit = SimpleNamespace()
+        solver_cfg.explicit.time_scaling = getattr(explicit_cfg, 'time_scaling', 0.01)
+        solver_cfg.explicit.target_dt = getattr(explicit_cfg, 'target_dt', 1e-6)
+        solver_cfg.explicit.mass_factor = getattr(explicit_cfg, 'mass_factor', None)
+        selector_cfg = cfg.solver.selector if hasattr(cfg.solver, 'selector') else None
+        solver_cfg.selector = SimpleNamespace()
+        solver_cfg.selector.default = str(getattr(selector_cfg, 'default', 'standard'))
+        solver_cfg.selector.min_samples = int(getattr(selector_cfg, 'min_samples', 5))
+        solver_cfg.selector.standard_minutes = getattr(selector_cfg, 'standard_minutes', 10.0)
+        solver_cfg.selector.contact_weight = getattr(selector_cfg, 'contact_weight', 0.5)
+        solver_cfg.selector.explicit_minutes = getattr(selector_cfg, 'explicit_minutes', 5.0)
+
+        # ODB parsing in `abaqus python` sessions, several ODBs per session (utils/abq_parse_batch.py)
+        parser_cfg = cfg.solver.parser if hasattr(cfg.solver, 'parser') else None
+        solver_cfg.parser = SimpleNamespace()
+        solver_cfg.parser.processes = int(getattr(parser_cfg, 'processes', 1))
+
+        # last-stable-frame thresholds of the ODB / .fil parsers (utils/abq_stability.py)
+        stability_cfg = cfg.solver.stability if hasattr(cfg.solver, 'stability') else None
+        solver_cfg.stability = SimpleNamespace()
+        solver_cfg.stability.tau_k = getattr(stability_cfg, 'tau_k', 0.05)
+        solver_cfg.stability.tau_a = getattr(stability_cfg, 'tau_a', 0.05)
+        solver_cfg.stability.tau_delta = getattr(stability_cfg, 'tau_delta', 0.2)
+        solver_cfg.stability.tau_e = getattr(stability_cfg, 'tau_e', None)
+
+        # K designs per Abaqus job (one batched deck); members are filled in by solve_batch
+        batch_cfg = cfg.solver.batch if hasattr(cfg.solver, 'batch') else None
+        solver_cfg.batch = SimpleNamespace()
+        solver_cfg.batch.size = int(getattr(batch_cfg, 'size', 1))
+        solver_cfg.batch.members = []
+
+        # material / UQ variants solved on the design's mesh via *Include (utils/material_sweep.py)
+        sweep_cfg = cfg.solver.material_sweep if hasattr(cfg.solver, 'material_sweep') else None
+        solver_cfg.material_sweep = SimpleNamespace()
+        solver_cfg.material_sweep.variants = [
+            (str(variant.name),) + read_material(variant) for variant in (getattr(sweep_cfg, 'variants', None) or [])
+        ]
+        solver_cfg.material_sweep.uq_samples = int(getattr(sweep_cfg, 'uq_samples', 0))
+        solver_cfg.material_sweep.uq_cov = dict(getattr(sweep_cfg, 'uq_cov', None) or {})
+
+        # extra load cases sequenced as static steps after the main step (crimp, release, ...)
+        solver_cfg.load_cases = [
+            SimpleNamespace(name=str(case.name), time=float(case.time),
+                            levels=[[float(t), float(v)] for t, v in case.levels])
+            for case in (getattr(cfg.solver, 'load_cases', None) or [])
+        ]
+
+        # run jobs in a fast local scratch area, harvest metrics (+ optional gzipped ODB) to results_root
+        scratch_cfg = cfg.solver.scratch if hasattr(cfg.solver, 'scratch') else None
+        solver_cfg.scratch = SimpleNamespace()
+        solver_cfg.scratch.root = getattr(scratch_cfg, 'root', None)
+        solver_cfg.scratch.quota_gb = getattr(scratch_cfg, 'quota_gb', 20)
+        solver_cfg.scratch.keep_odb = bool(getattr(scratch_cfg, 'keep_odb', False))
+        solver_cfg.scratch.compress_odb = bool(getattr(scratch_cfg, 'compress_odb', True))
+        # compilers read the STEP from here, wherever the job runs
+        solver_cfg.geoms_root = os.path.join(globalPath, 'geoms')
+
+        # reuse of a template mesh for designs with the same topology (utils/mesh_morphing.py)
+        morph_cfg = cfg.solver.morph if hasattr(cfg.solver, 'morph') else None
+        solver_cfg.morph = SimpleNamespace()
+        solver_cfg.morph.enabled = bool(getattr(morph_cfg, 'enabled', False))
+        solver_cfg.morph.min_scaled_jacobian = getattr(morph_cfg, 'min_scaled_jacobian', 0.2)
+        solver_cfg.morph.max_aspect_ratio = getattr(morph_cfg, 'max_aspect_ratio', 15.0)
+        solver_cfg.morph.max_control_shift = getattr(morph_cfg, 'max_control_shift', 2.0)
 
         solver_cfg.outputs = SimpleNamespace()
 
@@ -258,6 +422,23 @@ def read_conf(cfg:DictConfig, globalPath: str = None) -> tuple[list[str], list[s
                 print('No attr \'solver.outputs.frame_time_for_metric\'. Set default - [0., 1.] second')
                 solver_cfg.outputs.field_outputs = [0., 1.]
 
+            # design metrics the parser reduces; lean / .fil outputs request only their variables
+            # (S_mises: S on the frame cells, Diameter: U on the frame nodes, RF: RF on the loader)
+            solver_cfg.outputs.metrics = [str(m) for m in getattr(cfg.solver.outputs, 'metrics',
+                                                                  ['S_mises', 'RF', 'Diameter'])]
+            # only metric variables/regions/times in the ODB (see request_outputs in the compiler)
+            solver_cfg.outputs.lean = bool(getattr(cfg.solver.outputs, 'lean', False))
+            solver_cfg.outputs.lean_time_interval = getattr(cfg.solver.outputs, 'lean_time_interval', 0.1)
+
+            # per-design metrics are reduced in the ODB session (metrics.json); full-field CSVs are opt-in
+            solver_cfg.outputs.field_dumps = bool(getattr(cfg.solver.outputs, 'field_dumps', False))
+            solver_cfg.outputs.mises_percentile = getattr(cfg.solver.outputs, 'mises_percentile', 99)
+            # binary full fields per design and frame (utils/field_archive.py): none | npy | hdf5
+            solver_cfg.outputs.field_archive = str(getattr(cfg.solver.outputs, 'field_archive', 'none')).lower()
+            # .fil results file read without Abaqus (utils/fil_reader.py), every fil_frequency increments
+            solver_cfg.outputs.fil = bool(getattr(cfg.solver.outputs, 'fil', False))
+            solver_cfg.outputs.fil_frequency = int(getattr(cfg.solver.outputs, 'fil_frequency', 1))
+
         else:
             print('No attr \'solver.outputs\'. Exit')
             error_count += 1
@@ -270,4 +451,54 @@ def read_conf(cfg:DictConfig, globalPath: str = None) -> tuple[list[str], list[s
     else:
         print("Done!")
 
-    return parameters, objectives, geometry_cfg, material_model, material_cfg, solver_cfg
\ No newline at end of file
+    return parameters, objectives, geometry_cfg, material_model, material_cfg, solver_cfg
+
+# строка `ключ: значение  # комментарий` блочного yaml (списки и flow-записи не подходят)
+_YAML_KEY_LINE = re.compile(r'^(?P<indent> *)(?P<key>[A-Za-z_][\w\-]*):(?P<sep>[ \t]*)(?P<value>.*?)(?P<comment>[ \t]+#.*)?$')
+
+
+def _yaml_scalar(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return json.dumps(str(value))
+
+
+def _find_yaml_key(lines: List[str], path: List[str]) -> int:
+    # номер строки ключа в dot-пути по отступам блочного yaml; -1, если ключа нет
+    stack = []
+    for i, line in enumerate(lines):
+        m = _YAML_KEY_LINE.match(line.rstrip('\n'))
+        if m is None:
+            continue
+        indent = len(m.group('indent'))
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        stack.append((indent, m.group('key')))
+        if [key for _, key in stack] == path:
+            return i
+    return -1
+
+
+def write_back_config(config_path: str, updates: dict) -> None:
+    """
+    Записать подобранные значения (ключи в dot-нотации, напр. 'solver.mesh.seed_size')
+    обратно в .yaml кампании, чтобы следующие запуски брали их по умолчанию.
+    Меняются только значения в строках этих ключей: комментарии, кавычки и порядок остальных
+    строк сохраняются. Ключей, которых нет в файле, не добавляем — KeyError до записи.
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    for key, value in updates.items():
+        i = _find_yaml_key(lines, key.split('.'))
+        if i < 0:
+            raise KeyError(f'{key} is not in {config_path}; add it to the yaml before writing back')
+        m = _YAML_KEY_LINE.match(lines[i].rstrip('\n'))
+        lines[i] = (f"{m.group('indent')}{m.group('key')}:{m.group('sep') or ' '}{_yaml_scalar(value)}"
+                    f"{m.group('comment') or ''}\n")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    print(f'[config] {config_path} updated: {updates}')
@@ -0,0 +1,70 @@
+import os
+import csv
+import contextlib
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def locked(path: str):
+    """
+    Эксклюзивная блокировка журнала между процессами (воркеры JobScheduler пишут в один csv):
+    flock / msvcrt.locking на файле <path>.lock.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _header(path: str):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), None)
+
+
+def append_row(path: str, row: dict) -> None:
+    """
+    Дописать строку в csv-журнал под блокировкой: заголовок — только при создании файла,
+    столбцы строки — в порядке заголовка (отсутствующие пустые). Если в строке есть новые столбцы,
+    журнал один раз переписывается с их объединением (через временный файл и os.replace).
+    """
+    row = {k: ('' if v is None else v) for k, v in row.items()}
+    with locked(path):
+        header = _header(path)
+        if header is not None and not set(row) <= set(header):
+            table = pd.concat([pd.read_csv(path), pd.DataFrame([row])], ignore_index=True, sort=False)
+            table.to_csv(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+            return
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=header or list(row), restval='')
+            if header is None:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def read_log(path: str) -> pd.DataFrame:
+    """csv-журнал целиком (под той же блокировкой, без недописанных строк); пустой, если файла нет."""
+    with locked(path):
+        if _header(path) is None:
+            return pd.DataFrame()
+        return pd.read_csv(path)
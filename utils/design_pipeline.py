@@ -0,0 +1,394 @@
+import os
+import copy
+import json
+import glob
+import random
+import shutil
+import datetime
+from types import SimpleNamespace
+from typing import Union, Dict, Any, List
+
+import numpy as np
+
+from utils.abq_connector import connector_console, write_payload, _to_plain
+from utils.abq_inp_utils import merge_decks
+from utils.cad_drawer import model_drawer
+from utils.abq_solving_utils import parce_results, parce_results_batch
+from utils.runtime_predictor import LOG_NAME, runtime_features, predict_timeout, log_runtime
+from utils.restart_recovery import run_with_recovery
+from utils.increment_tuner import (HISTORY_NAME, DEFAULT_CONTROLS, predict_controls, warm_start_controls,
+                                   run_statistics, read_energy_ratio, record_run)
+from utils.scratch import allocate_scratch, harvest, default_harvester
+from utils.material_sweep import prepare_sweep, write_material_deck, sweep_variants
+from utils.solver_selector import route_analysis, contact_pairs
+from utils.fil_reader import fil_enabled, write_fil_metrics
+
+DEFAULT_COMPILER = 'abq_cae_compiler_standard_small_part.py'
+
+
+def sample_geometry(
+        geometry_cfg: SimpleNamespace = None,
+        parameters: List[str] = None,
+        round_decimals: int = 4,
+        center: bool = False,
+) -> Dict[str, Any]:
+    """
+    Набор геометрических параметров одного дизайна: для ключей из `parameters`
+    берётся случайное значение из диапазона [a, b] (или середина диапазона при center=True).
+    """
+    curr_geometry_cfg = geometry_cfg.__dict__.copy()
+    for key in curr_geometry_cfg.keys():
+        if key in parameters:
+            val_range = curr_geometry_cfg.get(key)
+            if len(val_range) != 2:
+                raise ValueError(f'Exception: error in .yaml configuration. '
+                                 f'Length of geometry.{key} = {len(val_range)} > {val_range}! '
+                                 f'Change it to [a, b]')
+            if center:
+                value = 0.5 * (val_range[0] + val_range[1])
+            else:
+                value = random.uniform(val_range[0], val_range[1])
+            curr_geometry_cfg[key] = np.round(value, round_decimals)
+    return curr_geometry_cfg
+
+
+def design_context(
+        curr_geometry_cfg: Dict[str, Any] = None,
+        length: float = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        compiler: str = DEFAULT_COMPILER,
+        abaqus_cmd: str = 'abaqus',
+) -> SimpleNamespace:
+    """Состояние одного дизайна, которое передаётся между стадиями (CAD -> CAE -> расчёт -> выгрузка)."""
+    return SimpleNamespace(
+        geometry_cfg=curr_geometry_cfg, length=length,
+        material_model=material_model, material_cfg=material_cfg, solver_cfg=solver_cfg,
+        globalPath=globalPath, compiler=compiler, abaqus_cmd=abaqus_cmd,
+        message=None, last_frame_time=None, fea_time=None, predicted_min=None, step_controls=None,
+        warm_start_from=None,
+    )
+
+
+def scratch_enabled(solver_cfg: SimpleNamespace) -> bool:
+    return getattr(getattr(solver_cfg, 'scratch', None), 'root', None) is not None
+
+
+def metrics_work_path(solver_cfg: SimpleNamespace, globalPath: str) -> str:
+    """Каталог, в котором collect_metrics ищет <results_root>/<job>/ (после вывоза из scratch — корень проекта)."""
+    if scratch_enabled(solver_cfg):
+        return globalPath
+    return os.path.join(globalPath, solver_cfg.work_root)
+
+
+def tuner_enabled(solver_cfg: SimpleNamespace) -> bool:
+    return bool(getattr(getattr(solver_cfg, 'tuner', None), 'enabled', False))
+
+
+def warm_start_enabled(solver_cfg: SimpleNamespace) -> bool:
+    return bool(getattr(getattr(solver_cfg, 'warm_start', None), 'enabled', False))
+
+
+def _json_path(ctx: SimpleNamespace) -> str:
+    return os.path.join(ctx.globalPath, ctx.solver_cfg.work_root, 'config.json')
+
+
+def stage_cad(ctx: SimpleNamespace) -> SimpleNamespace:
+    """STEP каркаса в ./geoms/<job_name_prefix>.stp (CadQuery, одно ядро)."""
+    ctx.length = model_drawer(ctx.geometry_cfg, ctx.solver_cfg.job_name_prefix)
+    return ctx
+
+
+def stage_cae(ctx: SimpleNamespace, build: bool = True) -> SimpleNamespace:
+    """
+    Очистка рабочего каталога и сборка деки <work_root>/<job>.inp в Abaqus/CAE.
+    С solver.scratch.root задание переносится в собственный каталог scratch (work_root контекста
+    меняется на него); дека копируется в проектный work_root — для эталонов морфинга.
+    build=False — дека уже готова (морфинг): пишется только payload <work_root>/config.json.
+    solver.analysis = auto — решатель (Standard / Explicit) выбирается по предсказанной стоимости
+    (solver_selector), для готовой деки — по её шагу.
+    """
+    project_work_path = os.path.join(ctx.globalPath, ctx.solver_cfg.work_root)
+    inp_name = ctx.solver_cfg.job_name_prefix + '.inp'
+    if scratch_enabled(ctx.solver_cfg):
+        ctx.solver_cfg = copy.deepcopy(ctx.solver_cfg)
+        ctx.solver_cfg.work_root = allocate_scratch(ctx.solver_cfg.scratch, ctx.solver_cfg.job_name_prefix)
+        if not build:
+            shutil.copyfile(os.path.join(project_work_path, inp_name), os.path.join(ctx.solver_cfg.work_root, inp_name))
+    work_path = os.path.join(ctx.globalPath, ctx.solver_cfg.work_root)
+    solver_cfg = ctx.solver_cfg = route_analysis(
+        ctx.solver_cfg, ctx.geometry_cfg, os.path.join(ctx.globalPath, ctx.solver_cfg.results_root, LOG_NAME),
+        inp_path=None if build else os.path.join(work_path, inp_name))
+    os.makedirs(work_path, exist_ok=True)
+    if os.path.exists(os.path.join(work_path, solver_cfg.results_root)):
+        shutil.rmtree(os.path.join(work_path, solver_cfg.results_root))
+    for file in glob.glob(os.path.join(work_path, 'abaqus*')):
+        os.remove(path=file)
+
+    if build:
+        if tuner_enabled(solver_cfg) or warm_start_enabled(solver_cfg):
+            # StaticStep controls for this design go to the compiler with the json payload
+            history_path = os.path.join(ctx.globalPath, solver_cfg.results_root, HISTORY_NAME)
+            ctx.step_controls = (predict_controls(history_path, ctx.geometry_cfg, solver_cfg.tuner)
+                                 if tuner_enabled(solver_cfg) else dict(DEFAULT_CONTROLS))
+            if warm_start_enabled(solver_cfg):
+                ctx.step_controls, ctx.warm_start_from = warm_start_controls(
+                    history_path, ctx.geometry_cfg, ctx.step_controls, solver_cfg.warm_start,
+                    solver_cfg.tuner.tau_a, own_controls=not tuner_enabled(solver_cfg))
+                if ctx.warm_start_from is not None:
+                    print(f'[warm start] {solver_cfg.job_name_prefix} <- {ctx.warm_start_from}: '
+                          f'initial increment {ctx.step_controls["initial_inc"]:.4g}')
+            solver_cfg = ctx.solver_cfg = copy.deepcopy(solver_cfg)
+            solver_cfg.step_controls = SimpleNamespace(**ctx.step_controls)
+        connector_console(ctx.geometry_cfg, ctx.length,
+                          ctx.material_model, ctx.material_cfg, solver_cfg, solver_cfg.work_root,
+                          ctx.abaqus_cmd,
+                          os.path.join(ctx.globalPath, 'utils', ctx.compiler),
+                          _json_path(ctx),
+                          ctx.globalPath)
+        if work_path != project_work_path and os.path.exists(os.path.join(work_path, inp_name)):
+            os.makedirs(project_work_path, exist_ok=True)
+            shutil.copyfile(os.path.join(work_path, inp_name), os.path.join(project_work_path, inp_name))
+    else:
+        # дека готова без CAE: payload парсера пишется здесь (иначе — прошлого дизайна или никакого)
+        write_payload(_json_path(ctx), ctx.geometry_cfg, ctx.length, ctx.material_model, ctx.material_cfg,
+                      solver_cfg)
+    return ctx
+
+
+def predicted_solve_minutes(ctx: SimpleNamespace) -> (float, Union[float, None], Dict[str, float]):
+    """(таймаут, предсказание, признаки) расчёта по уже записанной деке."""
+    solver_cfg = ctx.solver_cfg
+    log_path = os.path.join(ctx.globalPath, solver_cfg.results_root, LOG_NAME)
+    feats = runtime_features(os.path.join(ctx.globalPath, solver_cfg.work_root, solver_cfg.job_name_prefix + '.inp'),
+                             solver_cfg.cpus, ctx.geometry_cfg)
+    # решатель и контакт — признаки для выбора Standard / Explicit (solver_selector)
+    feats['explicit'] = 1.0 if getattr(solver_cfg, 'analysis', 'standard') == 'explicit' else 0.0
+    feats['contact_pairs'] = contact_pairs(solver_cfg)
+    timeout_min, predicted_min = predict_timeout(log_path, feats, getattr(solver_cfg, 'runtime', None))
+    return timeout_min, predicted_min, feats
+
+
+def stage_solve(ctx: SimpleNamespace) -> SimpleNamespace:
+    """
+    Расчёт Abaqus (Standard / Explicit) с предсказанным таймаутом, живым монитором
+    и восстановлением по рестарту (Standard).
+    """
+    solver_cfg = ctx.solver_cfg
+    runtime_cfg = getattr(solver_cfg, 'runtime', None)
+    timeout_min, ctx.predicted_min, feats = predicted_solve_minutes(ctx)
+
+    t0 = datetime.datetime.now()
+    ctx.message, ctx.last_frame_time = run_with_recovery(solver_cfg, solver_cfg.work_root, ctx.abaqus_cmd,
+                                                         ctx.globalPath, timeout_min=timeout_min,
+                                                         sleep_retries=getattr(runtime_cfg, 'sleep_retries', None))
+    ctx.fea_time = datetime.datetime.now() - t0
+    print(f'[solver] get message: {ctx.message}. Last frame step: {ctx.last_frame_time}. '
+          f'Costed time: {ctx.fea_time} (predicted {ctx.predicted_min} min, timeout {timeout_min:.1f} min)')
+    log_runtime(os.path.join(ctx.globalPath, solver_cfg.results_root, LOG_NAME),
+                feats, ctx.predicted_min, timeout_min, ctx.fea_time.total_seconds() / 60, ctx.message)
+    return ctx
+
+
+def stage_parse(ctx: SimpleNamespace, asynchronous: bool = False) -> SimpleNamespace:
+    """
+    Выгрузка метрик из .fil или ODB в <work_root>/<results_root>/<job>/. Для задания в scratch метрики
+    вывозятся в <results_root>/<job>/ проекта, ODB (по желанию, gzip) — в <results_root>/odb/,
+    каталог scratch удаляется. asynchronous=True: ждём только метрики, остальное — в фоне.
+    """
+    solver_cfg = ctx.solver_cfg
+    work_path = os.path.join(ctx.globalPath, solver_cfg.work_root)
+    # .fil читается без Abaqus; ODB-парсер — если .fil не подходит (см. write_fil_metrics)
+    if not (fil_enabled(solver_cfg) and write_fil_metrics(work_path, solver_cfg, ctx.geometry_cfg)):
+        parce_results(solver_cfg, ctx.abaqus_cmd, _json_path(ctx))
+    if ctx.step_controls is not None:
+        record_run(os.path.join(ctx.globalPath, solver_cfg.results_root, HISTORY_NAME),
+                   solver_cfg.job_name_prefix, ctx.geometry_cfg, ctx.step_controls,
+                   run_statistics(work_path, solver_cfg.job_name_prefix),
+                   read_energy_ratio(os.path.join(work_path, solver_cfg.results_root, solver_cfg.job_name_prefix)),
+                   ctx.message, ctx.warm_start_from)
+    if scratch_enabled(solver_cfg):
+        kwargs = dict(scratch_dir=solver_cfg.work_root, solver_cfg=solver_cfg,
+                      metrics_dest=os.path.join(ctx.globalPath, solver_cfg.results_root, solver_cfg.job_name_prefix),
+                      odb_dest=os.path.join(ctx.globalPath, solver_cfg.results_root, 'odb'))
+        if asynchronous:
+            default_harvester().submit(**kwargs).wait()
+        else:
+            harvest(**kwargs)
+    return ctx
+
+
+def solve_design(
+        curr_geometry_cfg: Dict[str, Any] = None,
+        length: float = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        compiler: str = DEFAULT_COMPILER,
+        abaqus_cmd: str = 'abaqus',
+        build: bool = True,
+) -> (str, float, datetime.timedelta):
+    """
+    CAE-сборка -> расчёт -> выгрузка результатов для уже построенной геометрии
+    (STEP лежит в ./geoms/<job_name_prefix>.stp). Возвращает (message, last_frame_time, fea_time).
+    build=False — дека <work_root>/<job>.inp уже готова (морфинг сетки), CAE-сборка пропускается.
+    """
+    ctx = design_context(curr_geometry_cfg, length, material_model, material_cfg, solver_cfg, globalPath,
+                         compiler, abaqus_cmd)
+    stage_cae(ctx, build=build)
+    stage_solve(ctx)
+    stage_parse(ctx, asynchronous=True)
+    return ctx.message, ctx.last_frame_time, ctx.fea_time
+
+
+def solve_batch(
+        curr_geometry_cfgs: List[Dict[str, Any]] = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        compiler: str = DEFAULT_COMPILER,
+        abaqus_cmd: str = 'abaqus',
+) -> List[SimpleNamespace]:
+    """
+    Пакет дизайнов одним заданием Abaqus (solver.batch.size > 1): у каждого дизайна своя
+    геометрия и дека <job>_bK.inp, деки объединяются в <job>_batch.inp (экземпляры FRAME_DK,
+    balloon_DK, ...), расчёт и выгрузка ODB — один раз на пакет, метрики раскладываются по
+    <results_root>/<job>_bK/. Пакет считается в work_root (без scratch и без автоподбора шага)
+    одним решателем: при solver.analysis = auto — Standard.
+    Возвращает контексты собранных дизайнов; fea_time — доля времени пакета на дизайн.
+    """
+    base_cfg = copy.deepcopy(solver_cfg)
+    base_cfg.scratch.root = None
+    base_cfg.tuner.enabled = False
+    base_cfg.warm_start.enabled = False
+    if base_cfg.analysis not in ('standard', 'explicit'):
+        base_cfg.analysis = 'standard'
+    work_path = os.path.join(globalPath, base_cfg.work_root)
+
+    members = []
+    for k, curr_geometry_cfg in enumerate(curr_geometry_cfgs):
+        cfg = copy.deepcopy(base_cfg)
+        cfg.job_name_prefix = f'{solver_cfg.job_name_prefix}_b{k}'
+        ctx = design_context(curr_geometry_cfg, None, material_model, material_cfg, cfg, globalPath,
+                             compiler, abaqus_cmd)
+        ctx.index = k
+        try:
+            stage_cad(ctx)
+            stage_cae(ctx)
+        except Exception as e:
+            print(f'[batch] design {k} skipped: {e}')
+            continue
+        if os.path.exists(os.path.join(work_path, cfg.job_name_prefix + '.inp')):
+            members.append((f'D{k}', ctx))
+    if not members:
+        return []
+
+    batch_cfg = copy.deepcopy(base_cfg)
+    batch_cfg.job_name_prefix = f'{solver_cfg.job_name_prefix}_batch'
+    batch_cfg.batch.members = [[tag, ctx.solver_cfg.job_name_prefix] for tag, ctx in members]
+    merge_decks([os.path.join(work_path, ctx.solver_cfg.job_name_prefix + '.inp') for _, ctx in members],
+                [tag for tag, _ in members],
+                os.path.join(work_path, batch_cfg.job_name_prefix + '.inp'))
+
+    batch_ctx = design_context(dict(), None, material_model, material_cfg, batch_cfg, globalPath, compiler,
+                               abaqus_cmd)
+    stage_solve(batch_ctx)
+    json_path = os.path.join(work_path, 'config_batch.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'solver_cfg': _to_plain(batch_cfg)}, f, ensure_ascii=False, indent=2)
+    parce_results(batch_cfg, abaqus_cmd, json_path)
+
+    out = []
+    for _, ctx in members:
+        ctx.message, ctx.last_frame_time = batch_ctx.message, batch_ctx.last_frame_time
+        ctx.fea_time = batch_ctx.fea_time / len(members)
+        out.append(ctx)
+    return out
+
+
+def solve_material_sweep(
+        curr_geometry_cfg: Dict[str, Any] = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        abaqus_cmd: str = 'abaqus',
+) -> List[SimpleNamespace]:
+    """
+    Варианты материала (solver.material_sweep) для уже собранной деки дизайна <work_root>/<job>.inp:
+    сетка выносится один раз в <job>_mesh.inp, на вариант пишется только мастер-дека
+    <job>_<вариант>.inp (*Include сетки + свой *Material) — без CAD и CAE. Метрики — в
+    <results_root>/<job>_<вариант>/, ODB всех вариантов разбираются одной пачкой (parce_results_batch).
+    Варианты считаются в work_root (без scratch и без автоподбора шага).
+    Возвращает контексты вариантов (ctx.material — имя варианта).
+    """
+    base_cfg = copy.deepcopy(solver_cfg)
+    base_cfg.scratch.root = None
+    base_cfg.tuner.enabled = False
+    base_cfg.warm_start.enabled = False
+    work_path = os.path.join(globalPath, base_cfg.work_root)
+    inp_path = os.path.join(work_path, solver_cfg.job_name_prefix + '.inp')
+    base_cfg = route_analysis(base_cfg, inp_path=inp_path)
+    mesh_name = prepare_sweep(inp_path)
+
+    out, jobs = [], []
+    for name, variant_model, variant_cfg in sweep_variants(material_model, material_cfg, solver_cfg.material_sweep):
+        cfg = copy.deepcopy(base_cfg)
+        cfg.job_name_prefix = f'{solver_cfg.job_name_prefix}_{name}'
+        write_material_deck(inp_path, mesh_name, os.path.join(work_path, cfg.job_name_prefix + '.inp'),
+                            variant_model, variant_cfg)
+        ctx = design_context(curr_geometry_cfg, None, variant_model, variant_cfg, cfg, globalPath,
+                             abaqus_cmd=abaqus_cmd)
+        ctx.material = name
+        try:
+            stage_solve(ctx)
+            json_path = os.path.join(work_path, f'config_{name}.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'solver_cfg': _to_plain(cfg)}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f'[material sweep] {name}: {e}')
+            continue
+        jobs.append((cfg, json_path))
+        out.append(ctx)
+    # ODB вариантов — одной пачкой в сессиях abaqus python
+    parce_results_batch(jobs, abaqus_cmd, solver_cfg.parser.processes)
+    return out
+
+
+def parallel_design_contexts(
+        geometry_cfg: SimpleNamespace = None,
+        parameters: List[str] = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        n_designs: int = 10000,
+        round_decimals: int = 4,
+        compiler: str = DEFAULT_COMPILER,
+        abaqus_cmd: str = 'abaqus',
+):
+    """
+    Контексты дизайнов для параллельной кампании: у каждого свой job_name_prefix и свой
+    рабочий каталог <work_root>_dNNNNN рядом с work_root (../geoms из компилятора остаётся верным).
+    """
+    for idx in range(n_designs):
+        curr_solver_cfg = copy.deepcopy(solver_cfg)
+        curr_solver_cfg.work_root = f'{solver_cfg.work_root}_d{idx:05d}'
+        curr_solver_cfg.job_name_prefix = f'{solver_cfg.job_name_prefix}_{idx:05d}'
+        ctx = design_context(sample_geometry(geometry_cfg, parameters, round_decimals), None,
+                             material_model, material_cfg, curr_solver_cfg, globalPath, compiler, abaqus_cmd)
+        ctx.index = idx
+        ctx.t_begin = datetime.datetime.now()
+        yield ctx
+
+
+def stage_cost(stage: str, ctx: SimpleNamespace) -> float:
+    """Ожидаемая стоимость стадии для планировщика: предсказанные минуты расчёта, остальные ~0."""
+    if stage != 'solve':
+        return 0.0
+    timeout_min, predicted_min, _ = predicted_solve_minutes(ctx)
+    return predicted_min if predicted_min is not None else timeout_min
@@ -0,0 +1,96 @@
+import os
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+# каталог и файл архива полей дизайна в <results_root>/<job>/ (пишет abq_parse_results.py)
+FIELDS_DIR = 'fields'
+H5_NAME = 'fields.h5'
+
+
+def _h5py():
+    try:
+        import h5py
+    except ImportError:
+        return None
+    return h5py
+
+
+def design_members(solver_cfg) -> List[str]:
+    """Задания, чьи метрики лежат в <results_root>/<job>/: дизайн или участники пакета."""
+    members = getattr(getattr(solver_cfg, 'batch', None), 'members', None) or []
+    return [str(job) for _, job in members] or [solver_cfg.job_name_prefix]
+
+
+def pack_design(res_path: str, chunk_rows: int = 65536, compression: str = 'gzip') -> bool:
+    """
+    fields/*.npy дизайна -> <res_path>/fields.h5: набор /<кадр>/<поле> со сжатием, блоками по
+    chunk_rows строк (чтение куска не распаковывает весь кадр); npy удаляются.
+    Без h5py npy остаются на месте (тоже читаются через mmap) — возвращает False.
+    """
+    fields_path = os.path.join(res_path, FIELDS_DIR)
+    if not os.path.isdir(fields_path):
+        return False
+    h5py = _h5py()
+    if h5py is None:
+        print('[fields] h5py is not installed: field archive stays as .npy')
+        return False
+    names = sorted(f for f in os.listdir(fields_path) if f.endswith('.npy'))
+    with h5py.File(os.path.join(res_path, H5_NAME), 'a') as f:
+        for name in names:
+            tag, kind = name[:-4].rsplit('_', 1)
+            data = np.load(os.path.join(fields_path, name), mmap_mode='r')
+            key = f'{tag}/{kind}'
+            if key in f:
+                del f[key]
+            if len(data):
+                f.create_dataset(key, data=data, chunks=(min(chunk_rows, len(data)),),
+                                 compression=compression, shuffle=True)
+            else:
+                f.create_dataset(key, data=data)
+    for name in names:
+        os.remove(os.path.join(fields_path, name))
+    if not os.listdir(fields_path):
+        os.rmdir(fields_path)
+    return True
+
+
+def read_field(res_path: str, tag: str = 't_last', kind: str = 'mises') -> Union[np.ndarray, None]:
+    """
+    Поле кадра дизайна (структурный массив: element, ip, mises / node, u1): из fields.h5 или
+    fields/<tag>_<kind>.npy (mmap, без чтения файла целиком). None, если поля нет.
+    """
+    npy = os.path.join(res_path, FIELDS_DIR, f'{tag}_{kind}.npy')
+    if os.path.exists(npy):
+        return np.load(npy, mmap_mode='r')
+    h5 = os.path.join(res_path, H5_NAME)
+    h5py = _h5py()
+    if h5py is None or not os.path.exists(h5):
+        return None
+    with h5py.File(h5, 'r') as f:
+        key = f'{tag}/{kind}'
+        return f[key][...] if key in f else None
+
+
+def iter_fields(
+        results_path: str = None,
+        tag: str = 't_last',
+        kind: str = 'mises',
+) -> Iterator[Tuple[str, Union[np.ndarray, 'h5py.Dataset']]]:
+    """
+    Поток (задание, поле) по всем дизайнам <results_path>/<job>/ для обучения суррогатов и
+    поиска концентраторов: npy отдаются как mmap, наборы HDF5 — лениво (срезы читают только
+    нужные блоки; набор действителен до следующей итерации).
+    """
+    h5py = _h5py()
+    for job in sorted(os.listdir(results_path)):
+        res_path = os.path.join(results_path, job)
+        npy = os.path.join(res_path, FIELDS_DIR, f'{tag}_{kind}.npy')
+        h5 = os.path.join(res_path, H5_NAME)
+        if os.path.exists(npy):
+            yield job, np.load(npy, mmap_mode='r')
+        elif h5py is not None and os.path.exists(h5):
+            with h5py.File(h5, 'r') as f:
+                key = f'{tag}/{kind}'
+                if key in f:
+                    yield job, f[key]
@@ -0,0 +1,249 @@
+import os
+import json
+import glob
+from types import SimpleNamespace
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+
+from utils.abq_solving_utils import METRICS_NAME
+from utils.increment_tuner import ENERGY_NAME
+from utils.abq_stability import STABILITY_NAME, stability_series, select_last_stable, concat_series, \
+    write_series, thresholds
+
+# ключи записей результатов (.fil), которые запрашивает request_fil_outputs компилятора
+KEY_ELEMENT_HEADER = 1
+KEY_S = 11
+KEY_U = 101
+KEY_RF = 104
+KEY_COORD = 107
+KEY_ENERGY = 1999
+KEY_INCREMENT = 2000
+# номера атрибутов (с 1) в записях 2000 и 1999
+_INC_TOTAL_TIME, _INC_STEP, _INC_NUMBER = 1, 6, 7
+_ENERGY_ATTRS = (('ALLKE', 1), ('ALLWK', 3), ('ALLVD', 6), ('ALLAE', 8), ('ALLIE', 11), ('ALLFD', 13))
+_BLOCK_WORDS = 512
+# допуск совпадения времени кадра с моментом метрики (как SYS_AGREEMENT_ERROR_BY_TIME парсера)
+_TIME_TOLERANCE = 0.01
+
+
+def _words(path: str) -> bytes:
+    """
+    Поток 8-байтовых слов файла результатов. Двоичный .fil пишется блоками по 512 слов;
+    последовательная запись Фортрана добавляет к блоку 4-байтовые маркеры длины — они снимаются.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    block = _BLOCK_WORDS * 8
+    if len(data) >= 4 and np.frombuffer(data[:4], '<i4')[0] == block:
+        chunks = np.frombuffer(data[:len(data) - len(data) % (block + 8)], np.uint8).reshape(-1, block + 8)
+        data = chunks[:, 4:4 + block].tobytes()
+    return data[:len(data) - len(data) % 8]
+
+
+def read_records(path: str) -> SimpleNamespace:
+    """
+    Записи .fil: ints / floats — то же слово как int64 / float64, starts / lengths / keys —
+    начало, длина (в словах, с двумя словами заголовка) и ключ каждой записи.
+    Запись: [длина, ключ, атрибут 1, атрибут 2, ...].
+    """
+    data = _words(path)
+    ints = np.frombuffer(data, '<i8')
+    floats = np.frombuffer(data, '<f8')
+    starts = []
+    pos, n = 0, len(ints)
+    while pos + 1 < n:
+        length = int(ints[pos])
+        if length < 2 or pos + length > n:
+            break   # нули в конце последнего блока
+        starts.append(pos)
+        pos += length
+    starts = np.asarray(starts, dtype=np.int64)
+    return SimpleNamespace(ints=ints, floats=floats, starts=starts, lengths=ints[starts], keys=ints[starts + 1])
+
+
+def _attr(rec: SimpleNamespace, starts: np.ndarray, k: int, kind: str = 'floats') -> np.ndarray:
+    # атрибут k (с 1) записей, начинающихся в starts
+    return getattr(rec, kind)[starts + 1 + k]
+
+
+def increments(rec: SimpleNamespace) -> SimpleNamespace:
+    """Инкременты (записи 2000): начало в потоке, полное время, номер шага и инкремента."""
+    starts = rec.starts[rec.keys == KEY_INCREMENT]
+    return SimpleNamespace(starts=starts,
+                           total_time=_attr(rec, starts, _INC_TOTAL_TIME),
+                           step=_attr(rec, starts, _INC_STEP, 'ints'),
+                           number=_attr(rec, starts, _INC_NUMBER, 'ints'))
+
+
+def _owner(starts: np.ndarray, owners: np.ndarray) -> np.ndarray:
+    # индекс записи-владельца (инкремента, заголовка элемента) — последней перед каждой записью
+    return np.searchsorted(owners, starts, side='right') - 1
+
+
+def node_output(rec: SimpleNamespace, inc: SimpleNamespace, key: int, i_inc: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(узлы, компоненты [n, m]) узловой записи key (U, RF, COORD) в инкременте i_inc."""
+    starts = rec.starts[rec.keys == key]
+    starts = starts[_owner(starts, inc.starts) == i_inc]
+    if not len(starts):
+        return np.zeros(0, np.int64), np.zeros((0, 3))
+    m = int(rec.ints[starts[0]]) - 3
+    idx = starts[:, None] + 3 + np.arange(m)[None, :]
+    return rec.ints[starts + 2], rec.floats[idx]
+
+
+def element_mises(rec: SimpleNamespace, inc: SimpleNamespace, i_inc: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (элементы, точки интегрирования, Mises) по записям S инкремента i_inc. Число прямых и
+    сдвиговых компонент берётся из заголовка элемента (запись 1) перед каждой записью S.
+    """
+    s_starts = rec.starts[rec.keys == KEY_S]
+    s_starts = s_starts[_owner(s_starts, inc.starts) == i_inc]
+    h_starts = rec.starts[rec.keys == KEY_ELEMENT_HEADER]
+    if not len(s_starts) or not len(h_starts):
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    headers = h_starts[_owner(s_starts, h_starts)]
+    ndi, nshr = _attr(rec, headers, 6, 'ints'), _attr(rec, headers, 7, 'ints')
+    mises = np.zeros(len(s_starts))
+    for n_direct, n_shear in set(zip(ndi.tolist(), nshr.tolist())):
+        mask = (ndi == n_direct) & (nshr == n_shear)
+        comps = rec.floats[s_starts[mask][:, None] + 2 + np.arange(n_direct + n_shear)[None, :]]
+        s = np.zeros((comps.shape[0], 6))
+        s[:, :n_direct] = comps[:, :n_direct]             # S11, S22, S33
+        s[:, 3:3 + n_shear] = comps[:, n_direct:]          # S12, S13, S23
+        s11, s22, s33, s12, s13, s23 = s.T
+        j2 = 0.5 * ((s11 - s22) ** 2 + (s22 - s33) ** 2 + (s33 - s11) ** 2) + 3.0 * (s12 ** 2 + s13 ** 2 + s23 ** 2)
+        mises[mask] = np.sqrt(np.maximum(j2, 0.0))
+    return _attr(rec, headers, 1, 'ints'), _attr(rec, headers, 2, 'ints'), mises
+
+
+def energies(rec: SimpleNamespace, inc: SimpleNamespace) -> Dict[str, np.ndarray]:
+    """Энергии модели (запись 1999) по инкрементам: ALLIE, ALLAE, ALLKE, ALLWK, ALLVD, ALLFD; NaN без записи."""
+    starts = rec.starts[rec.keys == KEY_ENERGY]
+    owner = _owner(starts, inc.starts)
+    out = {}
+    for name, k in _ENERGY_ATTRS:
+        values = np.full(len(inc.starts), np.nan)
+        values[owner[owner >= 0]] = _attr(rec, starts[owner >= 0], k)
+        out[name] = values
+    return out
+
+
+def _energy_ratio(energy: Dict[str, np.ndarray], key: str, rel_floor: float = 1e-3) -> Tuple[Any, Any]:
+    # (max, last) key/ALLIE без начала нагружения (ALLIE < rel_floor * max) — как в abq_parse_results
+    allie, other = energy['ALLIE'], energy[key]
+    ok = np.isfinite(allie) & np.isfinite(other)
+    if not ok.any():
+        return None, None
+    ok &= np.abs(allie) > rel_floor * np.nanmax(np.abs(allie))
+    ratios = np.abs(other[ok] / allie[ok])
+    return (float(ratios.max()), float(ratios[-1])) if len(ratios) else (None, None)
+
+
+def _frame_metrics(rec, inc, i_inc, percentile, diameter) -> Dict[str, Any]:
+    """Редукции кадра в формате metrics.json парсера ODB (_frame_metrics в abq_parse_results.py)."""
+    out = {'time': float(inc.total_time[i_inc])}
+    elements, _, mises = element_mises(rec, inc, i_inc)
+    if len(mises):
+        k = int(np.argmax(mises))
+        out.update({'mises_max': float(mises[k]), 'mises_max_element': int(elements[k]),
+                    f'mises_p{percentile:g}': float(np.percentile(mises, percentile))})
+    nodes, rf = node_output(rec, inc, KEY_RF, i_inc)
+    if len(nodes):
+        total = rf[:, :3].sum(axis=0)
+        out.update({'rf': total.tolist(), 'rf_resultant': float(np.linalg.norm(total)), 'rf_nodes': int(len(nodes))})
+    u_nodes, u = node_output(rec, inc, KEY_U, i_inc)
+    c_nodes, coord = node_output(rec, inc, KEY_COORD, i_inc)
+    if len(u_nodes) and len(c_nodes):
+        # радиальное перемещение в цилиндрической СК модели (ось Z через начало координат)
+        order = np.argsort(c_nodes)
+        coord = coord[order[np.searchsorted(c_nodes, u_nodes, sorter=order)]]
+        x0 = coord[:, :2] - u[:, :2]
+        r0 = np.maximum(np.linalg.norm(x0, axis=1), 1e-12)
+        u1 = (x0 * u[:, :2]).sum(axis=1) / r0
+        out.update({'u1_max': float(u1.max()), 'u1_mean': float(u1.mean())})
+        out['diameter'] = diameter + 2.0 * out['u1_max'] if diameter is not None else None
+    return out
+
+
+def fil_summary(
+        fil_path: str = None,
+        solver_cfg: SimpleNamespace = None,
+        geometry_cfg: Union[Dict[str, Any], None] = None,
+) -> Union[Tuple[Dict[str, Any], Dict[str, np.ndarray]], None]:
+    """
+    (сводка metrics.json, ряд stability.csv) по файлу результатов задания: моменты
+    frame_time_for_metric, последний устойчивый инкремент основного шага по порогам
+    solver.stability (как в парсере ODB) и доли энергий.
+    None, если в .fil нет инкрементов основного шага.
+    """
+    rec = read_records(fil_path)
+    inc = increments(rec)
+    main = np.flatnonzero(inc.step == 1)
+    if not len(main):
+        return None
+    percentile = float(getattr(solver_cfg.outputs, 'mises_percentile', 99))
+    diameter = (geometry_cfg or {}).get('diameter')
+    diameter = float(diameter) if diameter is not None else None
+    energy = energies(rec, inc)
+
+    summary = {'targets': {}, 'cases': {}}
+    for tt in solver_cfg.outputs.frame_time_for_metric:
+        i_inc = main[int(np.argmin(np.abs(inc.total_time[main] - float(tt))))]
+        if float(tt) - inc.total_time[i_inc] > _TIME_TOLERANCE:
+            continue
+        summary['targets'][f'{float(tt):g}'] = _frame_metrics(rec, inc, i_inc, percentile, diameter)
+
+    # энергии пишутся на каждом инкременте с .fil-выводом: сопоставление по времени тривиально
+    times = inc.total_time[main]
+    series = stability_series(times, {key: (times[np.isfinite(v[main])], v[main][np.isfinite(v[main])])
+                                      for key, v in energy.items()})
+    i_last = main[select_last_stable(series, **thresholds(solver_cfg))]
+    summary['last_time'] = float(inc.total_time[i_last])
+    summary['last'] = _frame_metrics(rec, inc, i_last, percentile, diameter)
+    allae, allke = _energy_ratio(energy, 'ALLAE'), _energy_ratio(energy, 'ALLKE')
+    summary['energies'] = {'max_ALLAE_ALLIE': allae[0], 'last_ALLAE_ALLIE': allae[1],
+                           'max_ALLKE_ALLIE': allke[0], 'last_ALLKE_ALLIE': allke[1]}
+    return summary, concat_series([(0, times, series)])
+
+
+def fil_enabled(solver_cfg: SimpleNamespace) -> bool:
+    """Метрики из .fil: outputs.fil и не нужны полевые выгрузки (их пишет только парсер ODB)."""
+    outputs = getattr(solver_cfg, 'outputs', None)
+    return (bool(getattr(outputs, 'fil', False)) and not getattr(outputs, 'field_dumps', False)
+            and str(getattr(outputs, 'field_archive', 'none')) == 'none')
+
+
+def write_fil_metrics(
+        work_path: str = None,
+        solver_cfg: SimpleNamespace = None,
+        geometry_cfg: Union[Dict[str, Any], None] = None,
+) -> bool:
+    """
+    metrics.json (и energies.csv, stability.csv) дизайна из <job>.fil в процессе оркестратора — без Abaqus и
+    лицензии. False (нужен парсер ODB): нет .fil, задание Explicit, пакет дизайнов, рестарты
+    (<job>_rK.fil), случаи нагружения или пустой файл.
+    """
+    job = solver_cfg.job_name_prefix
+    fil_path = os.path.join(work_path, job + '.fil')
+    if (not os.path.exists(fil_path) or str(getattr(solver_cfg, 'analysis', 'standard')) == 'explicit'
+            or getattr(getattr(solver_cfg, 'batch', None), 'members', None)
+            or glob.glob(os.path.join(work_path, job + '_r*.fil'))
+            or getattr(solver_cfg, 'load_cases', None)):
+        return False
+    result = fil_summary(fil_path, solver_cfg, geometry_cfg)
+    if result is None:
+        return False
+    summary, stability = result
+    res_path = os.path.join(work_path, solver_cfg.results_root, job)
+    os.makedirs(res_path, exist_ok=True)
+    with open(os.path.join(res_path, METRICS_NAME), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=1, sort_keys=True)
+    write_series(os.path.join(res_path, STABILITY_NAME), stability)
+    ratios = summary['energies']
+    if ratios['max_ALLAE_ALLIE'] is not None:
+        with open(os.path.join(res_path, ENERGY_NAME), 'w', encoding='utf-8') as f:
+            f.write('max_ALLAE_ALLIE,last_ALLAE_ALLIE,max_ALLKE_ALLIE,last_ALLKE_ALLIE\n')
+            f.write(','.join(str(ratios[k]) for k in ('max_ALLAE_ALLIE', 'last_ALLAE_ALLIE',
+                                                       'max_ALLKE_ALLIE', 'last_ALLKE_ALLIE')) + '\n')
+    return True
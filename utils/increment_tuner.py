@@ -0,0 +1,193 @@
+import os
+import json
+import random
+import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+
+from utils.abq_monitor import JobMonitor, increment_schedule
+
+HISTORY_NAME = 'increment_history.jsonl'
+ENERGY_NAME = 'energies.csv'
+# значения StaticStep, которые стояли в компиляторе для всех дизайнов
+DEFAULT_CONTROLS = {
+    'initial_inc': 0.01,
+    'min_inc': 1e-8,
+    'max_inc': 0.1,
+    'stabilization': 2e-4,
+    'damping_ratio': 0.05,
+}
+_OK_PREFIXES = ('ok', 'ABAQUS stopped early')
+
+
+def design_features(geometry_cfg: Dict[str, Any]) -> Dict[str, float]:
+    """Числовые параметры геометрии дизайна — координаты «области» пространства дизайнов."""
+    return {key: float(value) for key, value in geometry_cfg.items()
+            if isinstance(value, (int, float, np.floating, np.integer)) and not isinstance(value, bool)}
+
+
+def read_history(history_path: str) -> List[dict]:
+    if not os.path.exists(history_path):
+        return []
+    out = []
+    with open(history_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    pass    # строка, недописанная параллельным процессом
+    return out
+
+
+def _successful(record: dict, tau_a: float) -> bool:
+    ratio = record.get('allae_allie')
+    return (str(record.get('message')).startswith(_OK_PREFIXES)
+            and ratio is not None and ratio <= tau_a
+            and record.get('total_time', 0.0) > 0.0)
+
+
+def _cost(record: dict) -> float:
+    # число сошедшихся инкрементов на единицу пройденного времени (ранняя остановка сравнима с полным расчётом)
+    return record['increments'] / max(record['total_time'], 1e-9)
+
+
+def _distances(records: List[dict], feats: Dict[str, float]) -> np.ndarray:
+    # расстояния до дизайнов истории по общим параметрам, нормированным на их разброс
+    keys = [k for k in feats if all(k in r['features'] for r in records)]
+    x = np.asarray([[r['features'][k] for k in keys] for r in records], dtype=float).reshape(len(records), len(keys))
+    scale = np.where(x.std(axis=0) > 0, x.std(axis=0), 1.0)
+    return np.linalg.norm((x - np.asarray([feats[k] for k in keys])) / scale, axis=1)
+
+
+def _explore(controls: dict, tuner_cfg: SimpleNamespace) -> dict:
+    out = dict(controls)
+    lo, hi = tuner_cfg.max_inc_bounds
+    out['max_inc'] = float(np.clip(out['max_inc'] * 2.0 ** random.uniform(-1, 1), lo, hi))
+    lo, hi = tuner_cfg.stabilization_bounds
+    out['stabilization'] = float(np.clip(out['stabilization'] * 2.0 ** random.uniform(-1, 1), lo, hi))
+    out['initial_inc'] = min(out['initial_inc'], out['max_inc'])
+    return out
+
+
+def predict_controls(
+        history_path: str = None,
+        geometry_cfg: Dict[str, Any] = None,
+        tuner_cfg: SimpleNamespace = None,
+) -> dict:
+    """
+    Настройки StaticStep для дизайна: среди k ближайших (по нормированной геометрии) прошлых
+    расчётов, завершившихся с max ALLAE/ALLIE <= tau_a, берутся настройки расчёта с наименьшим
+    числом инкрементов на единицу времени. Пока успешной истории меньше min_samples —
+    DEFAULT_CONTROLS. С вероятностью explore maxInc и стабилизация случайно сдвигаются
+    (в пределах границ), чтобы история покрывала и соседние настройки.
+    """
+    records = [r for r in read_history(history_path) if _successful(r, float(tuner_cfg.tau_a))]
+    controls = dict(DEFAULT_CONTROLS)
+    if len(records) >= int(tuner_cfg.min_samples):
+        nearest = np.argsort(_distances(records, design_features(geometry_cfg)))[:int(tuner_cfg.k)]
+        best = min((records[i] for i in nearest), key=_cost)
+        controls.update(best['controls'])
+    if random.random() < float(tuner_cfg.explore):
+        controls = _explore(controls, tuner_cfg)
+    return controls
+
+
+def warm_start_controls(
+        history_path: str = None,
+        geometry_cfg: Dict[str, Any] = None,
+        controls: dict = None,
+        warm_cfg: SimpleNamespace = None,
+        tau_a: float = 0.05,
+        own_controls: bool = False,
+) -> Tuple[dict, Union[str, None]]:
+    """
+    Тёплый старт от ближайшего успешно посчитанного дизайна истории (не дальше max_distance в
+    нормированных параметрах): начальный инкремент — наибольший инкремент, который сосед сделал
+    до первого уменьшения шага (* safety), так что разгон инкремента с initialInc не повторяется.
+    own_controls=True — остальные настройки шага тоже берутся у соседа (без автоподбора).
+    Возвращает (настройки, задание-сосед или None).
+    """
+    records = [r for r in read_history(history_path)
+               if _successful(r, float(tau_a)) and r.get('schedule')]
+    if not records:
+        return controls, None
+    dist = _distances(records, design_features(geometry_cfg))
+    nearest = int(np.argmin(dist))
+    if dist[nearest] > float(warm_cfg.max_distance):
+        return controls, None
+    source = records[nearest]
+    out = dict(controls)
+    if own_controls:
+        out.update(source['controls'])
+    schedule = source['schedule']
+    first_cutback = next((k for k, (_, _, attempt) in enumerate(schedule) if attempt > 1), len(schedule))
+    safe = [inc for _, inc, _ in schedule[:first_cutback]] or [schedule[0][1]]
+    out['initial_inc'] = float(min(max(safe) * float(warm_cfg.safety), out['max_inc']))
+    return out, source['job']
+
+
+def run_statistics(work_path: str, job_name: str) -> dict:
+    """
+    История инкрементов задания из .sta (и всех его рестартов <job>_rK);
+    schedule — график сошедшихся инкрементов для тёплого старта.
+    """
+    stats = {'increments': 0, 'cutbacks': 0, 'attempts': 0, 'total_time': 0.0, 'completed': False,
+             'schedule': []}
+    names = [job_name] + sorted(f[:-4] for f in os.listdir(work_path)
+                                if f.startswith(job_name + '_r') and f.endswith('.sta'))
+    for name in names:
+        monitor = JobMonitor(work_path, name)
+        monitor.poll()
+        stats['increments'] += monitor.attempts - monitor.cutbacks
+        stats['cutbacks'] += monitor.cutbacks
+        stats['attempts'] += monitor.attempts
+        stats['total_time'] = max(stats['total_time'], monitor.total_time)
+        stats['completed'] = monitor.completed
+        # рестарт продолжает с точки рестарта: инкременты прошлой попытки после неё отбрасываются
+        schedule = increment_schedule(os.path.join(work_path, name + '.sta'))
+        if schedule:
+            start = schedule[0][0] - schedule[0][1]
+            stats['schedule'] = [row for row in stats['schedule'] if row[0] <= start + 1e-9] + schedule
+    return stats
+
+
+def read_energy_ratio(res_path: str) -> Union[float, None]:
+    """max ALLAE/ALLIE за расчёт из <results_root>/<job>/energies.csv (пишет abq_parse_results.py)."""
+    path = os.path.join(res_path, ENERGY_NAME)
+    if not os.path.exists(path):
+        return None
+    data = np.genfromtxt(path, delimiter=',', skip_header=1)
+    return float(np.atleast_1d(data)[0])
+
+
+def record_run(
+        history_path: str = None,
+        job_name: str = None,
+        geometry_cfg: Dict[str, Any] = None,
+        controls: dict = None,
+        stats: dict = None,
+        allae_allie: Union[float, None] = None,
+        message: str = None,
+        warm_start_from: Union[str, None] = None,
+) -> None:
+    """
+    Дописать расчёт (геометрия, настройки шага, инкременты, ALLAE/ALLIE, сосед тёплого старта)
+    в историю (jsonl).
+    """
+    record = {
+        'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'job': job_name,
+        'features': design_features(geometry_cfg),
+        'controls': controls,
+        'allae_allie': allae_allie,
+        'message': str(message),
+        'warm_start_from': warm_start_from,
+    }
+    record.update(stats)
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
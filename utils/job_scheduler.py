@@ -0,0 +1,176 @@
+import time
+import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+def abaqus_tokens(cores: int) -> int:
+    """Токены Abaqus на анализ: int(5 * cores ** 0.422)."""
+    return int(5 * int(cores) ** 0.422)
+
+
+def stage_shapes(solver_cfg: SimpleNamespace, cae_tokens: int = 1) -> Dict[str, Tuple[int, int]]:
+    """
+    Ресурсы стадий (ядра, токены): CadQuery — одно ядро; сборка в `abaqus cae noGUI` — одно ядро
+    и токен CAE; Standard — cpus ядер и токены по числу ядер; выгрузка — одно ядро без токенов
+    (ODB читается в `abaqus python`, .fil — в самом оркестраторе).
+    """
+    return {
+        'cad': (1, 0),
+        'cae': (1, int(cae_tokens)),
+        'solve': (int(solver_cfg.cpus), abaqus_tokens(solver_cfg.cpus)),
+        'parse': (1, 0),
+    }
+
+
+class TokenBudget(object):
+    """
+    Лицензионные токены узла. Заглушка сервера лицензий: просто счётчик с потолком `total`.
+    Подкласс может спрашивать реальный сервер в try_acquire.
+    """
+
+    def __init__(self, total: int):
+        self.total = int(total)
+        self.used = 0
+
+    def try_acquire(self, n: int) -> bool:
+        if self.used + n > self.total:
+            return False
+        self.used += n
+        return True
+
+    def release(self, n: int) -> None:
+        self.used = max(0, self.used - n)
+
+
+class JobScheduler(object):
+    """
+    Локальный планировщик стадий дизайнов: упаковывает задачи по ядрам узла и бюджету токенов,
+    никогда не превышая ни того, ни другого. Из очереди первой берётся самая дорогая задача
+    (longest processing time first) среди тех, что помещаются в свободные ресурсы; при равной
+    стоимости — в порядке поступления.
+
+    Каждый дизайн проходит стадии `stages` по порядку; функция стадии получает контекст дизайна
+    и возвращает обновлённый (выполняется в отдельном процессе, поэтому должна быть picklable).
+    `cost_fn(stage, ctx)` — ожидаемая стоимость стадии (например, предсказанные минуты расчёта).
+    """
+
+    def __init__(
+            self,
+            cores: int = 1,
+            tokens: TokenBudget = None,
+            shapes: Dict[str, Tuple[int, int]] = None,
+            cost_fn: Callable[[str, Any], float] = None,
+    ):
+        self.cores = int(cores)
+        self.tokens = tokens or TokenBudget(10 ** 9)
+        self.shapes = shapes
+        self.cost_fn = cost_fn or (lambda stage, ctx: 0.0)
+        for stage, (n_cores, n_tokens) in shapes.items():
+            if n_cores > self.cores or n_tokens > self.tokens.total:
+                raise ValueError(f'stage {stage} needs {n_cores} cores / {n_tokens} tokens, '
+                                 f'node has {self.cores} / {self.tokens.total}')
+        self.free_cores = self.cores
+        self._queue = []
+        self._seq = itertools.count()
+        self._t0 = None
+        self._last_event = None
+        self._busy_core_seconds = 0.0
+        self._token_seconds = 0.0
+        self._depth_samples = []
+
+    def _push(self, stage_idx: int, stages: List[Tuple[str, Callable]], ctx: Any) -> None:
+        cost = float(self.cost_fn(stages[stage_idx][0], ctx))
+        heapq.heappush(self._queue, (-cost, next(self._seq), stage_idx, ctx))
+
+    def _pop_fitting(self, stages: List[Tuple[str, Callable]]):
+        skipped, item = [], None
+        while self._queue:
+            candidate = heapq.heappop(self._queue)
+            n_cores, n_tokens = self.shapes[stages[candidate[2]][0]]
+            if n_cores <= self.free_cores and self.tokens.try_acquire(n_tokens):
+                self.free_cores -= n_cores
+                item = candidate
+                break
+            skipped.append(candidate)
+        for candidate in skipped:
+            heapq.heappush(self._queue, candidate)
+        return item
+
+    def _account(self) -> None:
+        now = time.time()
+        dt = now - self._last_event
+        self._busy_core_seconds += dt * (self.cores - self.free_cores)
+        self._token_seconds += dt * self.tokens.used
+        self._depth_samples.append(len(self._queue))
+        self._last_event = now
+
+    def run(
+            self,
+            designs: Iterator[Any],
+            stages: List[Tuple[str, Callable]],
+            on_done: Callable[[Any, Exception], None] = None,
+            max_inflight: int = None,
+    ) -> dict:
+        """
+        Пропустить все дизайны из итератора `designs` (контексты) через стадии. Новые дизайны
+        берутся лениво, пока в работе меньше `max_inflight`. on_done(ctx, error) вызывается
+        в главном процессе для каждого дизайна (error=None при успехе). Возвращает stats().
+        """
+        max_inflight = max_inflight or 2 * self.cores
+        designs = iter(designs)
+        exhausted, inflight = False, 0
+        self._t0 = self._last_event = time.time()
+        running = dict()
+        with ProcessPoolExecutor(max_workers=self.cores) as pool:
+            while True:
+                while not exhausted and inflight < max_inflight:
+                    try:
+                        self._push(0, stages, next(designs))
+                        inflight += 1
+                    except StopIteration:
+                        exhausted = True
+                while True:
+                    item = self._pop_fitting(stages)
+                    if item is None:
+                        break
+                    _, _, stage_idx, ctx = item
+                    future = pool.submit(stages[stage_idx][1], ctx)
+                    running[future] = (stage_idx, ctx)
+                if not running:
+                    break
+                done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                self._account()
+                for future in done:
+                    stage_idx, ctx = running.pop(future)
+                    n_cores, n_tokens = self.shapes[stages[stage_idx][0]]
+                    self.free_cores += n_cores
+                    self.tokens.release(n_tokens)
+                    try:
+                        ctx = future.result()
+                    except Exception as e:
+                        inflight -= 1
+                        if on_done is not None:
+                            on_done(ctx, e)
+                        continue
+                    if stage_idx + 1 < len(stages):
+                        self._push(stage_idx + 1, stages, ctx)
+                    else:
+                        inflight -= 1
+                        if on_done is not None:
+                            on_done(ctx, None)
+        return self.stats()
+
+    def stats(self) -> dict:
+        """Средняя/максимальная длина очереди и загрузка ядер и токенов за время работы."""
+        wall = max((self._last_event or 0.0) - (self._t0 or 0.0), 1e-9)
+        depth = self._depth_samples or [0]
+        return {
+            'wall_s': wall,
+            'queue_depth_mean': sum(depth) / float(len(depth)),
+            'queue_depth_max': max(depth),
+            'core_utilisation': self._busy_core_seconds / (self.cores * wall),
+            'token_utilisation': self._token_seconds / (max(self.tokens.total, 1) * wall),
+        }
@@ -0,0 +1,121 @@
+import os
+import copy
+import random
+from types import SimpleNamespace
+from typing import List, Tuple
+
+from utils.abq_inp_utils import _keyword
+
+MESH_SUFFIX = '_mesh.inp'
+# ключевые слова, которые входят в блок *Material (до следующего ключевого слова модели)
+_MATERIAL_OPTIONS = ('elastic', 'plastic', 'superelastic', 'superelastic hardening',
+                     'superelastic hardening modifications', 'density', 'damping', 'expansion', 'depvar',
+                     'user material', 'hyperelastic', 'conductivity', 'specific heat')
+
+
+def material_keywords(material_model: str, material_cfg: SimpleNamespace) -> List[str]:
+    """
+    Блок *Material деки для материала из read_material — те же таблицы, что компилятор
+    передаёт в Abaqus/CAE (Elastic, Plastic, SuperElasticity).
+    """
+    model = str(material_model).lower()
+    lines = [f'*Material, name={material_cfg.name}']
+    if model == 'superelastic':
+        lines += ['*Elastic', f'{material_cfg.EA}, {material_cfg.Poisson}']
+        eps_v = getattr(material_cfg, 'eps_V', None)
+        lines.append('*Superelastic' + (f', nonassociated={eps_v}' if eps_v is not None else ''))
+        table = [material_cfg.EM, material_cfg.nuM, material_cfg.eps_L,
+                 material_cfg.sig_s_AS, material_cfg.sig_f_AS, material_cfg.sig_s_SA,
+                 material_cfg.sig_f_SA, material_cfg.sig_s_AC,
+                 material_cfg.T0, material_cfg.dSig_dT_L_per_C, material_cfg.dSig_dT_U_per_C]
+        lines += [', '.join(str(v) for v in table[k:k + 8]) for k in range(0, len(table), 8)]
+    else:
+        lines += ['*Elastic', f'{material_cfg.EM}, {material_cfg.Poisson}']
+        if model == 'polynomial':
+            lines.append('*Plastic')
+            lines += [', '.join(str(v) for v in row) for row in material_cfg.mat_table]
+    return lines
+
+
+def split_deck(inp_path: str, mesh_path: str) -> None:
+    """
+    Геометрия и сетка деки (*Part ... *End Assembly: узлы, элементы, наборы, сечения, экземпляры)
+    в отдельный файл для *Include. Материал, амплитуды, контакты и шаги остаются в мастер-деке.
+    """
+    with open(inp_path, 'r') as f:
+        lines = f.readlines()
+    start, end = _mesh_block(lines, inp_path)
+    with open(mesh_path, 'w') as f:
+        f.writelines(lines[start:end])
+
+
+def _mesh_block(lines: List[str], inp_path: str) -> Tuple[int, int]:
+    keys = [(i, _keyword(line)[0]) for i, line in enumerate(lines)
+            if line.startswith('*') and not line.startswith('**')]
+    starts = [i for i, key in keys if key == 'part']
+    ends = [i for i, key in keys if key == 'end assembly']
+    if not starts or not ends:
+        raise ValueError(f'{inp_path}: no *Part ... *End Assembly block to include')
+    return starts[0], ends[-1] + 1
+
+
+def write_material_deck(
+        inp_path: str = None,
+        mesh_name: str = None,
+        out_path: str = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+) -> None:
+    """
+    Мастер-дека варианта материала: заголовок, *Include, input=<mesh_name>, блок *Material
+    варианта на месте исходного, остальное (амплитуды, контакты, шаги) — без изменений.
+    Имя материала остаётся исходным: на него ссылается сечение в подключаемой сетке;
+    *Density исходного блока (деки Explicit) сохраняется.
+    """
+    with open(inp_path, 'r') as f:
+        lines = f.readlines()
+    start, end = _mesh_block(lines, inp_path)
+    out = lines[:start] + [f'*Include, input={mesh_name}\n']
+    in_material = keep = False
+    for line in lines[end:]:
+        if line.startswith('*') and not line.startswith('**'):
+            key, params = _keyword(line)
+            if key == 'material':
+                in_material = True
+                variant = copy.copy(material_cfg)
+                variant.name = params.get('name', material_cfg.name)
+                out += [l + '\n' for l in material_keywords(material_model, variant)]
+                continue
+            if in_material and key not in _MATERIAL_OPTIONS:
+                in_material = False
+            keep = key == 'density'
+        if not in_material or keep:
+            out.append(line)
+    with open(out_path, 'w') as f:
+        f.writelines(out)
+
+
+def sweep_variants(
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        sweep_cfg: SimpleNamespace = None,
+) -> List[Tuple[str, str, SimpleNamespace]]:
+    """
+    Варианты материала [(имя, модель, свойства)]: явно заданные в solver.material_sweep.variants
+    и uq_samples выборок вокруг основного материала (параметр * (1 + cov * N(0, 1))).
+    """
+    variants = [(str(name), model, cfg) for name, model, cfg in getattr(sweep_cfg, 'variants', [])]
+    cov = dict(getattr(sweep_cfg, 'uq_cov', None) or {})
+    for k in range(int(getattr(sweep_cfg, 'uq_samples', 0))):
+        sample = copy.copy(material_cfg)
+        for key, rel in cov.items():
+            setattr(sample, key, float(getattr(material_cfg, key)) * (1.0 + float(rel) * random.gauss(0.0, 1.0)))
+        variants.append((f'uq{k}', material_model, sample))
+    return variants
+
+
+def prepare_sweep(inp_path: str) -> str:
+    """Файл сетки <job>_mesh.inp рядом с декой дизайна (один раз на дизайн); возвращает его имя."""
+    mesh_name = os.path.splitext(os.path.basename(inp_path))[0] + MESH_SUFFIX
+    split_deck(inp_path, os.path.join(os.path.dirname(inp_path), mesh_name))
+    return mesh_name
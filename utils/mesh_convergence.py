@@ -0,0 +1,165 @@
+import os
+import copy
+import json
+import datetime
+from types import SimpleNamespace
+from typing import Any, List, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.cad_drawer import model_drawer
+from utils.abq_solving_utils import collect_metrics
+from utils.config_utils import write_back_config
+from utils.design_pipeline import sample_geometry, solve_design, metrics_work_path
+
+METRIC_PREFIXES = ('S_mises', 'RF', 'Diameter')
+# seeds of the generated mesh, written by the compiler (write_mesh_record) next to metrics.json
+MESH_NAME = 'mesh.json'
+
+
+def meshed_seed(solver_cfg: SimpleNamespace, work_path: str) -> float:
+    """
+    Seed, с которым компилятор действительно построил сетку дизайна (цикл исправления
+    ошибок сетки может его уменьшить); без mesh.json — заданный solver.mesh.seed_size.
+    """
+    path = os.path.join(work_path, solver_cfg.results_root, solver_cfg.job_name_prefix, MESH_NAME)
+    if not os.path.exists(path):
+        return float(solver_cfg.mesh.seed_size)
+    with open(path, 'r', encoding='utf-8') as f:
+        return float(json.load(f)['seed_size'])
+
+
+def richardson_fit(h: np.ndarray, f: np.ndarray, p_grid: np.ndarray = None) -> (float, float, float):
+    """
+    Обобщённая экстраполяция Ричардсона f(h) = f0 + C * h**p для 3–4 уровней сетки
+    (шаг по сетке может быть неравномерным). Порядок p подбирается перебором по сетке,
+    f0 и C — линейным МНК. Возвращает (f0, C, p); при < 3 разных h экстраполяция не определена —
+    (nan, nan, nan): значение самой мелкой сетки вместо f0 занижало бы ошибку.
+    """
+    h = np.asarray(h, dtype=float)
+    f = np.asarray(f, dtype=float)
+    if np.unique(h).size < 3:
+        return float('nan'), float('nan'), float('nan')
+    if p_grid is None:
+        p_grid = np.linspace(0.5, 4.0, 71)
+
+    best_f0, best_c, best_p, best_res = float(f[np.argmin(h)]), 0.0, float('nan'), np.inf
+    for p in p_grid:
+        a = np.column_stack([np.ones_like(h), h ** p])
+        coef = np.linalg.lstsq(a, f, rcond=None)[0]
+        res = float(np.sum((a @ coef - f) ** 2))
+        if res < best_res:
+            best_f0, best_c, best_p, best_res = float(coef[0]), float(coef[1]), float(p), res
+    return best_f0, best_c, best_p
+
+
+def select_seed(table: pd.DataFrame, tolerance: float, designs: List[int] = None,
+                metrics: List[str] = None) -> Union[float, None]:
+    """
+    Самый крупный уровень seed, на котором есть строка для каждой пары дизайн × метрика
+    (по умолчанию — все, что встречаются в таблице) и относительная ошибка каждой <= tolerance;
+    пара без экстраполяции (< 3 уровней, rel_error = nan) уровень не проходит. Возвращается
+    наименьший seed, с которым сетки этого уровня реально строились (mesh_seed), чтобы
+    записанное значение описывало посчитанную сетку; None — ни один уровень не прошёл.
+    """
+    designs = table['design'].unique() if designs is None else designs
+    metrics = table['metric'].unique() if metrics is None else metrics
+    required = {(d, m) for d in designs for m in metrics}
+    for seed in sorted(table['seed'].unique(), reverse=True):
+        level = table[table['seed'] == seed]
+        present = set(zip(level['design'], level['metric']))
+        if required <= present and np.all(level['rel_error'] <= tolerance):
+            return float(level['mesh_seed'].min())
+    return None
+
+
+def run_mesh_convergence(
+        geometry_cfg: SimpleNamespace = None,
+        parameters: List[str] = None,
+        material_model: str = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        study_cfg: Any = None,
+        config_path: str = None,
+) -> (float, pd.DataFrame):
+    """
+    Исследование сеточной сходимости: несколько характерных дизайнов (центр диапазонов +
+    случайные) считаются на 3–4 уровнях solver.mesh.seed_size; по S_mises, RF и Diameter
+    в моменты frame_time_for_metric и фактическим seed сетки (mesh.json компилятора)
+    строится экстраполяция Ричардсона и выбирается самый крупный полный уровень с ошибкой не больше
+    tolerance (select_seed). Выбранный seed записывается в config_path.
+    """
+    seeds = [float(s) for s in getattr(study_cfg, 'seeds', [0.3, 0.2, 0.15, 0.1])]
+    n_designs = int(getattr(study_cfg, 'designs', 3))
+    tolerance = float(getattr(study_cfg, 'tolerance', 0.05))
+    if len(seeds) < 3:
+        raise ValueError(f'mesh_study.seeds needs at least 3 levels for Richardson extrapolation, got {seeds}')
+
+    metric_keys = [f'{m}_{t}' for m in METRIC_PREFIXES for t in solver_cfg.outputs.frame_time_for_metric]
+    work_path = metrics_work_path(solver_cfg, globalPath)
+    base_seed = float(solver_cfg.mesh.seed_size)
+    fine_ratio = float(solver_cfg.mesh.fine_seed_size) / base_seed
+
+    designs = [sample_geometry(geometry_cfg, parameters, center=True)]
+    designs += [sample_geometry(geometry_cfg, parameters) for _ in range(n_designs - 1)]
+
+    rows, studied = [], []
+    for i_design, design in enumerate(designs):
+        try:
+            length = model_drawer(design, solver_cfg.job_name_prefix)
+        except Exception as e:
+            print(f'[mesh study] design {i_design}: model_drawer failed ({e}); skipped')
+            continue
+        studied.append(i_design)
+        for seed in seeds:
+            curr_solver_cfg = copy.deepcopy(solver_cfg)
+            curr_solver_cfg.mesh.seed_size = seed
+            curr_solver_cfg.mesh.fine_seed_size = seed * fine_ratio
+            print(f'[mesh study] design {i_design}, seed {seed}')
+            _, _, fea_time = solve_design(design, length, material_model, material_cfg,
+                                          curr_solver_cfg, globalPath)
+            metrics = collect_metrics(design, curr_solver_cfg, work_path) or {}
+            mesh_seed = meshed_seed(curr_solver_cfg, work_path)
+            if mesh_seed != seed:
+                print(f'[mesh study] design {i_design}: meshed with seed {mesh_seed} instead of {seed}')
+            for key in metric_keys:
+                try:
+                    value = float(metrics.get(key))
+                except (TypeError, ValueError):
+                    continue
+                rows.append({'design': i_design, 'seed': seed, 'mesh_seed': mesh_seed, 'metric': key,
+                             'value': value, 'fea_time': fea_time.total_seconds()})
+
+    table = pd.DataFrame(rows, columns=['design', 'seed', 'mesh_seed', 'metric', 'value', 'fea_time'])
+    if table.empty:
+        print('[mesh study] no converged runs, seed is not changed')
+        return base_seed, table
+
+    table['extrapolated'] = np.nan
+    table['order'] = np.nan
+    for _, group in table.groupby(['design', 'metric']):
+        f0, _, p = richardson_fit(group['mesh_seed'].values, group['value'].values)
+        table.loc[group.index, 'extrapolated'] = f0
+        table.loc[group.index, 'order'] = p
+    table['rel_error'] = (np.abs(table['value'] - table['extrapolated'])
+                          / np.maximum(np.abs(table['extrapolated']), 1e-12))
+
+    # уровень, где у какого-то дизайна разошёлся расчёт или не хватает уровней для подгонки, не принимается
+    chosen = select_seed(table, tolerance, studied, metric_keys)
+    now = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+    report = os.path.join(globalPath, solver_cfg.results_root, f'mesh_convergence_{now}.csv')
+    table.to_csv(report, index=False)
+    if chosen is None:
+        print(f'[mesh study] no seed level is complete and within tolerance {tolerance}, '
+              f'seed is not changed; report: {report}')
+        return base_seed, table
+    print(f'[mesh study] chosen seed {chosen} (tolerance {tolerance}); report: {report}')
+
+    if config_path is not None:
+        write_back_config(config_path, {
+            'solver.mesh.seed_size': chosen,
+            'solver.mesh.fine_seed_size': round(chosen * fine_ratio, 6),
+        })
+    return chosen, table
@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import hashlib
+from types import SimpleNamespace
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+from utils.abq_connector import _to_plain
+from utils.abq_inp_utils import read_part_mesh, write_part_nodes
+from utils.cad_drawer import frame_layout, frame_feature_points
+
+MORPH_PART = 'FRAME'
+
+# соседи угла элемента (правая тройка рёбер) для якобиана в узлах
+_CORNER_NEIGHBOURS = {
+    'C3D8': [(1, 3, 4), (2, 0, 5), (3, 1, 6), (0, 2, 7), (7, 5, 0), (4, 6, 1), (5, 7, 2), (6, 4, 3)],
+    'C3D6': [(1, 2, 3), (2, 0, 4), (0, 1, 5), (5, 4, 0), (3, 5, 1), (4, 3, 2)],
+}
+_EDGES = {
+    'C3D8': [(0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 7), (7, 4), (0, 4), (1, 5), (2, 6), (3, 7)],
+    'C3D6': [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (0, 3), (1, 4), (2, 5)],
+}
+
+
+def topology_signature(geometry_cfg: Dict[str, Any], material_cfg: SimpleNamespace = None,
+                       solver_cfg: SimpleNamespace = None) -> str:
+    """
+    Хэш всего, что меняет топологию сектора или содержимое деки помимо координат узлов:
+    число ячеек, диаметр, толщина, знак дуги, радиусы скруглений (дуги скруглений
+    морфингом не переносятся), ветка асимметрии, а также материал и настройки решателя/сетки.
+    """
+    g = geometry_cfg
+    solver = {k: v for k, v in (_to_plain(solver_cfg) or dict()).items() if k != 'morph'}
+    asym = g['assymetry_1st_layer']
+    key = {
+        'repeat': int(g['repeat']),
+        'diameter': float(g['diameter']),
+        'width_low_cut': float(g['width_low_cut']),
+        'padding': float(g['padding']),
+        'thk': float(g.get('thk', 0.5)),
+        'arc': int(np.sign(g['arc_offset'])),
+        'fillets': [round(max(float(g[k]), 0.0), 4) for k in ('fillet_a', 'fillet_b', 'fillet_c')],
+        'assymetry': -1 if asym < 1 else (0 if asym == 1 else 1),
+        'material': _to_plain(material_cfg),
+        'solver': solver,
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def _control_points(geometry_cfg: Dict[str, Any]) -> Tuple[list, np.ndarray, float, float]:
+    """Имена и развёртка (R_mid * theta, z) опорных точек ячеек; R_mid и угол сектора."""
+    layout = frame_layout(geometry_cfg)
+    points = frame_feature_points(layout)
+    r_mid = layout.radius - 0.25
+    uz = np.array([[r_mid * np.arctan2(p['y'], p['x']), p['z']] for p in points])
+    return [p['name'] for p in points], uz, r_mid, np.radians(layout.rot)
+
+
+def _tps(src: np.ndarray, disp: np.ndarray, query: np.ndarray, reg: float = 1e-8) -> np.ndarray:
+    """Тонкопластинчатый сплайн (2D): перемещения disp в точках src -> перемещения в query."""
+    def _kernel(a, b):
+        r2 = np.sum((a[:, None, :] - b[None, :, :]) ** 2, axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = 0.5 * r2 * np.log(r2)
+        return np.nan_to_num(k)
+
+    n = src.shape[0]
+    p = np.hstack([np.ones((n, 1)), src])
+    a = np.zeros((n + 3, n + 3))
+    a[:n, :n] = _kernel(src, src) + reg * np.eye(n)
+    a[:n, n:] = p
+    a[n:, :n] = p.T
+    rhs = np.vstack([disp, np.zeros((3, disp.shape[1]))])
+    coef = np.linalg.solve(a, rhs)
+    q = np.hstack([np.ones((query.shape[0], 1)), query])
+    return _kernel(query, src) @ coef[:n] + q @ coef[n:]
+
+
+def morph_nodes(coords: np.ndarray, src_uz: np.ndarray, dst_uz: np.ndarray,
+                r_mid: float, sector: float, tol: float = 1e-4) -> np.ndarray:
+    """
+    Перенос узлов эталонной сетки на новую геометрию: перемещения опорных точек в развёртке
+    (u = R_mid * theta, z) интерполируются сплайном на все узлы; радиус узла не меняется,
+    узлы на плоскостях симметрии сектора остаются на них.
+    """
+    src_uz, keep = np.unique(np.round(src_uz, 6), axis=0, return_index=True)
+    dst_uz = dst_uz[keep]
+
+    r = np.hypot(coords[:, 0], coords[:, 1])
+    theta = np.arctan2(coords[:, 1], coords[:, 0])
+    node_uz = np.column_stack([r_mid * theta, coords[:, 2]])
+    d = _tps(src_uz, dst_uz - src_uz, node_uz)
+
+    on_plane = (np.abs(theta) < tol) | (np.abs(theta - sector) < tol)
+    d[on_plane, 0] = 0.0
+    theta_new = np.clip(theta + d[:, 0] / r_mid, 0.0, sector)
+    return np.column_stack([r * np.cos(theta_new), r * np.sin(theta_new), coords[:, 2] + d[:, 1]])
+
+
+def element_quality(coords: np.ndarray, node_labels: np.ndarray,
+                    elements: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[float, float]:
+    """
+    Минимальный масштабированный якобиан (по углам элементов) и максимальное отношение
+    сторон по всем элементам C3D8*/C3D6*. Для других типов возвращает (-inf, inf).
+    """
+    index = np.full(node_labels.max() + 1, -1, dtype=int)
+    index[node_labels] = np.arange(node_labels.size)
+    min_sj, max_ar = np.inf, 0.0
+    for etype, (_, conn) in elements.items():
+        base = etype[:4]
+        if base not in _CORNER_NEIGHBOURS:
+            return -np.inf, np.inf
+        x = coords[index[conn]]  # (m, k, 3)
+        for corner, (i, j, k) in enumerate(_CORNER_NEIGHBOURS[base]):
+            e1, e2, e3 = (x[:, i] - x[:, corner], x[:, j] - x[:, corner], x[:, k] - x[:, corner])
+            det = np.einsum('ij,ij->i', np.cross(e1, e2), e3)
+            norm = (np.linalg.norm(e1, axis=1) * np.linalg.norm(e2, axis=1) * np.linalg.norm(e3, axis=1))
+            min_sj = min(min_sj, float(np.min(det / np.maximum(norm, 1e-30))))
+        lengths = np.stack([np.linalg.norm(x[:, a] - x[:, b], axis=1) for a, b in _EDGES[base]], axis=1)
+        max_ar = max(max_ar, float(np.max(lengths.max(axis=1) / np.maximum(lengths.min(axis=1), 1e-30))))
+    return min_sj, max_ar
+
+
+def _template_dir(globalPath: str, solver_cfg: SimpleNamespace, signature: str) -> str:
+    return os.path.join(globalPath, solver_cfg.work_root, 'morph_templates', signature)
+
+
+def save_template(
+        geometry_cfg: Dict[str, Any] = None,
+        length: float = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+) -> None:
+    """Сохранить только что построенную деку как эталон для своей топологии (если эталона ещё нет)."""
+    signature = topology_signature(geometry_cfg, material_cfg, solver_cfg)
+    folder = _template_dir(globalPath, solver_cfg, signature)
+    inp_path = os.path.join(globalPath, solver_cfg.work_root, solver_cfg.job_name_prefix + '.inp')
+    if os.path.exists(os.path.join(folder, 'template.json')) or not os.path.exists(inp_path):
+        return
+    os.makedirs(folder, exist_ok=True)
+    shutil.copyfile(inp_path, os.path.join(folder, 'template.inp'))
+    with open(os.path.join(folder, 'template.json'), 'w', encoding='utf-8') as f:
+        json.dump({'geometry_cfg': _to_plain(geometry_cfg), 'length': float(length)}, f, indent=2)
+    print(f'[morph] template saved: {folder}')
+
+
+def try_morph_design(
+        geometry_cfg: Dict[str, Any] = None,
+        material_cfg: SimpleNamespace = None,
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+) -> bool:
+    """
+    Построить деку нового дизайна морфингом эталонной сетки той же топологии
+    (<work_root>/<job>.inp). False — морфинг невозможен или сетка не прошла проверку
+    качества, нужна полная перестройка (CAD -> CAE -> сетка).
+    """
+    morph_cfg = solver_cfg.morph
+    folder = _template_dir(globalPath, solver_cfg, topology_signature(geometry_cfg, material_cfg, solver_cfg))
+    if not os.path.exists(os.path.join(folder, 'template.json')):
+        return False
+    with open(os.path.join(folder, 'template.json'), 'r', encoding='utf-8') as f:
+        template = json.load(f)
+
+    ref_names, ref_uz, r_mid, sector = _control_points(template['geometry_cfg'])
+    new_names, new_uz, _, _ = _control_points(geometry_cfg)
+    if ref_names != new_names:
+        print('[morph] control points do not match the template; remeshing')
+        return False
+    shift = float(np.max(np.linalg.norm(new_uz - ref_uz, axis=1)))
+    if shift > float(morph_cfg.max_control_shift):
+        print(f'[morph] control point shift {shift:.3f} > {morph_cfg.max_control_shift}; remeshing')
+        return False
+
+    template_inp = os.path.join(folder, 'template.inp')
+    mesh = read_part_mesh(template_inp, MORPH_PART)
+    coords = morph_nodes(mesh['coords'], ref_uz, new_uz, r_mid, sector)
+
+    min_sj, max_ar = element_quality(coords, mesh['node_labels'], mesh['elements'])
+    if min_sj < float(morph_cfg.min_scaled_jacobian) or max_ar > float(morph_cfg.max_aspect_ratio):
+        print(f'[morph] quality check failed (min scaled Jacobian {min_sj:.3f}, '
+              f'max aspect ratio {max_ar:.1f}); remeshing')
+        return False
+    # баллон эталона (z в [-L, L]) должен по-прежнему перекрывать каркас
+    if np.max(np.abs(coords[:, 2])) > template['length']:
+        print('[morph] frame leaves the template balloon; remeshing')
+        return False
+
+    out_inp = os.path.join(globalPath, solver_cfg.work_root, solver_cfg.job_name_prefix + '.inp')
+    write_part_nodes(template_inp, out_inp, mesh['node_block'], mesh['node_labels'], coords)
+    print(f'[morph] deck morphed from template (shift {shift:.3f} mm, '
+          f'min scaled Jacobian {min_sj:.3f}, max aspect ratio {max_ar:.1f})')
+    return True
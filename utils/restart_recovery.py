@@ -0,0 +1,287 @@
+import os
+import re
+import copy
+import datetime
+import subprocess
+from types import SimpleNamespace
+from typing import List, Tuple, Union
+
+from utils.abq_monitor import converged_increments
+from utils.csv_log import append_row, read_log
+from utils.abq_solving_utils import run_solver
+
+LOG_NAME = 'recovery_log.csv'
+# какие настройки шага меняются при повторном запуске для каждого класса сбоя
+_ADJUSTMENTS = {
+    'diverged': ('stabilization', 'max_inc', 'contact'),
+    'stalled': ('max_inc', 'contact'),
+}
+# контактные пары уже определены в исходном шаге и в шаге рестарта не повторяются
+_CONTACT_DEFINITIONS = ('*contact pair', '*contact', '*contact inclusions', '*contact exclusions',
+                        '*contact property assignment', '*contact formulation',
+                        '*contact initialization assignment', '*contact stabilization')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def classify_failure(message: str) -> Union[str, None]:
+    """
+    Класс сбоя по сообщению run_solver: 'diverged' (расходимость, найденная монитором или самим
+    Standard), 'stalled' (процесс standard «спит»), None — восстанавливать нечего
+    (успех, ранняя остановка, таймаут, ошибка препроцессора).
+    """
+    message = str(message)
+    if message.startswith('ABAQUS terminated: diverged'):
+        return 'stalled' if 'no progress' in message else 'diverged'
+    if message.startswith('ABAQUS standard killed with sleep status'):
+        return 'stalled'
+    return None
+
+
+def last_restart_point(
+        work_path: str = None,
+        job_name: str = None,
+        segments: List[Tuple[int, int, float]] = None,
+        periods: List[float] = None,
+        restart_intervals: int = 20,
+) -> Union[Tuple[int, int, int, float], None]:
+    """
+    Последняя точка рестарта задания: последний сошедшийся инкремент, попавший на отметку
+    *Restart, write, number interval=N, time marks=YES своего шага (step_time = k * period / N).
+    segments — шаги задания [(номер шага в задании, индекс исходного шага, смещение от его
+    начала)], periods — длительности исходных шагов. Возвращает (шаг задания, инкремент,
+    индекс исходного шага, время от начала исходного шага) или None, если рестарта ещё нет.
+    """
+    steps = {job_step: (orig, offset) for job_step, orig, offset in segments}
+    point = None
+    for step, increment, step_time, total_time in converged_increments(os.path.join(work_path, job_name + '.sta')):
+        if step not in steps:
+            continue
+        orig, offset = steps[step]
+        period = float(periods[orig]) - offset
+        dt = period / int(restart_intervals)
+        k = int(round(step_time / dt))
+        if k >= 1 and abs(step_time - k * dt) <= 1e-6 * max(1.0, period):
+            point = (step, increment, orig, offset + step_time)
+    return point
+
+
+def _blocks(lines: List[str]) -> List[List[str]]:
+    # ключевое слово inp со своими строками данных (комментарии '**' отбрасываются)
+    blocks = []
+    for line in lines:
+        if line.startswith('**') or not line.strip():
+            continue
+        if line.startswith('*') or not blocks:
+            blocks.append([line])
+        else:
+            blocks[-1].append(line)
+    return blocks
+
+
+def _keyword(block: List[str]) -> str:
+    return block[0].split(',')[0].strip().lower()
+
+
+def _params(block: List[str]) -> dict:
+    out = dict()
+    for item in block[0].split(',')[1:]:
+        key, _, value = item.partition('=')
+        out[key.strip().lower()] = value.strip()
+    return out
+
+
+def _numbers(block: List[str]) -> List[float]:
+    return [float(x) for line in block[1:] for x in _NUMBER.findall(line)]
+
+
+def _set_param(line: str, key: str, value: str) -> str:
+    pattern = re.compile(r'(,\s*%s\s*=)\s*[^,]*' % re.escape(key), re.IGNORECASE)
+    if pattern.search(line):
+        return pattern.sub(r'\g<1>' + value, line)
+    return f'{line}, {key}={value}'
+
+
+def _deck_steps(blocks: List[List[str]]) -> List[Tuple[int, int]]:
+    # (индекс *Step, индекс *End Step) каждого шага деки
+    starts = [i for i, b in enumerate(blocks) if _keyword(b) == '*step']
+    ends = [i for i, b in enumerate(blocks) if _keyword(b) == '*end step']
+    return list(zip(starts, ends))
+
+
+def step_periods(inp_path: str) -> List[float]:
+    """Длительности шагов деки (вторая величина строки данных процедуры шага)."""
+    with open(inp_path, 'r') as f:
+        blocks = _blocks([line.rstrip('\n') for line in f])
+    return [(_numbers(blocks[i + 1]) + [0.0, 0.0])[1] for i, _ in _deck_steps(blocks)]
+
+
+def write_restart_deck(
+        inp_path: str = None,
+        restart_inp_path: str = None,
+        restart_step: int = 1,
+        restart_inc: int = 1,
+        orig_step: int = 0,
+        orig_time: float = 0.0,
+        attempt: int = 1,
+        failure: str = 'diverged',
+        solver_cfg: SimpleNamespace = None,
+) -> List[Tuple[int, int, float]]:
+    """
+    Дека рестарта по исходной деке задания: *Restart, read, ..., end step завершает шаг
+    в последней точке рестарта, затем исходный шаг orig_step продолжается на оставшееся время с
+    изменёнными настройками (для класса сбоя, множитель ** attempt): стабилизация больше,
+    maxInc меньше, *Contact Controls, stabilize; его амплитуды нагружения и отметки вывода
+    пересчитываются на полное время, чтобы история нагрузки не сбивалась. Следующие шаги
+    (остальные случаи нагружения) копируются без изменений.
+    Возвращает шаги нового задания для last_restart_point.
+    """
+    recovery = solver_cfg.recovery
+    adjust = _ADJUSTMENTS.get(failure, ())
+    tag = f'-r{attempt}'
+
+    with open(inp_path, 'r') as f:
+        blocks = _blocks([line.rstrip('\n') for line in f])
+    deck_steps = _deck_steps(blocks)
+    periods = [(_numbers(blocks[i + 1]) + [0.0, 0.0])[1] for i, _ in deck_steps]
+    remaining = periods[orig_step] - float(orig_time)
+    t_start = sum(periods[:orig_step])
+    i_step, i_end = deck_steps[orig_step]
+    model_blocks, step_blocks = blocks[:deck_steps[0][0]], blocks[i_step:i_end]
+    referenced = set(_params(b).get('amplitude', '').lower() for b in step_blocks) | \
+        set(_params(b).get('time points', '').lower() for b in step_blocks)
+
+    amplitudes, time_points, header = dict(), dict(), []
+    for block in model_blocks:
+        params = _params(block)
+        if params.get('name', '').lower() not in referenced:
+            continue
+        if _keyword(block) == '*amplitude' and 'time' not in params:
+            values = _numbers(block)
+            pairs = ['%.6g, %.6g' % (t_start + t, v) for t, v in zip(values[0::2], values[1::2])]
+            amplitudes[params['name'].lower()] = params['name'] + tag
+            header.append([f'*Amplitude, name={params["name"]}{tag}, time=TOTAL TIME'] + pairs)
+        elif _keyword(block) == '*time points':
+            points = _numbers(block)
+            if 'generate' in params:
+                start, stop, inc = points[:3]
+                points = [start + k * inc for k in range(int(round((stop - start) / inc)) + 1)]
+            shifted = sorted({round(p - orig_time, 6) for p in points if p - orig_time > 1e-9} | {round(remaining, 6)})
+            time_points[params['name'].lower()] = params['name'] + tag
+            header.append([f'*Time Points, name={params["name"]}{tag}']
+                          + [', '.join(str(p) for p in shifted[k:k + 8]) for k in range(0, len(shifted), 8)])
+
+    step = []
+    for block in step_blocks:
+        keyword, params, block = _keyword(block), _params(block), list(block)
+        if keyword in _CONTACT_DEFINITIONS:
+            continue
+        if keyword == '*step':
+            block[0] = _set_param(block[0], 'name', f'{params["name"]}{tag}')
+        elif keyword == '*static':
+            initial, _, min_inc, max_inc = (_numbers(block) + [0.0] * 4)[:4]
+            if 'max_inc' in adjust:
+                max_inc *= float(recovery.max_inc_factor) ** attempt
+            if 'stabilization' in adjust:
+                stabilize = float(params.get('stabilize') or 2e-4) * float(recovery.stabilization_factor) ** attempt
+                block[0] = _set_param(block[0], 'stabilize', f'{stabilize:.6g}')
+            block = [block[0], f'{min(initial, max_inc, remaining):.6g}, {remaining:.6g}, {min_inc:.6g}, '
+                               f'{min(max_inc, remaining):.6g}']
+        elif keyword == '*boundary' and params.get('amplitude', '').lower() in amplitudes:
+            block[0] = _set_param(block[0], 'amplitude', amplitudes[params['amplitude'].lower()])
+        elif keyword == '*output' and params.get('time points', '').lower() in time_points:
+            block[0] = _set_param(block[0], 'time points', time_points[params['time points'].lower()])
+        step.append(block)
+    if 'contact' in adjust:
+        step.append([f'*Contact Controls, stabilize={float(recovery.contact_stabilization):.6g}'])
+    step.append(['*End Step'])
+
+    segments, job_step = [], restart_step + 1
+    if remaining <= 1e-9:
+        # рестарт пришёлся на конец шага: продолжать нечего, дальше следующие случаи нагружения
+        step, header = [], []
+    else:
+        segments.append((job_step, orig_step, float(orig_time)))
+        job_step += 1
+    for j in range(orig_step + 1, len(deck_steps)):
+        step += blocks[deck_steps[j][0]:deck_steps[j][1] + 1]
+        segments.append((job_step, j, 0.0))
+        job_step += 1
+
+    out = [['*Heading', f'** restart {attempt} after "{failure}" at t={t_start + orig_time:.6g}'],
+           [f'*Restart, read, step={restart_step}, inc={restart_inc}, end step']] + header + step
+    with open(restart_inp_path, 'w') as f:
+        f.write('\n'.join(line for block in out for line in block) + '\n')
+    return segments
+
+
+def join_restart(work_path: str, job_name: str, restart_job: str, abaqus_cmd: str = 'abaqus') -> None:
+    """Дописать шаги ODB рестарта в <job>.odb (abaqus restartjoin), чтобы парсер видел всю историю."""
+    subprocess.run(f'{abaqus_cmd} restartjoin originalodb={job_name} restartodb={restart_job}',
+                   shell=True, cwd=work_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def log_recovery(log_path: str = None, row: dict = None) -> float:
+    """
+    Дописать попытку восстановления в журнал (csv, под блокировкой — вызывается из воркеров
+    JobScheduler); возвращает долю успешных восстановлений.
+    """
+    append_row(log_path, dict(row, date=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    return float(read_log(log_path)['recovered'].astype(bool).mean())
+
+
+def run_with_recovery(
+        solver_cfg: SimpleNamespace = None,
+        project_root: str = None,
+        abaqus_cmd: str = 'abaqus',
+        globalPath: str = None,
+        timeout_min: float = None,
+        sleep_retries: int = None,
+) -> (str, float):
+    """
+    run_solver с восстановлением по рестарту (solver.recovery.enabled): при расходимости или
+    зависании задание <job>_rK продолжается из последней записанной точки рестарта
+    предыдущей попытки (до max_attempts раз), уже посчитанные инкременты не повторяются.
+    Результаты попыток дописываются в <job>.odb, исход — в <results_root>/recovery_log.csv.
+    """
+    message, last_time = run_solver(solver_cfg, project_root, abaqus_cmd, globalPath,
+                                    timeout_min=timeout_min, sleep_retries=sleep_retries)
+    recovery = getattr(solver_cfg, 'recovery', None)
+    failure = classify_failure(message)
+    if not getattr(recovery, 'enabled', False) or failure is None:
+        return message, last_time
+
+    work_path = os.path.join(globalPath or os.getcwd(), project_root)
+    job = solver_cfg.job_name_prefix
+    inp_path = os.path.join(work_path, job + '.inp')
+    row = {'job': job, 'failure': failure, 'message': message, 'attempts': 0, 'restart_time': None}
+    periods = step_periods(inp_path)
+    prev_job, segments = job, [(i + 1, i, 0.0) for i in range(len(periods))]
+    while failure is not None and row['attempts'] < int(recovery.max_attempts):
+        point = last_restart_point(work_path, prev_job, segments, periods, recovery.restart_intervals)
+        if point is None:
+            print(f'[recovery] {prev_job}: no restart data written yet')
+            break
+        restart_step, restart_inc, orig_step, orig_time = point
+        restart_time = sum(periods[:orig_step]) + orig_time
+        row['attempts'] += 1
+        restart_job = f'{job}_r{row["attempts"]}'
+        segments = write_restart_deck(inp_path, os.path.join(work_path, restart_job + '.inp'),
+                                      restart_step, restart_inc, orig_step, orig_time, row['attempts'],
+                                      failure, solver_cfg)
+        print(f'[recovery] {failure}: {restart_job} restarts {prev_job} at step {restart_step} '
+              f'inc {restart_inc} (t={restart_time:.4f})')
+        cfg = copy.deepcopy(solver_cfg)
+        cfg.job_name_prefix = restart_job
+        message, last_time = run_solver(cfg, project_root, abaqus_cmd, globalPath, timeout_min=timeout_min,
+                                        sleep_retries=sleep_retries, oldjob=prev_job)
+        join_restart(work_path, job, restart_job, abaqus_cmd)
+        if row['restart_time'] is None:
+            row['restart_time'] = restart_time
+        prev_job = restart_job
+        failure = classify_failure(message)
+
+    row.update({'final_message': message, 'recovered': row['attempts'] > 0 and failure is None})
+    rate = log_recovery(os.path.join(globalPath or os.getcwd(), solver_cfg.results_root, LOG_NAME), row)
+    print(f'[recovery] {job}: {"recovered" if row["recovered"] else "not recovered"} '
+          f'after {row["attempts"]} restart(s); success rate {rate:.0%}')
+    return message, last_time
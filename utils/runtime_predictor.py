@@ -0,0 +1,97 @@
+import os
+import datetime
+from types import SimpleNamespace
+from typing import Dict, Any, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.abq_inp_utils import count_mesh_entities
+from utils.csv_log import append_row, read_log
+
+LOG_NAME = 'runtime_log.csv'
+# только завершённые расчёты дают полное время; остановленные по таймауту/расходимости — цензурированы
+_COMPLETE_PREFIXES = ('ok', 'ABAQUS stopped early')
+
+
+def runtime_features(
+        inp_path: str = None,
+        cpus: int = 1,
+        geometry_cfg: Dict[str, Any] = None,
+) -> Dict[str, float]:
+    """Признаки задания: размер сетки (из .inp), число ядер и числовые параметры геометрии."""
+    n_nodes, n_elements = count_mesh_entities(inp_path) if os.path.exists(inp_path) else (0, 0)
+    feats = {'n_nodes': float(n_nodes), 'n_elements': float(n_elements), 'cpus': float(cpus)}
+    for key, value in (geometry_cfg or dict()).items():
+        if isinstance(value, (int, float, np.floating, np.integer)) and not isinstance(value, bool):
+            feats['geom_' + key] = float(value)
+    return feats
+
+
+def _design_matrix(table: pd.DataFrame, columns: list) -> np.ndarray:
+    x = [np.ones(len(table))]
+    for col in columns:
+        values = table[col].astype(float).values
+        # время решения ~ степенная функция размера сетки и числа ядер
+        x.append(np.log(np.maximum(values, 1.0)) if col in ('n_nodes', 'n_elements', 'cpus') else values)
+    return np.column_stack(x)
+
+
+def predict_timeout(
+        log_path: str = None,
+        feats: Dict[str, float] = None,
+        runtime_cfg: SimpleNamespace = None,
+) -> (float, Union[float, None]):
+    """
+    Таймаут задания (мин) = safety * квантиль `quantile` предсказания логарифмической регрессии
+    log(t) ~ log(n_elements), log(n_nodes), log(cpus), геометрия по прошлым завершённым расчётам,
+    ограниченный [min_timeout, max_timeout]. Пока истории меньше min_samples — default_timeout.
+    Возвращает (timeout_min, predicted_min или None).
+    """
+    default = float(getattr(runtime_cfg, 'default_timeout', 60))
+    if not getattr(runtime_cfg, 'predict', True) or not os.path.exists(log_path):
+        return default, None
+    table = read_log(log_path)
+    if table.empty:
+        return default, None
+    table = table[table['message'].astype(str).apply(lambda m: m.startswith(_COMPLETE_PREFIXES))]
+    columns = [c for c in feats.keys() if c in table.columns]
+    table = table.dropna(subset=columns + ['actual_min'])
+    if len(table) < max(int(getattr(runtime_cfg, 'min_samples', 10)), len(columns) + 2):
+        return default, None
+
+    x = _design_matrix(table, columns)
+    y = np.log(np.maximum(table['actual_min'].astype(float).values, 1e-3))
+    coef = np.linalg.lstsq(x, y, rcond=None)[0]
+    residual_q = float(np.quantile(y - x @ coef, float(getattr(runtime_cfg, 'quantile', 0.95))))
+
+    x_new = _design_matrix(pd.DataFrame([feats]), columns)
+    predicted = float(np.exp(x_new @ coef)[0])
+    timeout = float(getattr(runtime_cfg, 'safety', 1.5)) * predicted * np.exp(max(residual_q, 0.0))
+    timeout = float(np.clip(timeout,
+                            float(getattr(runtime_cfg, 'min_timeout', 5)),
+                            float(getattr(runtime_cfg, 'max_timeout', 240))))
+    return timeout, predicted
+
+
+def log_runtime(
+        log_path: str = None,
+        feats: Dict[str, float] = None,
+        predicted_min: Union[float, None] = None,
+        timeout_min: float = None,
+        actual_min: float = None,
+        message: str = None,
+) -> None:
+    """
+    Дописать строку «признаки / предсказание / таймаут / факт» в журнал (csv). Стадия расчёта
+    идёт в воркерах JobScheduler, поэтому строка только дописывается и под блокировкой (csv_log).
+    """
+    row = dict(feats)
+    row.update({
+        'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'predicted_min': predicted_min,
+        'timeout_min': timeout_min,
+        'actual_min': actual_min,
+        'message': message,
+    })
+    append_row(log_path, row)
@@ -0,0 +1,136 @@
+import os
+import gzip
+import time
+import uuid
+import queue
+import shutil
+import datetime
+import threading
+from types import SimpleNamespace
+from typing import Union
+
+
+def dir_size_gb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / 1024 ** 3
+
+
+def allocate_scratch(scratch_cfg: SimpleNamespace, job_name: str, poll_seconds: float = 5,
+                     max_wait_seconds: float = 3600) -> str:
+    """
+    Уникальный каталог задания в solver.scratch.root (tmpfs / локальный NVMe). Если занятое
+    место больше quota_gb (сборщик ещё не вывез прошлые расчёты), ждёт освобождения.
+    """
+    root = str(scratch_cfg.root)
+    os.makedirs(root, exist_ok=True)
+    t0 = time.time()
+    while dir_size_gb(root) > float(scratch_cfg.quota_gb) and time.time() - t0 < max_wait_seconds:
+        time.sleep(poll_seconds)
+    path = os.path.join(root, f'{job_name}_{uuid.uuid4().hex[:8]}')
+    os.makedirs(path)
+    return path
+
+
+def harvest(
+        scratch_dir: str = None,
+        solver_cfg: SimpleNamespace = None,
+        metrics_dest: str = None,
+        odb_dest: str = None,
+        metrics_ready: threading.Event = None,
+) -> None:
+    """
+    Вывоз результатов из scratch: сначала метрики (<results_root>/<job>/: metrics.json, csv) в metrics_dest
+    (сигнал metrics_ready), затем, если solver.scratch.keep_odb, ODB (gzip при compress_odb)
+    в odb_dest; в конце каталог scratch удаляется.
+    """
+    job = solver_cfg.job_name_prefix
+    try:
+        src = os.path.join(scratch_dir, solver_cfg.results_root, job)
+        if os.path.exists(metrics_dest):
+            shutil.rmtree(metrics_dest)
+        if os.path.isdir(src):
+            shutil.copytree(src, metrics_dest)
+        else:
+            os.makedirs(metrics_dest, exist_ok=True)
+    finally:
+        if metrics_ready is not None:
+            metrics_ready.set()
+
+    scratch_cfg = solver_cfg.scratch
+    odb = os.path.join(scratch_dir, job + '.odb')
+    if getattr(scratch_cfg, 'keep_odb', False) and os.path.exists(odb):
+        os.makedirs(odb_dest, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        if getattr(scratch_cfg, 'compress_odb', True):
+            with open(odb, 'rb') as f_in, gzip.open(os.path.join(odb_dest, f'{job}_{stamp}.odb.gz'), 'wb',
+                                                    compresslevel=1) as f_out:
+                shutil.copyfileobj(f_in, f_out, length=16 * 1024 * 1024)
+        else:
+            shutil.move(odb, os.path.join(odb_dest, f'{job}_{stamp}.odb'))
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+class ResultHarvester(object):
+    """
+    Фоновый поток, вывозящий результаты из scratch, пока считается следующий дизайн.
+    submit() возвращает Event, который взводится, как только метрики на месте.
+    """
+
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='scratch-harvester', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            kwargs = self._tasks.get()
+            if kwargs is None:
+                self._tasks.task_done()
+                return
+            try:
+                harvest(**kwargs)
+            except Exception as e:
+                print(f'[scratch] harvest of {kwargs.get("scratch_dir")} failed: {e}')
+                kwargs['metrics_ready'].set()
+            finally:
+                self._tasks.task_done()
+
+    def submit(self, scratch_dir: str, solver_cfg: SimpleNamespace, metrics_dest: str,
+               odb_dest: str) -> threading.Event:
+        ready = threading.Event()
+        self._tasks.put(dict(scratch_dir=scratch_dir, solver_cfg=solver_cfg, metrics_dest=metrics_dest,
+                             odb_dest=odb_dest, metrics_ready=ready))
+        return ready
+
+    def pending(self) -> int:
+        return self._tasks.unfinished_tasks
+
+    def close(self, wait: bool = True) -> None:
+        self._tasks.put(None)
+        if wait:
+            self._thread.join()
+
+
+_HARVESTER: Union[ResultHarvester, None] = None
+
+
+def default_harvester() -> ResultHarvester:
+    """Один сборщик на процесс (поток запускается при первом обращении)."""
+    global _HARVESTER
+    if _HARVESTER is None:
+        _HARVESTER = ResultHarvester()
+    return _HARVESTER
+
+
+def close_default_harvester() -> None:
+    """Дождаться вывоза всех результатов (конец кампании)."""
+    global _HARVESTER
+    if _HARVESTER is not None:
+        _HARVESTER.close()
+        _HARVESTER = None
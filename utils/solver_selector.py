@@ -0,0 +1,138 @@
+import os
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.abq_inp_utils import deck_analysis
+from utils.csv_log import read_log
+from utils.runtime_predictor import _COMPLETE_PREFIXES
+
+ANALYSES = ('standard', 'explicit')
+
+
+def contact_pairs(solver_cfg: SimpleNamespace) -> float:
+    """
+    Сложность контакта дизайна: пары «каркас — нагружатель» (мембрана или жёсткие губки)
+    плюс самоконтакт каркаса (полный весит вдвое больше усечённого).
+    """
+    loading = getattr(solver_cfg, 'loading', None)
+    model = str(getattr(loading, 'model', 'membrane'))
+    loaders = 1 if model == 'membrane' else int(getattr(loading, 'segments', 4))
+    self_contact = str(getattr(getattr(solver_cfg, 'contact', None), 'self_contact', 'full'))
+    return float(loaders) + (1.0 if self_contact == 'pruned' else 2.0)
+
+
+def explicit_increments(solver_cfg: SimpleNamespace) -> float:
+    """Число инкрементов Explicit: масштабированное время всех шагов / целевой устойчивый инкремент."""
+    explicit_cfg = solver_cfg.explicit
+    period = float(solver_cfg.step_time) + sum(float(case.time) for case in getattr(solver_cfg, 'load_cases', []))
+    target_dt = getattr(explicit_cfg, 'target_dt', None) or 1e-6
+    return period * float(explicit_cfg.time_scaling) / float(target_dt)
+
+
+def _complete_runs(log_path: str) -> pd.DataFrame:
+    # завершённые расчёты журнала runtime_predictor: по ним оценивается стоимость решателей
+    if not os.path.exists(log_path):
+        return pd.DataFrame()
+    table = read_log(log_path)
+    if table.empty:
+        return table
+    return table[table['message'].astype(str).apply(lambda m: m.startswith(_COMPLETE_PREFIXES))]
+
+
+def estimate_elements(table: pd.DataFrame, geometry_cfg: Dict[str, Any], k: int = 3) -> Union[float, None]:
+    """Размер сетки дизайна до CAE: среднее n_elements k ближайших по геометрии расчётов журнала."""
+    feats = {'geom_' + key: float(value) for key, value in geometry_cfg.items()
+             if isinstance(value, (int, float, np.floating, np.integer)) and not isinstance(value, bool)}
+    columns = [c for c in feats if c in table.columns]
+    if table.empty or not columns or 'n_elements' not in table.columns:
+        return None
+    table = table.dropna(subset=columns + ['n_elements'])
+    table = table[table['n_elements'] > 0]
+    if table.empty:
+        return None
+    x = table[columns].astype(float).values
+    scale = np.where(x.std(axis=0) > 0, x.std(axis=0), 1.0)
+    dist = np.linalg.norm((x - np.asarray([feats[c] for c in columns])) / scale, axis=1)
+    return float(table['n_elements'].values[np.argsort(dist)[:k]].mean())
+
+
+def predict_minutes(
+        table: pd.DataFrame = None,
+        n_elements: float = None,
+        pairs: float = None,
+        analysis: str = 'standard',
+        solver_cfg: SimpleNamespace = None,
+) -> float:
+    """
+    Предсказанное время расчёта (мин) решателем `analysis`. По журналу, когда в нём не меньше
+    min_samples завершённых расчётов этим решателем: log(t) ~ log(n_elements) + пары контакта.
+    Иначе априорная модель: Standard ~ (n/1e4)^1.5 * (1 + contact_weight * (пары - 1)) —
+    контакт добавляет итераций и уменьшений шага; Explicit ~ (n/1e4) * (инкременты/1e5) —
+    стоимость инкремента линейна по сетке, контакт почти не влияет.
+    """
+    selector = solver_cfg.selector
+    explicit = analysis == 'explicit'
+    if not table.empty and {'explicit', 'contact_pairs', 'n_elements', 'actual_min'} <= set(table.columns):
+        rows = table[(table['explicit'].fillna(0.0) > 0.5) == explicit]
+        rows = rows.dropna(subset=['contact_pairs', 'n_elements', 'actual_min'])
+        if len(rows) >= max(int(selector.min_samples), 3):
+            x = np.column_stack([np.ones(len(rows)), np.log(np.maximum(rows['n_elements'].astype(float), 1.0)),
+                                 rows['contact_pairs'].astype(float)])
+            y = np.log(np.maximum(rows['actual_min'].astype(float).values, 1e-3))
+            coef = np.linalg.lstsq(x, y, rcond=None)[0]
+            return float(np.exp(coef @ [1.0, np.log(max(n_elements, 1.0)), pairs]))
+    size = n_elements / 1e4
+    if explicit:
+        return float(selector.explicit_minutes) * size * explicit_increments(solver_cfg) / 1e5
+    return float(selector.standard_minutes) * size ** 1.5 * (1.0 + float(selector.contact_weight) * (pairs - 1.0))
+
+
+def choose_analysis(
+        solver_cfg: SimpleNamespace = None,
+        geometry_cfg: Dict[str, Any] = None,
+        log_path: str = None,
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Решатель дизайна при solver.analysis = auto: тот, чьё предсказанное время меньше.
+    Пока журнал не позволяет оценить размер сетки — selector.default. Возвращает (решатель, {решатель: мин}).
+    """
+    table = _complete_runs(log_path)
+    n_elements = estimate_elements(table, geometry_cfg)
+    if n_elements is None:
+        return str(solver_cfg.selector.default), dict()
+    pairs = contact_pairs(solver_cfg)
+    costs = {analysis: predict_minutes(table, n_elements, pairs, analysis, solver_cfg) for analysis in ANALYSES}
+    return min(costs, key=costs.get), costs
+
+
+def route_analysis(
+        solver_cfg: SimpleNamespace = None,
+        geometry_cfg: Dict[str, Any] = None,
+        log_path: str = None,
+        inp_path: str = None,
+) -> SimpleNamespace:
+    """
+    Настройки задания с выбранным решателем (solver_cfg.analysis = standard | explicit).
+    auto — choose_analysis; для уже записанной деки (inp_path, морфинг) решатель берётся из неё.
+    Для Explicit автоподбор шага Standard, тёплый старт и рестарты отключаются.
+    """
+    analysis = str(getattr(solver_cfg, 'analysis', 'standard'))
+    if analysis not in ANALYSES:
+        if inp_path is not None and os.path.exists(inp_path):
+            analysis = deck_analysis(inp_path)
+        else:
+            analysis, costs = choose_analysis(solver_cfg, geometry_cfg, log_path)
+            if costs:
+                print(f'[selector] {solver_cfg.job_name_prefix}: {analysis} '
+                      f'(predicted ' + ', '.join(f'{a} {m:.1f} min' for a, m in costs.items()) + ')')
+    out = copy.deepcopy(solver_cfg)
+    out.analysis = analysis
+    if analysis == 'explicit':
+        out.recovery.enabled = False
+        out.tuner.enabled = False
+        out.warm_start.enabled = False
+    return out
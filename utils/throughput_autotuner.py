@@ -0,0 +1,228 @@
+import os
+import copy
+import time
+import shutil
+import datetime
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+import pandas as pd
+import psutil as psu
+
+from utils.abq_solving_utils import run_solver
+from utils.config_utils import write_back_config
+from utils.abq_inp_utils import merge_decks
+
+_OK_PREFIXES = ('ok', 'ABAQUS stopped early')
+# наименьшая дека, которую принимает merge_decks: для stub_solve без подготовленной деки дизайна
+STUB_DECK = """*Heading
+** autotune stub deck
+*Part, name=PART-1
+*Node
+1, 0., 0., 0.
+*End Part
+*Assembly, name=Assembly
+*Instance, name=PART-1-1, part=PART-1
+*End Instance
+*End Assembly
+*Step, name=Step-1
+*Static
+*End Step
+"""
+
+
+def node_resources() -> (int, float):
+    """Физические ядра и доступная память узла (ГБ)."""
+    cores = psu.cpu_count(logical=False) or psu.cpu_count() or 1
+    return int(cores), psu.virtual_memory().available / 1024 ** 3
+
+
+def candidate_configs(
+        cores: int = None,
+        mem_gb: float = None,
+        cpus_options: List[int] = (1, 2, 4, 8),
+        mp_modes: List[str] = ('threads', 'mpi'),
+        max_jobs: int = 8,
+        mem_per_job_gb: float = 4.0,
+        batch_sizes: List[int] = (1,),
+) -> List[SimpleNamespace]:
+    """Сочетания (jobs x cpus x mp_mode x batch), которые помещаются в ядра и память узла."""
+    out = []
+    for cpus in cpus_options:
+        for jobs in range(1, int(max_jobs) + 1):
+            for batch in batch_sizes:
+                if jobs * int(cpus) > cores or jobs * int(batch) * float(mem_per_job_gb) > mem_gb:
+                    continue
+                for mp_mode in mp_modes:
+                    if int(cpus) == 1 and mp_mode != mp_modes[0]:
+                        continue    # на одном ядре режимы не отличаются
+                    out.append(SimpleNamespace(jobs=jobs, cpus=int(cpus), mp_mode=str(mp_mode), batch=int(batch)))
+    return out
+
+
+def abaqus_solve(
+        inp_path: str,
+        work_dir: str,
+        job_name: str,
+        cpus: int,
+        mp_mode: str,
+        solver_cfg: SimpleNamespace = None,
+        abaqus_cmd: str = 'abaqus',
+) -> str:
+    """Один расчёт готовой деки в отдельном каталоге (для бенчмарка). Возвращает сообщение run_solver."""
+    os.makedirs(work_dir, exist_ok=True)
+    shutil.copyfile(inp_path, os.path.join(work_dir, job_name + '.inp'))
+    cfg = copy.deepcopy(solver_cfg)
+    cfg.job_name_prefix = job_name
+    cfg.cpus = cpus
+    cfg.mp_mode = mp_mode
+    cfg.monitor.stop_after = None
+    message, _ = run_solver(cfg, work_dir, abaqus_cmd, None)
+    return message
+
+
+def stub_solve(
+        inp_path: str,
+        work_dir: str,
+        job_name: str,
+        cpus: int,
+        mp_mode: str,
+        serial_minutes: float = 0.05,
+        serial_fraction: float = 0.3,
+        startup_minutes: float = 0.02,
+) -> str:
+    """
+    Заглушка решателя для проверки харнесса: запуск задания + время дизайнов по закону Амдала,
+    mpi чуть дороже на обмены; число дизайнов в деке — из заголовка '** batch: ...' (merge_decks),
+    без деки — один дизайн.
+    """
+    header = ''
+    if inp_path and os.path.exists(inp_path):
+        with open(inp_path, 'r') as f:
+            header = f.readline()
+    n = len(header.split(':', 1)[1].split()) if header.startswith('** batch:') else 1
+    overhead = 1.1 if mp_mode == 'mpi' and cpus > 1 else 1.0
+    time.sleep(60.0 * (startup_minutes
+                       + n * serial_minutes * (serial_fraction + (1.0 - serial_fraction) / cpus) * overhead))
+    return 'ok'
+
+
+def _run_one(solve_fn: Callable, inp_path: str, work_dir: str, job_name: str, cpus: int, mp_mode: str) -> str:
+    try:
+        return solve_fn(inp_path, work_dir, job_name, cpus, mp_mode)
+    except Exception as e:
+        return f'error: {e}'
+
+
+def benchmark(
+        config: SimpleNamespace = None,
+        inp_path: str = None,
+        n_designs: int = 8,
+        bench_root: str = None,
+        solve_fn: Callable = None,
+) -> dict:
+    """
+    Прогнать n_designs копий деки при config.jobs параллельных заданиях по config.cpus ядер;
+    при config.batch > 1 каждое задание считает объединённую деку из batch копий (merge_decks).
+    Возвращает пропускную способность (designs_per_hour) и долю успешных расчётов.
+    """
+    batch = int(getattr(config, 'batch', 1))
+    per_round = config.jobs * batch
+    n = per_round * ((max(int(n_designs), per_round) + per_round - 1) // per_round)
+    tag = f'j{config.jobs}_c{config.cpus}_{config.mp_mode}_b{batch}'
+    if batch > 1:
+        os.makedirs(os.path.join(bench_root, tag), exist_ok=True)
+        batch_inp = os.path.join(bench_root, tag, 'batch.inp')
+        merge_decks([inp_path] * batch, [f'D{k}' for k in range(batch)], batch_inp)
+        inp_path = batch_inp
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=config.jobs) as pool:
+        futures = [pool.submit(_run_one, solve_fn, inp_path, os.path.join(bench_root, tag, str(k)),
+                               f'bench_{k}', config.cpus, config.mp_mode)
+                   for k in range(n // batch)]
+        messages = [f.result() for f in futures]
+    wall = time.time() - t0
+    n_ok = batch * sum(1 for m in messages if str(m).startswith(_OK_PREFIXES))
+    return {
+        'jobs': config.jobs, 'cpus': config.cpus, 'mp_mode': config.mp_mode, 'batch': batch,
+        'designs': n, 'ok': n_ok, 'wall_s': wall,
+        'designs_per_hour': 3600.0 * n_ok / max(wall, 1e-9),
+    }
+
+
+def run_autotune(
+        solver_cfg: SimpleNamespace = None,
+        globalPath: str = None,
+        tune_cfg: Any = None,
+        config_path: str = None,
+        solve_fn: Callable = None,
+        abaqus_cmd: str = 'abaqus',
+) -> (SimpleNamespace, pd.DataFrame):
+    """
+    Бенчмарк пропускной способности узла: для всех допустимых (jobs x cpus x mp_mode) считается
+    одна и та же дека (<work_root>/<job>.inp последнего дизайна или autotune.inp), в том числе
+    пакетами autotune.batch_sizes (несколько дизайнов на задание против одного), выбирается
+    максимум designs/hour среди конфигураций без сбоев; результат пишется в config_path
+    (solver.cpus, solver.mp_mode, solver.parallel_jobs, solver.batch.size); если ни одна
+    конфигурация не досчиталась, конфиг не меняется. solve_fn подменяет решатель
+    (autotune.dry_run — stub_solve; без деки дизайна ей пишется STUB_DECK).
+    """
+    work_path = os.path.join(globalPath, solver_cfg.work_root)
+    inp_path = getattr(tune_cfg, 'inp', None) or os.path.join(work_path, solver_cfg.job_name_prefix + '.inp')
+    if solve_fn is None:
+        if getattr(tune_cfg, 'dry_run', False):
+            solve_fn = stub_solve
+        else:
+            if not os.path.exists(inp_path):
+                raise FileNotFoundError(f'autotune needs a prepared deck, {inp_path} not found')
+            solve_fn = functools.partial(abaqus_solve, solver_cfg=solver_cfg, abaqus_cmd=abaqus_cmd)
+    if not os.path.exists(inp_path):
+        # заглушке решателя дека не нужна, но пакеты (batch > 1) собираются merge_decks из файла
+        inp_path = os.path.join(work_path, 'autotune_stub.inp')
+        os.makedirs(work_path, exist_ok=True)
+        with open(inp_path, 'w') as f:
+            f.write(STUB_DECK)
+
+    cores, mem_gb = node_resources()
+    configs = candidate_configs(cores, mem_gb,
+                                cpus_options=list(getattr(tune_cfg, 'cpus', [1, 2, 4, 8])),
+                                mp_modes=list(getattr(tune_cfg, 'mp_modes', ['threads', 'mpi'])),
+                                max_jobs=int(getattr(tune_cfg, 'max_jobs', 8)),
+                                mem_per_job_gb=float(getattr(tune_cfg, 'mem_per_job_gb', 4.0)),
+                                batch_sizes=list(getattr(tune_cfg, 'batch_sizes', [1])))
+    if not configs:
+        raise ValueError(f'no (jobs x cpus) configuration fits {cores} cores / {mem_gb:.1f} GB')
+    print(f'[autotune] {cores} cores, {mem_gb:.1f} GB available; {len(configs)} configurations')
+
+    bench_root = os.path.join(work_path, 'autotune')
+    rows = []
+    for config in configs:
+        row = benchmark(config, inp_path, int(getattr(tune_cfg, 'designs', 8)), bench_root, solve_fn)
+        print(f'[autotune] {row}')
+        rows.append(row)
+        shutil.rmtree(bench_root, ignore_errors=True)
+
+    table = pd.DataFrame(rows)
+    now = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+    os.makedirs(os.path.join(globalPath, solver_cfg.results_root), exist_ok=True)
+    report = os.path.join(globalPath, solver_cfg.results_root, f'autotune_{now}.csv')
+    table.to_csv(report, index=False)
+    if not (table['ok'] > 0).any():
+        print(f'[autotune] no configuration finished a design, config is not changed; report: {report}')
+        return None, table
+    reliable = table[table['ok'] == table['designs']]
+    best = (reliable if not reliable.empty else table).sort_values('designs_per_hour').iloc[-1]
+    chosen = SimpleNamespace(jobs=int(best['jobs']), cpus=int(best['cpus']), mp_mode=str(best['mp_mode']),
+                             batch=int(best['batch']))
+    print(f'[autotune] best: {chosen} ({best["designs_per_hour"]:.1f} designs/h); report: {report}')
+
+    if config_path is not None:
+        write_back_config(config_path, {
+            'solver.cpus': chosen.cpus,
+            'solver.mp_mode': chosen.mp_mode,
+            'solver.parallel_jobs': chosen.jobs,
+            'solver.batch.size': chosen.batch,
+        })
+    return chosen, table